@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Benchmark the alias lookups of AliasedYAMLConfigManager against scans.
+
+Builds a refgenie-like config of --genomes genomes keyed by digest, with two
+aliases each, e.g. "g12" and "genome_12", 100k aliases by default, and
+reports:
+
+- build_ms: building the manager and its alias index
+- lookup_us: `get_key` and `get_aliases`, compared with a scan of all the
+  aliases, as `AliasedYacAttMap.get_aliases` did before it used the index
+- prefix_us: `resolve_prefix` of unique digest prefixes, of aliases, and of
+  ambiguous alias prefixes, and `complete`, compared with a scan of all the
+  aliases and keys
+- suggest_us: `suggest` of mistyped aliases and digests, at edit distances
+  1 and 2
+- change_us: `set_aliases` and `remove_aliases` of one alias
+- startup_ms: the alias index work on startup: building the index in the
+  constructor ("eager"), or, with `alias_cache`, on the first alias miss of
+  an object loaded from a file, building it and saving it in a sidecar
+  ("cache_cold"), or loading it from the sidecar ("cache_warm"); objects
+  that only look up keys skip it altogether
+
+    ./alias_index_benchmark.py --genomes 50000
+"""
+
+import json
+import os
+import random
+import tempfile
+import time
+from argparse import ArgumentParser
+
+import yaml
+
+from yacman import AliasedYAMLConfigManager
+from yacman.aliascache import alias_cache_path
+from yacman.exceptions import AmbiguousAliasError
+
+
+def make_config(genomes, seed):
+    rng = random.Random(seed)
+    digests = [f"{rng.getrandbits(192):048x}" for _ in range(genomes)]
+    data = {digest: {"assets": {}} for digest in digests}
+    aliases = {digest: [f"g{i}", f"genome_{i}"] for i, digest in enumerate(digests)}
+    return data, aliases
+
+
+def per_call(repeat, function, args):
+    """
+    Time a function over a list of arguments
+
+    :return float: mean time per call, in seconds, of the fastest of the runs
+    """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for arg in args:
+            function(arg)
+        times.append((time.perf_counter() - t0) / len(args))
+    return min(times)
+
+
+def startup(data, aliases, repeat):
+    """
+    Time the work done for the alias index on startup
+
+    :return dict[str, float]: fastest time of each case, in seconds
+    """
+
+    def construct(**kwargs):
+        t0 = time.perf_counter()
+        AliasedYAMLConfigManager(data, **kwargs)
+        return time.perf_counter() - t0
+
+    alias = next(iter(aliases.values()))[0]
+    results = {
+        "eager": min(construct(aliases=aliases) for _ in range(repeat))
+        - min(construct(exact=True) for _ in range(repeat))
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "genomes.yaml")
+        with open(path, "w") as f:
+            yaml.safe_dump(data, f)
+        for case in ("cache_cold", "cache_warm"):
+            times = []
+            for _ in range(repeat):
+                if case == "cache_cold" and os.path.exists(alias_cache_path(path)):
+                    os.remove(alias_cache_path(path))
+                ym = AliasedYAMLConfigManager.from_yaml_file(
+                    path, aliases=aliases, alias_cache=True
+                )
+                t0 = time.perf_counter()
+                ym[alias]
+                times.append(time.perf_counter() - t0)
+            results[case] = min(times)
+    return results
+
+
+def typo(rng, name, edits):
+    name = list(name)
+    for _ in range(edits):
+        name[rng.randrange(len(name))] = "_"
+    return "".join(name)
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    data, aliases = make_config(args.genomes, args.seed)
+    t0 = time.perf_counter()
+    ym = AliasedYAMLConfigManager(data, aliases=aliases)
+    build = time.perf_counter() - t0
+    digests = list(data)
+    picked = [rng.randrange(args.genomes) for _ in range(args.lookups)]
+    names = [f"genome_{i}" for i in picked]
+    keys = [digests[i] for i in picked]
+    alias_to_key = {a: k for k, key_aliases in aliases.items() for a in key_aliases}
+    scanned = max(1, args.lookups // 100)
+
+    def scan_aliases(key):
+        return [a for a, k in alias_to_key.items() if k == key]
+
+    def scan_prefix(prefix):
+        return {
+            alias_to_key.get(name, name)
+            for names in (alias_to_key, data)
+            for name in names
+            if name.startswith(prefix)
+        }
+
+    def ambiguous(prefix):
+        try:
+            ym.resolve_prefix(prefix)
+        except AmbiguousAliasError as e:
+            return e.candidates
+
+    results = {
+        "aliases": len(ym.alias_index),
+        "build_ms": round(build * 1e3, 1),
+        "lookup_us": {
+            "get_key": per_call(args.repeat, ym.get_key, names),
+            "get_aliases": per_call(args.repeat, ym.get_aliases, keys),
+            "get_aliases_scan": per_call(args.repeat, scan_aliases, keys[:scanned]),
+            "resolve_many": per_call(args.repeat, ym.resolve_many, [names])
+            / len(names),
+        },
+        "prefix_us": {
+            "digest": per_call(args.repeat, ym.resolve_prefix, [k[:10] for k in keys]),
+            "alias": per_call(args.repeat, ym.resolve_prefix, names),
+            "ambiguous": per_call(args.repeat, ambiguous, [n[:-1] for n in names]),
+            "complete": per_call(args.repeat, ym.complete, [n[:-1] for n in names]),
+            "scan": per_call(
+                args.repeat, scan_prefix, [k[:10] for k in keys[:scanned]]
+            ),
+        },
+    }
+    queries = max(1, args.lookups // 20)
+    results["suggest_us"] = {
+        f"{kind}_{edits}": per_call(
+            1,
+            lambda q: ym.suggest(q, max_distance=edits),
+            [typo(rng, name, edits) for name in sample[:queries]],
+        )
+        for kind, sample in (("alias", names), ("digest", keys))
+        for edits in (1, 2)
+    }
+
+    def change(name):
+        ym.set_aliases(keys[0], name)
+        ym.remove_aliases(keys[0], name)
+
+    results["change_us"] = {
+        "set_and_remove": per_call(
+            args.repeat, change, [f"new{i}" for i in range(args.lookups)]
+        )
+    }
+    for key in ("lookup_us", "prefix_us", "suggest_us", "change_us"):
+        results[key] = {k: round(v * 1e6, 2) for k, v in results[key].items()}
+    results["startup_ms"] = {
+        k: round(v * 1e3, 1) for k, v in startup(data, aliases, args.repeat).items()
+    }
+    return results
+
+
+def main():
+    parser = ArgumentParser(description="alias index benchmark")
+    parser.add_argument("--genomes", type=int, default=50000, help="genomes")
+    parser.add_argument("--lookups", type=int, default=2000, help="names looked up")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for case, result in results.items():
+        if not isinstance(result, dict):
+            print(f"{case:<22}{result!s:>14}")
+            continue
+        print(case)
+        for key, value in result.items():
+            print(f"  {key:<20}{value!s:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark deep_update on large nested configs.
+
+Compares the former recursive implementation with the iterative one, in
+place and copy-on-write, with and without merge strategies, on:
+
+- wide: a balanced tree with --fanout keys per level and --depth levels,
+  and an overlay changing a fraction of the leaves
+- deep: a chain of nested mappings, deeper than the recursion limit
+
+    ./deep_update_benchmark.py --fanout 10 --depth 5 --changed 0.01
+"""
+
+import json
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from collections.abc import Mapping
+
+from yacman.merge import APPEND, deep_update, snapshot_tree
+
+
+def recursive_deep_update(old, new):
+    """The former implementation, for reference"""
+    for key, value in new.items():
+        if isinstance(value, Mapping) and value:
+            old[key] = recursive_deep_update(old.get(key, {}), value)
+        else:
+            old[key] = new[key]
+    return old
+
+
+def wide_tree(fanout, depth):
+    if depth == 0:
+        return {"value": 0, "items": [0, 1]}
+    return {f"k{i}": wide_tree(fanout, depth - 1) for i in range(fanout)}
+
+
+def wide_overlay(node, changed, rng):
+    """Change a fraction of the leaves, adding a key to each"""
+    overlay = {}
+    for key, value in node.items():
+        if "value" in value:
+            if rng.random() < changed:
+                overlay[key] = {"value": 1, "items": [2], "new": True}
+        else:
+            child = wide_overlay(value, changed, rng)
+            if child:
+                overlay[key] = child
+    return overlay
+
+
+def chain(depth, leaf):
+    root = node = {}
+    for _ in range(depth):
+        node = node.setdefault("k", {})
+    node.update(leaf)
+    return root
+
+
+def best_of(repeat, function, make_args):
+    """
+    Time a function, with fresh arguments for each run
+
+    :return float: shortest run time, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        args = make_args()
+        t0 = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    tree = wide_tree(args.fanout, args.depth)
+    overlay = wide_overlay(tree, args.changed, rng)
+    strategies = {".".join(["*"] * args.depth + ["items"]): APPEND}
+    fresh = lambda: (snapshot_tree(tree), overlay)
+    results = {
+        "wide": {
+            "leaves": args.fanout**args.depth,
+            "recursive_ms": best_of(args.repeat, recursive_deep_update, fresh),
+            "in_place_ms": best_of(args.repeat, deep_update, fresh),
+            "copy_on_write_ms": best_of(
+                args.repeat, lambda o, n: deep_update(o, n, in_place=False), fresh
+            ),
+            "strategies_ms": best_of(
+                args.repeat, lambda o, n: deep_update(o, n, strategies), fresh
+            ),
+        }
+    }
+    deep_overlay = chain(args.chain, {"b": 2})
+    fresh_deep = lambda: (chain(args.chain, {"a": 1}), deep_overlay)
+    try:
+        recursive = best_of(args.repeat, recursive_deep_update, fresh_deep)
+    except RecursionError:
+        recursive = "RecursionError"
+    results["deep"] = {
+        "depth": args.chain,
+        "recursive_ms": recursive,
+        "in_place_ms": best_of(args.repeat, deep_update, fresh_deep),
+        "copy_on_write_ms": best_of(
+            args.repeat, lambda o, n: deep_update(o, n, in_place=False), fresh_deep
+        ),
+    }
+    for result in results.values():
+        for key, value in result.items():
+            if key.endswith("_ms") and isinstance(value, float):
+                result[key] = round(value * 1000, 2)
+    return results
+
+
+def main():
+    parser = ArgumentParser(description="deep_update benchmark")
+    parser.add_argument("--fanout", type=int, default=10, help="keys per level")
+    parser.add_argument("--depth", type=int, default=5, help="levels of the tree")
+    parser.add_argument(
+        "--changed", type=float, default=0.01, help="fraction of leaves changed"
+    )
+    parser.add_argument(
+        "--chain", type=int, default=sys.getrecursionlimit() * 2, help="chain depth"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for case, result in results.items():
+        print(case)
+        for key, value in result.items():
+            print(f"  {key:<18}{value!s:>16}")
+
+
+if __name__ == "__main__":
+    main()
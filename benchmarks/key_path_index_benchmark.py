@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Benchmark the key path index of FutureYAMLConfigManager against tree walks.
+
+Builds a refgenie-like config, with --genomes genomes of --assets assets
+each, about 100k nodes by default, and reports:
+
+- memory: the size of the data and of the index, measured with tracemalloc
+- build: indexing the data from scratch
+- lookup: getting deep key paths, present and missing, with `get_path`
+- scan: listing the key paths under "genomes.*.assets" and under one asset
+- change: setting a leaf with `set_path`, and replacing a genome, with the
+  index maintained incrementally, compared with rebuilding it
+
+    ./key_path_index_benchmark.py --genomes 1000 --assets 16
+"""
+
+import json
+import random
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+from yacman import FutureYAMLConfigManager
+from yacman.keypath import get_path
+from yacman.merge import snapshot_tree
+from yacman.pathindex import KeyPathIndex, scan_tree
+
+
+def asset(i):
+    return {
+        "asset_path": f"asset{i}",
+        "tags": {
+            "default": {
+                "asset_digest": f"{i:032x}",
+                "seek_keys": {"fasta": f"asset{i}.fa", "fai": f"asset{i}.fa.fai"},
+            }
+        },
+    }
+
+
+def make_config(genomes, assets):
+    return {
+        "config_version": 0.4,
+        "genomes": {
+            f"g{g}": {
+                "aliases": [f"genome{g}"],
+                "assets": {f"a{a}": asset(a) for a in range(assets)},
+            }
+            for g in range(genomes)
+        },
+    }
+
+
+def count_nodes(data):
+    return len(scan_tree(data))
+
+
+def measure_memory(function):
+    """
+    :return (object, int): the result of the function, and the memory it
+        still uses, in bytes
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def per_call(repeat, function, args):
+    """
+    Time a function over a list of arguments
+
+    :return float: mean time per call, in seconds, of the fastest of the runs
+    """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for arg in args:
+            function(arg)
+        times.append((time.perf_counter() - t0) / len(args))
+    return min(times)
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    data, data_bytes = measure_memory(lambda: make_config(args.genomes, args.assets))
+    index, index_bytes = measure_memory(lambda: KeyPathIndex(data))
+    indexed = FutureYAMLConfigManager(snapshot_tree(data), key_path_index=True)
+    plain = FutureYAMLConfigManager(snapshot_tree(data))
+    present = [
+        f"genomes.g{rng.randrange(args.genomes)}.assets.a{rng.randrange(args.assets)}"
+        ".tags.default.seek_keys.fasta"
+        for _ in range(args.lookups)
+    ]
+    missing = [path.replace("seek_keys", "missing") for path in present]
+    one_asset = "genomes.g0.assets.a0"
+    results = {
+        "nodes": count_nodes(data),
+        "memory": {"data_bytes": data_bytes, "index_bytes": index_bytes},
+        "build_ms": per_call(args.repeat, KeyPathIndex, [data]),
+        "lookup_us": {
+            "index": per_call(args.repeat, indexed.get_path, present),
+            "walk": per_call(args.repeat, plain.get_path, present),
+            "index_missing": per_call(
+                args.repeat, lambda p: indexed.get_path(p, None), missing
+            ),
+            "walk_missing": per_call(
+                args.repeat, lambda p: get_path(plain.data, p, None), missing
+            ),
+        },
+        "scan_ms": {
+            "index_assets": per_call(args.repeat, indexed.scan, ["genomes.*.assets"]),
+            "walk_assets": per_call(args.repeat, plain.scan, ["genomes.*.assets"]),
+            "index_one_asset": per_call(args.repeat, indexed.scan, [one_asset]),
+            "walk_one_asset": per_call(args.repeat, plain.scan, [one_asset]),
+        },
+    }
+    leaves = [
+        (
+            f"genomes.g{rng.randrange(args.genomes)}.assets.a{rng.randrange(args.assets)}"
+            ".asset_path"
+        )
+        for _ in range(args.lookups)
+    ]
+    genome = make_config(1, args.assets)["genomes"]["g0"]
+
+    def replace_genome(manager):
+        return lambda path: manager.set_path(path, snapshot_tree(genome))
+
+    genome_paths = [f"genomes.g{rng.randrange(args.genomes)}" for _ in range(20)]
+    results["change_us"] = {
+        "set_leaf_indexed": per_call(
+            args.repeat, lambda p: indexed.set_path(p, "x"), leaves
+        ),
+        "set_leaf_plain": per_call(
+            args.repeat, lambda p: plain.set_path(p, "x"), leaves
+        ),
+        "replace_genome_indexed": per_call(
+            args.repeat, replace_genome(indexed), genome_paths
+        ),
+        "replace_genome_plain": per_call(
+            args.repeat, replace_genome(plain), genome_paths
+        ),
+        "rebuild": per_call(args.repeat, indexed.reindex, [None]),
+    }
+    for key, scale in (("build_ms", 1e3), ("lookup_us", 1e6), ("scan_ms", 1e3)):
+        results[key] = _scaled(results[key], scale)
+    results["change_us"] = _scaled(results["change_us"], 1e6)
+    return results
+
+
+def _scaled(value, scale):
+    if isinstance(value, dict):
+        return {k: _scaled(v, scale) for k, v in value.items()}
+    return round(value * scale, 3)
+
+
+def main():
+    parser = ArgumentParser(description="key path index benchmark")
+    parser.add_argument("--genomes", type=int, default=1000, help="genomes")
+    parser.add_argument("--assets", type=int, default=16, help="assets per genome")
+    parser.add_argument("--lookups", type=int, default=2000, help="paths looked up")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for case, result in results.items():
+        if not isinstance(result, dict):
+            print(f"{case:<26}{result!s:>16}")
+            continue
+        print(case)
+        for key, value in result.items():
+            print(f"  {key:<24}{value!s:>16}")
+
+
+if __name__ == "__main__":
+    main()
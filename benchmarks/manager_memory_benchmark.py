@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark the memory used by many config managers, with tracemalloc.
+
+Loads --instances managers from asset config files, one file per asset,
+with FutureYAMLConfigManager, CompactYAMLConfigManager, and
+CompactYAMLConfigManager interning the strings, and reports:
+
+- instance_bytes: per-instance overhead of an empty in-memory manager
+- file_instance_bytes: per-instance memory of a manager loaded from a file
+  of --leaves leaves, with a schema
+- leaf_bytes: memory per config leaf, from the difference between files of
+  --leaves and 2 * --leaves leaves
+
+    ./manager_memory_benchmark.py --instances 2000 --leaves 20
+"""
+
+import gc
+import json
+import os
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+
+import yaml
+
+from yacman import CompactYAMLConfigManager, FutureYAMLConfigManager
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"asset_path": {"type": "string"}, "seek_keys": {"type": "object"}},
+}
+
+
+def asset_config(i, leaves):
+    return {
+        "asset_path": f"asset{i}",
+        "seek_keys": {f"key{k}": f"asset{i}.{k % 5}" for k in range(leaves - 1)},
+    }
+
+
+def write_files(directory, instances, leaves):
+    paths = []
+    for i in range(instances):
+        path = os.path.join(directory, f"asset{i}_{leaves}.yaml")
+        with open(path, "w") as f:
+            yaml.safe_dump(asset_config(i, leaves), f)
+        paths.append(path)
+    return paths
+
+
+def measure(function):
+    """
+    :return int: memory still used by the result of the function, in bytes
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return used
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as directory:
+        schema = os.path.join(directory, "schema.yaml")
+        with open(schema, "w") as f:
+            yaml.safe_dump(SCHEMA, f)
+        small = write_files(directory, args.instances, args.leaves)
+        large = write_files(directory, args.instances, 2 * args.leaves)
+        variants = {
+            "future": (FutureYAMLConfigManager, {}),
+            "compact": (CompactYAMLConfigManager, {}),
+            "compact_interned": (CompactYAMLConfigManager, {"intern_strings": True}),
+        }
+        results = {}
+        for name, (cls, kwargs) in variants.items():
+            # warm up the caches
+            cls.from_yaml_file(small[0], schema_source=schema, **kwargs)
+
+            def load(paths):
+                return lambda: [
+                    cls.from_yaml_file(path, schema_source=schema, **kwargs)
+                    for path in paths
+                ]
+
+            empty = measure(lambda: [cls({}) for _ in range(args.instances)])
+            small_bytes = measure(load(small))
+            large_bytes = measure(load(large))
+            results[name] = {
+                "instance_bytes": round(empty / args.instances),
+                "file_instance_bytes": round(small_bytes / args.instances),
+                "leaf_bytes": round(
+                    (large_bytes - small_bytes) / (args.instances * args.leaves), 1
+                ),
+            }
+    return results
+
+
+def main():
+    parser = ArgumentParser(description="config manager memory benchmark")
+    parser.add_argument("--instances", type=int, default=2000, help="managers")
+    parser.add_argument("--leaves", type=int, default=20, help="leaves per config")
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for variant, result in results.items():
+        print(variant)
+        for key, value in result.items():
+            print(f"  {key:<22}{value!s:>12}")
+
+
+if __name__ == "__main__":
+    main()
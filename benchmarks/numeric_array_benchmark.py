@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark loading long numeric lists as lists and as packed arrays.
+
+Writes a config of --lists sequences of --length numbers each, half ints,
+e.g. chromosome lengths, and half floats, e.g. bin boundaries, loads it with
+FutureYAMLConfigManager, with and without an array threshold, and reports:
+
+- load_ms: loading the file
+- data_bytes: memory used by the loaded data, measured with tracemalloc
+- rss_bytes: growth of the resident set size of a fresh process loading the
+  file, on Linux
+- to_yaml_equal: whether the YAML text of both versions is the same
+
+    ./numeric_array_benchmark.py --lists 10 --length 20000
+"""
+
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+import yaml
+
+from yacman import FutureYAMLConfigManager
+from yacman.arrays import DEFAULT_ARRAY_THRESHOLD
+
+VARIANTS = {"lists": None, "arrays": DEFAULT_ARRAY_THRESHOLD}
+
+
+def make_config(lists, length, seed):
+    rng = random.Random(seed)
+    config = {}
+    for i in range(lists):
+        if i % 2:
+            config[f"bins{i}"] = sorted(rng.random() * 1e6 for _ in range(length))
+        else:
+            config[f"lengths{i}"] = [rng.randrange(1, 2**31) for _ in range(length)]
+    return config
+
+
+def load(path, threshold):
+    return FutureYAMLConfigManager.from_yaml_file(path, array_threshold=threshold)
+
+
+def rss():
+    """
+    :return int: resident set size of the process, in bytes
+    """
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure_rss(path, threshold):
+    """
+    Load the file in this process and print the growth of the resident set
+    """
+    before = rss()
+    manager = load(path, threshold)
+    gc.collect()
+    print(rss() - before)
+    del manager
+
+
+def fresh_rss(path, variant):
+    if not os.path.exists("/proc/self/statm"):
+        return None
+    output = subprocess.run(
+        [sys.executable, __file__, "--rss", path, "--variant", variant],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return int(output.stdout)
+
+
+def run(args, path):
+    results = {}
+    texts = {}
+    for variant, threshold in VARIANTS.items():
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            load(path, threshold)
+            times.append(time.perf_counter() - t0)
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        manager = load(path, threshold)
+        gc.collect()
+        data_bytes = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        texts[variant] = manager.to_yaml()
+        results[variant] = {
+            "load_ms": round(min(times) * 1e3, 1),
+            "data_bytes": data_bytes,
+            "rss_bytes": fresh_rss(path, variant),
+        }
+    results["to_yaml_equal"] = texts["lists"] == texts["arrays"]
+    return results
+
+
+def main():
+    parser = ArgumentParser(description="packed numeric array benchmark")
+    parser.add_argument("--lists", type=int, default=10, help="numeric lists")
+    parser.add_argument("--length", type=int, default=20000, help="items per list")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    parser.add_argument("--rss", help="measure the RSS of loading this file")
+    parser.add_argument("--variant", choices=VARIANTS, help="variant to measure")
+    args = parser.parse_args()
+
+    if args.rss:
+        measure_rss(args.rss, VARIANTS[args.variant])
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "numbers.yaml")
+        with open(path, "w") as f:
+            yaml.safe_dump(make_config(args.lists, args.length, args.seed), f)
+        results = run(args, path)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for case, result in results.items():
+        if not isinstance(result, dict):
+            print(f"{case:<22}{result!s:>14}")
+            continue
+        print(case)
+        for key, value in result.items():
+            print(f"  {key:<20}{value!s:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark building and accessing YacAttMap objects on a large config.
+
+Writes a refgenie-like config of --genomes genomes with --assets assets
+each, and compares YacAttMap objects whose nested mappings are converted up
+front, built from the parsed entries, with objects read from the file, whose
+nested mappings are converted when first accessed. Reports:
+
+- construct_ms: parsing the file, and building either object out of the
+  parsed entries, as the constructor does
+- access_us: fetching an asset path through attributes, the first time, on
+  a new object, and once all the nodes along the path are converted,
+  compared with an attmap.PathExAttMap
+- traverse_ms: converting the whole object with `to_dict`
+- expand_us: expanding a plain string value and a value with a variable,
+  compared with attmap
+
+    ./yacattmap_benchmark.py --genomes 200 --assets 10
+"""
+
+import json
+import os
+import random
+import tempfile
+import time
+from argparse import ArgumentParser
+
+import yaml
+from attmap import pathex_attmap
+
+from yacman import YacAttMap
+from yacman.yacman import _safely_expand, load_yaml
+
+
+def make_config(genomes, assets):
+    return {
+        "config_version": 0.4,
+        "genome_folder": "$HOME/genomes",
+        "genomes": {
+            f"genome{i}": {
+                "aliases": [f"g{i}"],
+                "assets": {
+                    f"asset{j}": {
+                        "default_tag": "default",
+                        "tags": {
+                            "default": {
+                                "asset_path": f"asset{j}",
+                                "asset_digest": f"{i:08x}{j:08x}",
+                                "seek_keys": {
+                                    "fasta": f"genome{i}/asset{j}.fa",
+                                    "fai": f"genome{i}/asset{j}.fa.fai",
+                                },
+                            }
+                        },
+                    }
+                    for j in range(assets)
+                },
+            }
+            for i in range(genomes)
+        },
+    }
+
+
+def best(repeat, function, *args):
+    """
+    :return float: fastest time of a function call, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def per_call(repeat, function, args):
+    """
+    Time a function over a list of arguments
+
+    :return float: mean time per call, in seconds, of the fastest of the runs
+    """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for arg in args:
+            function(arg)
+        times.append((time.perf_counter() - t0) / len(args))
+    return min(times)
+
+
+def eager(path):
+    return YacAttMap(entries=load_yaml(path))
+
+
+def lazy(path):
+    return YacAttMap(filepath=path, skip_read_lock=True)
+
+
+def adopt(entries):
+    ym = YacAttMap()
+    ym._adopt(entries)
+    return ym
+
+
+def fasta(ym, ids):
+    genome, asset = ids
+    return ym.genomes[genome].assets[asset].tags.default.seek_keys.fasta
+
+
+def run(args, path):
+    rng = random.Random(args.seed)
+    paths = [
+        (f"genome{rng.randrange(args.genomes)}", f"asset{rng.randrange(args.assets)}")
+        for _ in range(args.lookups)
+    ]
+    entries = load_yaml(path)
+    results = {
+        "construct_ms": {
+            "parse": best(args.repeat, load_yaml, path),
+            "eager": best(args.repeat, YacAttMap, entries),
+            "lazy": best(args.repeat, adopt, entries),
+        }
+    }
+    objects = {"eager": eager(path), "lazy": lazy(path)}
+    attmap = pathex_attmap.PathExAttMap(load_yaml(path))
+    first = {}
+    for variant in objects:
+        # a new object per run, so every lookup is the first one
+        news = [(lazy if variant == "lazy" else eager)(path) for _ in range(2)]
+        first[variant] = min(
+            per_call(1, lambda ids: fasta(ym, ids), paths) for ym in news
+        )
+    results["access_us"] = {
+        "eager_first": first["eager"],
+        "lazy_first": first["lazy"],
+        "eager": per_call(args.repeat, lambda ids: fasta(objects["eager"], ids), paths),
+        "lazy": per_call(args.repeat, lambda ids: fasta(objects["lazy"], ids), paths),
+        "attmap": per_call(args.repeat, lambda ids: fasta(attmap, ids), paths),
+    }
+    results["traverse_ms"] = {
+        "eager": best(1, objects["eager"].to_dict),
+        "lazy": best(1, lazy(path).to_dict),
+    }
+    values = [f"genome{i}/asset.fa" for i in range(args.lookups)]
+    variables = ["$HOME/genomes"] * args.lookups
+    results["expand_us"] = {
+        "plain_attmap": per_call(args.repeat, pathex_attmap._safely_expand, values),
+        "plain": per_call(args.repeat, _safely_expand, values),
+        "variable_attmap": per_call(
+            args.repeat, pathex_attmap._safely_expand, variables
+        ),
+        "variable": per_call(args.repeat, _safely_expand, variables),
+    }
+    for key, scale in (
+        ("construct_ms", 1e3),
+        ("access_us", 1e6),
+        ("traverse_ms", 1e3),
+        ("expand_us", 1e6),
+    ):
+        results[key] = {k: round(v * scale, 2) for k, v in results[key].items()}
+    return results
+
+
+def main():
+    parser = ArgumentParser(description="YacAttMap conversion benchmark")
+    parser.add_argument("--genomes", type=int, default=200, help="genomes")
+    parser.add_argument("--assets", type=int, default=10, help="assets per genome")
+    parser.add_argument("--lookups", type=int, default=1000, help="paths looked up")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "genomes.yaml")
+        with open(path, "w") as f:
+            yaml.safe_dump(make_config(args.genomes, args.assets), f)
+        results = run(args, path)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for case, result in results.items():
+        print(case)
+        for key, value in result.items():
+            print(f"  {key:<20}{value!s:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Measure how writers of disjoint key paths of the same file scale.
+
+Every writer process updates its own genome of a shared config in a loop
+for a while, spending --work seconds on the update while holding the lock,
+as when an asset is built, either with a key path lock on its genome or
+with a whole-file write lock. Reports, for every number of writers, the
+total updates per second, the speedup over a single writer, the fewest
+and most updates made by one writer, the p99 and max lock wait and the
+timeouts. Key path writers should scale until the commits, which are
+serialized, saturate the file; whole-file writers should not scale at all.
+
+    ./key_path_benchmark.py --writers 1 2 4 8 --work 0.05 --duration 5
+"""
+
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from argparse import ArgumentParser
+
+import yaml
+
+from yacman import FutureYAMLConfigManager, LockTimeoutError, write_lock
+
+MODES = ["key_path", "file"]
+
+
+def worker(filepath, mode, genome, args, start, results):
+    ym = FutureYAMLConfigManager.from_yaml_file(filepath, wait_max=args.duration)
+    path = ("genomes", genome) if mode == "key_path" else None
+    waits = []
+    timeouts = 0
+    # start once all the writers have loaded the file
+    start.wait()
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        t0 = time.monotonic()
+        try:
+            with write_lock(ym, path=path) as locked_ym:
+                waits.append(time.monotonic() - t0)
+                if path is None:
+                    locked_ym.rebase()
+                time.sleep(args.work)
+                locked_ym["genomes"][genome]["updates"] = len(waits)
+                locked_ym.write()
+        except LockTimeoutError:
+            # starved for a whole run
+            timeouts += 1
+    results.put((waits, timeouts))
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def run(mode, writers, args):
+    filepath = os.path.join(tempfile.mkdtemp(), "genomes.yaml")
+    genomes = [f"genome{i}" for i in range(writers)]
+    with open(filepath, "w") as f:
+        yaml.safe_dump({"genomes": {g: {"updates": 0} for g in genomes}}, f)
+    # spawn, so that every worker has its own process ID in the lock file names
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(writers + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=worker, args=(filepath, mode, genome, args, start, results)
+        )
+        for genome in genomes
+    ]
+    for p in processes:
+        p.start()
+    start.wait()
+    waits, counts, timeouts = [], [], 0
+    for _ in processes:
+        writer_waits, writer_timeouts = results.get()
+        waits.extend(writer_waits)
+        counts.append(len(writer_waits))
+        timeouts += writer_timeouts
+    for p in processes:
+        p.join()
+    return {
+        "ops_per_s": round(sum(counts) / args.duration, 2),
+        "min_ops": min(counts),
+        "max_ops": max(counts),
+        "p99_wait_ms": _ms(percentile(waits, 99)),
+        "max_wait_ms": _ms(max(waits, default=None)),
+        "timeouts": timeouts,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def main():
+    parser = ArgumentParser(description="Key path writer scaling benchmark")
+    parser.add_argument(
+        "--writers", type=int, nargs="+", default=[1, 2, 4, 8], help="writers"
+    )
+    parser.add_argument(
+        "--work", type=float, default=0.05, help="seconds spent on each update"
+    )
+    parser.add_argument("--duration", type=float, default=5, help="seconds per run")
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    report = {mode: {} for mode in MODES}
+    for mode in MODES:
+        for writers in args.writers:
+            result = run(mode, writers, args)
+            single = report[mode].get(args.writers[0])
+            result["speedup"] = round(
+                result["ops_per_s"] / single["ops_per_s"] if single else 1.0, 2
+            )
+            report[mode][writers] = result
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    columns = list(next(iter(report["file"].values())))
+    print(f"{'mode':<10}{'writers':>8}" + "".join(f"{c:>13}" for c in columns))
+    for mode, runs in report.items():
+        for writers, result in runs.items():
+            values = "".join(f"{result[c]!s:>13}" for c in columns)
+            print(f"{mode:<10}{writers:>8}{values}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Multi-process lock throughput and correctness benchmark.
+
+Launches N processes that each make M updates to the same file, through one
+of the config manager classes, and reports throughput, lock wait time
+percentiles, lock files left behind and lost updates, as JSON:
+
+    ./lock_benchmark.py --processes 8 --updates 20 --output report.json
+
+Every update writes a distinct key, so the final file must contain N x M keys;
+any missing key is a lost update.
+"""
+
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+import yaml
+
+BACKENDS = ["future", "yacman1", "attmap"]
+
+
+def update_future(filepath, keys, args):
+    from yacman import FutureYAMLConfigManager, write_lock
+
+    ym = FutureYAMLConfigManager.from_yaml_file(
+        filepath, wait_max=args.wait_max, lock_policy=args.lock_policy, mvcc=args.mvcc
+    )
+    waits = []
+    for key in keys:
+        start = time.monotonic()
+        with write_lock(ym) as locked_ym:
+            waits.append(time.monotonic() - start)
+            locked_ym.rebase()
+            locked_ym[key] = 1
+            locked_ym.write()
+    return waits
+
+
+def update_yacman1(filepath, keys, args):
+    from yacman import YAMLConfigManager
+
+    ym = YAMLConfigManager(filepath=filepath, wait_max=args.wait_max)
+    waits = []
+    for key in keys:
+        start = time.monotonic()
+        with ym as locked_ym:
+            waits.append(time.monotonic() - start)
+            locked_ym.rebase()
+            locked_ym[key] = 1
+            locked_ym.write()
+    return waits
+
+
+def update_attmap(filepath, keys, args):
+    from yacman import YacAttMap
+
+    yam = YacAttMap(filepath=filepath, wait_max=args.wait_max)
+    waits = []
+    for key in keys:
+        start = time.monotonic()
+        with yam as locked_yam:
+            waits.append(time.monotonic() - start)
+            locked_yam.update({key: 1})
+    return waits
+
+
+UPDATERS = {
+    "future": update_future,
+    "yacman1": update_yacman1,
+    "attmap": update_attmap,
+}
+
+
+def worker(backend, filepath, process_id, args, start, results):
+    keys = [f"p{process_id}_u{update}" for update in range(args.updates)]
+    start.wait()
+    try:
+        results.put((process_id, UPDATERS[backend](filepath, keys, args), None))
+    except Exception as e:
+        results.put((process_id, [], f"{e.__class__.__name__}: {e}"))
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(int(len(values) * p / 100), len(values) - 1)], 6)
+
+
+def run_backend(backend, args):
+    """
+    Run the benchmark for one config manager class
+
+    :param str backend: name of the backend
+    :param argparse.Namespace args: benchmark settings
+    :return dict: report
+    """
+    directory = tempfile.mkdtemp(prefix=f"yacman-bench-{backend}-")
+    filepath = os.path.join(directory, "bench.yaml")
+    with open(filepath, "w") as f:
+        f.write("{}\n")
+    # spawn, so that every worker has its own process ID in the lock file names
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=worker, args=(backend, filepath, i, args, start, results)
+        )
+        for i in range(args.processes)
+    ]
+    for p in processes:
+        p.start()
+    t0 = time.monotonic()
+    start.set()
+    waits, errors = [], []
+    for _ in processes:
+        _, process_waits, error = results.get()
+        waits.extend(process_waits)
+        if error is not None:
+            errors.append(error)
+    elapsed = time.monotonic() - t0
+    for p in processes:
+        p.join()
+
+    with open(filepath, "r") as f:
+        contents = yaml.safe_load(f) or {}
+    expected = {
+        f"p{i}_u{u}" for i in range(args.processes) for u in range(args.updates)
+    }
+    leftovers = sorted(f for f in os.listdir(directory) if f.startswith("lock"))
+    if not args.keep:
+        shutil.rmtree(directory)
+    return {
+        "backend": backend,
+        "processes": args.processes,
+        "updates_per_process": args.updates,
+        "completed_updates": len(waits),
+        "elapsed_s": round(elapsed, 4),
+        "ops_per_s": round(len(waits) / elapsed, 2) if elapsed else None,
+        "wait_s": {
+            "p50": percentile(waits, 50),
+            "p90": percentile(waits, 90),
+            "p99": percentile(waits, 99),
+            "max": percentile(waits, 100),
+        },
+        "lost_updates": len(expected - set(contents)),
+        "leftover_lock_files": leftovers,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = ArgumentParser(description="Multi-process lock benchmark")
+    parser.add_argument("-n", "--processes", type=int, default=8, help="processes")
+    parser.add_argument(
+        "-m", "--updates", type=int, default=10, help="updates per process"
+    )
+    parser.add_argument(
+        "-b",
+        "--backend",
+        choices=BACKENDS,
+        action="append",
+        help="config manager class to benchmark; may be repeated, defaults to all",
+    )
+    parser.add_argument("-w", "--wait-max", type=int, default=60, help="max wait")
+    parser.add_argument(
+        "--lock-policy",
+        default="reader",
+        choices=["reader", "writer", "fair"],
+        help="lock policy of the future backend",
+    )
+    parser.add_argument(
+        "--mvcc", action="store_true", help="use MVCC storage in the future backend"
+    )
+    parser.add_argument("-o", "--output", help="path to write the JSON report to")
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the benchmark files for inspection"
+    )
+    args = parser.parse_args()
+
+    from yacman import __version__
+
+    report = {
+        "yacman_version": __version__,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "lock_policy": args.lock_policy,
+            "mvcc": args.mvcc,
+            "wait_max": args.wait_max,
+        },
+        "results": [run_backend(b, args) for b in args.backend or BACKENDS],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    failed = any(
+        r["lost_updates"] or r["leftover_lock_files"] or r["errors"]
+        for r in report["results"]
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Compare the lock policies under contention.
+
+Reader and writer processes lock the same file in a loop for a while, and
+the time each of them waited for the lock is recorded. Reports the p50, p99
+and max wait per role, for every policy.
+
+    ./lock_policy_benchmark.py --readers 8 --writers 2 --duration 5
+"""
+
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from yacman import (
+    FAIR,
+    READER_PREFERRING,
+    WRITER_PREFERRING,
+    ConfigLocker,
+    LockTimeoutError,
+)
+
+POLICIES = [READER_PREFERRING, WRITER_PREFERRING, FAIR]
+
+
+def worker(filepath, policy, role, duration, hold, start, results):
+    locker = ConfigLocker(filepath, wait_max=duration, policy=policy)
+    lock = getattr(locker, f"{role}_lock")
+    unlock = getattr(locker, f"{role}_unlock")
+    waits = []
+    timeouts = 0
+    start.wait()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        t0 = time.monotonic()
+        try:
+            lock()
+        except LockTimeoutError:
+            # starved for a whole run
+            timeouts += 1
+            waits.append(time.monotonic() - t0)
+            continue
+        waits.append(time.monotonic() - t0)
+        time.sleep(hold)
+        unlock()
+    results.put((role, waits, timeouts))
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def run_policy(policy, args):
+    filepath = os.path.join(tempfile.mkdtemp(), "bench.yaml")
+    open(filepath, "w").close()
+    # spawn, so that every worker has its own process ID in the lock file names
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    results = context.Queue()
+    roles = ["read"] * args.readers + ["write"] * args.writers
+    processes = [
+        context.Process(
+            target=worker,
+            args=(filepath, policy, role, args.duration, args.hold, start, results),
+        )
+        for role in roles
+    ]
+    for p in processes:
+        p.start()
+    start.set()
+    waits = {"read": [], "write": []}
+    timeouts = {"read": 0, "write": 0}
+    for _ in processes:
+        role, role_waits, role_timeouts = results.get()
+        waits[role].extend(role_waits)
+        timeouts[role] += role_timeouts
+    for p in processes:
+        p.join()
+    return {
+        role: {
+            "acquisitions": len(w) - timeouts[role],
+            "timeouts": timeouts[role],
+            "p50_ms": _ms(percentile(w, 50)),
+            "p99_ms": _ms(percentile(w, 99)),
+            "max_ms": _ms(max(w, default=None)),
+        }
+        for role, w in waits.items()
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def main():
+    parser = ArgumentParser(description="Lock policy benchmark")
+    parser.add_argument("--readers", type=int, default=8, help="reader processes")
+    parser.add_argument("--writers", type=int, default=2, help="writer processes")
+    parser.add_argument("--duration", type=float, default=5, help="seconds per run")
+    parser.add_argument(
+        "--hold", type=float, default=0.005, help="seconds each lock is held"
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    report = {policy: run_policy(policy, args) for policy in POLICIES}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    columns = ["acquisitions", "timeouts", "p50_ms", "p99_ms", "max_ms"]
+    print(f"{'policy':<8} {'role':<6}" + "".join(f"{c:>14}" for c in columns))
+    for policy, roles in report.items():
+        for role, stats in roles.items():
+            values = "".join(f"{stats[c]!s:>14}" for c in columns)
+            print(f"{policy:<8} {role:<6}{values}")
+
+
+if __name__ == "__main__":
+    main()
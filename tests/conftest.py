@@ -5,6 +5,10 @@ from glob import glob
 
 import pytest
 
+from yacman import FutureYAMLConfigManager
+
+from .helpers import write_file
+
 
 @pytest.fixture
 def data_path():
@@ -29,3 +33,34 @@ def locked_cfg_file(data_path):
 @pytest.fixture
 def list_locks(data_path):
     return glob(os.path.join(data_path, "lock.*"))
+
+
+@pytest.fixture
+def cfg_text():
+    """Contents of the config file of `cfg_path`, overridden by test modules"""
+    return "key: value\n"
+
+
+@pytest.fixture
+def cfg_path(tmp_path, cfg_text):
+    filepath = str(tmp_path / "conf.yaml")
+    write_file(filepath, cfg_text)
+    return filepath
+
+
+@pytest.fixture
+def manager_data():
+    """Data of the managers of `ym`, overridden by test modules"""
+    return {"key": "value"}
+
+
+@pytest.fixture
+def make_manager():
+    """Class, or factory, of the managers of `ym`, overridden by test modules"""
+    return FutureYAMLConfigManager
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "thread_safe"])
+def ym(request, make_manager, manager_data):
+    """Manager of `manager_data`, in plain and thread-safe mode"""
+    return make_manager(manager_data, thread_safe=request.param)
@@ -0,0 +1,29 @@
+"""Test suite helpers"""
+
+import os
+import time
+
+
+def write_file(filepath, text):
+    with open(filepath, "w") as f:
+        f.write(text)
+
+
+def lock_files(filepath):
+    """List the lock files in the directory of a file, sorted"""
+    directory = os.path.dirname(filepath)
+    return sorted(f for f in os.listdir(directory) if f.startswith("lock"))
+
+
+def wait_until(predicate, timeout=5):
+    """
+    Wait for a condition to hold
+
+    :return bool: whether it held before the timeout
+    """
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
@@ -0,0 +1,252 @@
+import os
+from functools import partial
+
+import pytest
+import yaml
+
+from yacman import AliasedYAMLConfigManager, AliasIndex, read_lock
+from yacman.aliascache import alias_cache_path
+from yacman.exceptions import AliasError, AmbiguousAliasError, UndefinedAliasError
+
+
+def config():
+    return {
+        "d1": {"assets": {"fasta": "hg38.fa"}},
+        "d2": {"assets": {"fasta": "mm10.fa"}},
+    }
+
+
+def aliases():
+    return {"d1": ["hg38", "GRCh38"], "d2": ["mm10"]}
+
+
+@pytest.fixture
+def manager_data():
+    return config()
+
+
+@pytest.fixture
+def make_manager():
+    return partial(AliasedYAMLConfigManager, aliases=aliases())
+
+
+class TestAliasIndex:
+    def test_both_directions(self):
+        index = AliasIndex(aliases())
+        assert index.key("hg38") == "d1"
+        assert index.aliases("d1") == ["hg38", "GRCh38"]
+        assert index.keys_of(["mm10", "x"]) == ["d2", None]
+        assert len(index) == 3
+        assert index.to_dict() == aliases()
+
+    def test_set_and_remove(self):
+        index = AliasIndex(aliases())
+        assert index.set("d2", ["hg38"]) == ([], [])
+        assert index.set("d2", ["hg38"], overwrite=True) == (["hg38"], [])
+        assert index.aliases("d1") == ["GRCh38"]
+        assert index.set("d2", ["m"], reset_key=True) == (["m"], ["mm10", "hg38"])
+        assert index.remove("d1") == ["GRCh38"]
+        assert not index.has_aliases("d1")
+        assert index.to_dict() == {"d2": ["m"]}
+
+
+class TestAliasedManager:
+    def test_access_by_alias(self, ym):
+        assert ym["hg38"] is ym["d1"]
+        assert "GRCh38" in ym and "d2" in ym and "x" not in ym
+        assert ym.get_path("hg38.assets.fasta") == "hg38.fa"
+        assert ym.get_paths(["mm10.assets.fasta", "x.y"]) == ["mm10.fa", None]
+        ym.set_path("hg38.assets.fai", "hg38.fa.fai")
+        assert ym["d1"]["assets"]["fai"] == "hg38.fa.fai"
+        ym["mm10"] = {}
+        assert ym["d2"] == {} and "mm10" not in ym.data
+
+    def test_resolve(self, ym):
+        assert ym.resolve("hg38") == "d1"
+        assert ym.resolve("d2") == "d2"
+        with pytest.raises(KeyError):
+            ym.resolve("x")
+        assert ym.resolve_many(["GRCh38", "d2", "x"]) == ["d1", "d2", None]
+
+    def test_get_aliases_and_key(self, ym):
+        assert ym.get_aliases("d1") == ["hg38", "GRCh38"]
+        assert ym.get_key("mm10") == "d2"
+        with pytest.raises(UndefinedAliasError):
+            ym.get_aliases("x")
+        with pytest.raises(UndefinedAliasError):
+            ym.get_key("x")
+
+    def test_set_and_remove_aliases(self, ym):
+        assert ym.set_aliases("d2", "GRCm39") == (["GRCm39"], [])
+        assert ym.remove_aliases("d1", ["hg38", "x"]) == ["hg38"]
+        assert "hg38" not in ym
+        with pytest.raises(AliasError):
+            ym.set_aliases("d1", 1)
+
+    def test_bulk_aliases(self, ym):
+        result = ym.set_aliases_many({"d1": "h", "d2": ["m"]}, reset_key=True)
+        assert result == {
+            "d1": (["h"], ["hg38", "GRCh38"]),
+            "d2": (["m"], ["mm10"]),
+        }
+        assert ym.remove_aliases_many(["d1", "x"]) == {"d1": ["h"], "x": []}
+        assert ym.aliases == {"d2": ["m"]}
+
+    def test_delete_removes_aliases(self, ym):
+        del ym["hg38"]
+        assert "d1" not in ym.data
+        assert ym.aliases == {"d2": ["mm10"]}
+        with pytest.raises(KeyError):
+            ym["GRCh38"]
+
+    def test_aliases_from_callable(self):
+        ym = AliasedYAMLConfigManager(
+            config(), aliases=lambda x: {k: [k.upper()] for k in x}
+        )
+        assert ym["D2"] is ym["d2"]
+        with pytest.raises(AliasError):
+            AliasedYAMLConfigManager(config(), aliases=lambda: {}, aliases_strict=True)
+
+    def test_exact(self):
+        ym = AliasedYAMLConfigManager(config(), aliases=aliases(), exact=True)
+        assert "hg38" not in ym
+
+    def test_aliases_kept_on_reload(self, tmp_path):
+        filepath = str(tmp_path / "conf.yaml")
+        with open(filepath, "w") as f:
+            f.write("d1: 1\n")
+        ym = AliasedYAMLConfigManager.from_yaml_file(filepath, aliases=aliases())
+        with open(filepath, "w") as f:
+            f.write("d1: 2\n")
+        with read_lock(ym) as locked_ym:
+            locked_ym.reset()
+        assert ym["hg38"] == 2
+
+
+class TestPrefixAndFuzzy:
+    def test_resolve_prefix(self, ym):
+        assert ym.resolve_prefix("hg3") == "d1"
+        assert ym.resolve_prefix("GRC") == "d1"
+        assert ym.resolve_prefix("mm") == "d2"
+        # exact names win over longer ones
+        assert ym.resolve_prefix("d1") == "d1"
+        with pytest.raises(AmbiguousAliasError) as e:
+            ym.resolve_prefix("d")
+        assert e.value.candidates == ["d1", "d2"]
+        with pytest.raises(UndefinedAliasError):
+            ym.resolve_prefix("x")
+
+    def test_index_follows_changes(self, ym):
+        ym["hg19"] = {}
+        assert ym.complete("hg") == ["hg19", "hg38"]
+        with pytest.raises(AmbiguousAliasError):
+            ym.resolve_prefix("hg")
+        ym.remove_aliases("d1", "hg38")
+        assert ym.resolve_prefix("hg") == "hg19"
+        ym.set_aliases("d2", "hg18")
+        del ym["hg19"]
+        assert ym.resolve_prefix("hg") == "d2"
+        ym.update({"mm39": {}})
+        assert ym.complete("mm") == ["mm10", "mm39"]
+
+    def test_suggest(self, ym):
+        assert ym.suggest("hg83") == []
+        assert ym.suggest("hg83", max_distance=2) == [("hg38", "d1", 2)]
+        assert ym.suggest("GRCh37") == [("GRCh38", "d1", 1)]
+        assert ym.suggest("mm10") == [("mm10", "d2", 0)]
+        assert ym.suggest("zzzzz") == []
+
+    def test_suggest_matches_brute_force(self):
+        names = [f"{a}{b}{c}" for a in "abc" for b in "abcd" for c in ["", "x", "yy"]]
+        index = AliasIndex({"k": names})
+
+        def distance(a, b):
+            row = list(range(len(b) + 1))
+            for i, ca in enumerate(a, 1):
+                new = [i]
+                for j, cb in enumerate(b, 1):
+                    new.append(min(row[j] + 1, new[j - 1] + 1, row[j - 1] + (ca != cb)))
+                row = new
+            return row[-1]
+
+        for query in ["ab", "bxy", "cdyy", "x", "aaaa"]:
+            for max_distance in (0, 1, 2):
+                expected = sorted(
+                    (distance(n, query), n)
+                    for n in names
+                    if distance(n, query) <= max_distance
+                )
+                suggestions = index.suggest(query, max_distance)
+                assert [(d, n) for n, _, d in suggestions] == expected
+
+
+@pytest.fixture
+def cfg_text():
+    return yaml.safe_dump(config())
+
+
+class TestAliasCache:
+    @staticmethod
+    def counting(calls):
+        def upper_aliases(x):
+            calls.append(1)
+            return {k: [k.upper()] for k in x}
+
+        return upper_aliases
+
+    def test_built_on_first_miss_and_reused(self, cfg_path):
+        calls = []
+        ym = AliasedYAMLConfigManager.from_yaml_file(
+            cfg_path, aliases=self.counting(calls), alias_cache=True
+        )
+        assert ym["d1"] and "d2" in ym and not calls
+        assert ym["D1"] is ym["d1"]
+        assert len(calls) == 1 and os.path.exists(alias_cache_path(cfg_path))
+        ym = AliasedYAMLConfigManager.from_yaml_file(
+            cfg_path, aliases=self.counting(calls), alias_cache=True
+        )
+        assert ym.resolve("D2") == "d2" and ym.complete("d") == ["d1", "d2"]
+        assert len(calls) == 1
+
+    def test_rebuilt_when_config_changes(self, cfg_path):
+        calls = []
+        AliasedYAMLConfigManager.from_yaml_file(
+            cfg_path, aliases=self.counting(calls), alias_cache=True
+        ).resolve("D1")
+        with open(cfg_path, "a") as f:
+            f.write("d3: {}\n")
+        ym = AliasedYAMLConfigManager.from_yaml_file(
+            cfg_path, aliases=self.counting(calls), alias_cache=True
+        )
+        assert ym.resolve("D3") == "d3" and len(calls) == 2
+
+    def test_rebuilt_when_aliases_change(self, cfg_path):
+        sidecar = os.path.join(os.path.dirname(cfg_path), "aliases.pickle")
+        for source in (aliases(), {"d1": ["hg19"]}):
+            ym = AliasedYAMLConfigManager.from_yaml_file(
+                cfg_path, aliases=source, alias_cache=sidecar
+            )
+            assert ym.aliases == source
+        assert os.path.exists(sidecar)
+
+    def test_unreadable_sidecar(self, cfg_path):
+        with open(alias_cache_path(cfg_path), "w") as f:
+            f.write("garbage")
+        ym = AliasedYAMLConfigManager.from_yaml_file(
+            cfg_path, aliases=aliases(), alias_cache=True
+        )
+        assert ym["hg38"] is ym["d1"]
+
+    def test_changes_before_first_miss(self, cfg_path):
+        calls = []
+        ym = AliasedYAMLConfigManager.from_yaml_file(
+            cfg_path, aliases=self.counting(calls), alias_cache=True
+        )
+        ym["d3"] = {}
+        # the aliases are those of the data as loaded
+        assert ym.resolve_many(["D1", "D3"]) == ["d1", None]
+        assert ym.complete("d") == ["d1", "d2", "d3"]
+
+    def test_without_file(self):
+        ym = AliasedYAMLConfigManager(config(), aliases=aliases(), alias_cache=True)
+        assert ym["mm10"] is ym["d2"]
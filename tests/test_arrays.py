@@ -0,0 +1,111 @@
+from array import array
+
+import pytest
+import yaml
+
+from yacman import FutureYAMLConfigManager, read_lock, write_lock
+from yacman.arrays import array_loader, as_numpy
+
+LENGTHS = [248956422 - i for i in range(10)]
+BINS = [i / 4 for i in range(10)]
+
+
+def config_text():
+    return yaml.safe_dump(
+        {
+            "lengths": LENGTHS,
+            "bins": BINS,
+            "short": [1, 2],
+            "mixed": [1, 2.5] * 5,
+            "bools": [True] * 10,
+            "huge": [2**70] * 10,
+            "names": [f"chr{i}" for i in range(10)],
+        }
+    )
+
+
+@pytest.fixture
+def cfg_text():
+    return config_text()
+
+
+class TestArrayLoader:
+    def test_numeric_sequences_are_packed(self):
+        data = yaml.load(config_text(), array_loader(5))
+        assert data["lengths"] == array("q", LENGTHS)
+        assert data["bins"] == array("d", BINS)
+        for key in ("short", "mixed", "bools", "huge", "names"):
+            assert isinstance(data[key], list)
+
+    def test_no_threshold(self):
+        assert array_loader() is yaml.SafeLoader
+        with pytest.raises(ValueError):
+            array_loader(0)
+
+    def test_as_numpy(self):
+        numpy = pytest.importorskip("numpy")
+        packed = array("q", LENGTHS)
+        view = as_numpy(packed)
+        assert view.dtype == numpy.int64
+        view[0] = 1
+        assert packed[0] == 1
+
+
+class TestArrayManager:
+    def test_to_yaml_unchanged(self):
+        ym = FutureYAMLConfigManager.from_yaml_data(config_text(), array_threshold=5)
+        assert isinstance(ym["lengths"], array)
+        assert (
+            ym.to_yaml()
+            == FutureYAMLConfigManager.from_yaml_data(config_text()).to_yaml()
+        )
+
+    def test_write_unchanged(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path, array_threshold=5)
+        ym.set_path("lengths.0", 1)
+        with write_lock(ym) as locked_ym:
+            locked_ym.write()
+        with open(cfg_path) as f:
+            written = yaml.safe_load(f)
+        assert written["lengths"] == [1] + LENGTHS[1:]
+        assert written["bins"] == BINS
+        assert ym.get_path("lengths.1") == LENGTHS[1]
+
+    def test_rebase_merges_arrays(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path, array_threshold=5)
+        # the base is not changed with the data
+        ym["bins"][0] = 10.0
+        other = FutureYAMLConfigManager.from_yaml_file(cfg_path, array_threshold=5)
+        other["lengths"] = array("q", range(5))
+        with write_lock(other) as locked_other:
+            locked_other.write()
+        with read_lock(ym) as locked_ym:
+            locked_ym.rebase()
+        assert ym.conflicts == []
+        assert ym["lengths"] == array("q", range(5))
+        assert ym["bins"][0] == 10.0
+
+    def test_schema_validation(self, tmp_path, cfg_path):
+        schema = str(tmp_path / "schema.yaml")
+        with open(schema, "w") as f:
+            yaml.safe_dump(
+                {
+                    "type": "object",
+                    "properties": {
+                        "lengths": {"type": "array", "items": {"type": "integer"}}
+                    },
+                },
+                f,
+            )
+        ym = FutureYAMLConfigManager.from_yaml_file(
+            cfg_path, array_threshold=5, schema_source=schema
+        )
+        assert isinstance(ym["lengths"], array)
+
+    def test_frozen_arrays(self):
+        ym = FutureYAMLConfigManager.from_yaml_data(
+            config_text(), array_threshold=5, ownership="frozen"
+        )
+        assert ym["bins"] == BINS
+        with pytest.raises(TypeError):
+            ym["bins"][0] = 1.0
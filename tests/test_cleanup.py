@@ -0,0 +1,103 @@
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from yacman import (
+    FutureYAMLConfigManager,
+    YAMLConfigManager,
+    held_lock_files,
+    release_all_locks,
+    write_lock,
+)
+from yacman.cleanup import _handle_signal
+
+from .helpers import lock_files
+
+
+@pytest.fixture
+def cfg_text():
+    return "a: 1\n"
+
+
+class TestLockRegistry:
+    def test_held_locks_are_registered(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        with write_lock(ym):
+            held = held_lock_files()
+            assert held
+            assert all(os.path.exists(p) for p in held)
+        assert not held_lock_files()
+
+    def test_release_all_locks(self, cfg_path):
+        ym = YAMLConfigManager(filepath=cfg_path)
+        ym.lock()
+        assert lock_files(cfg_path)
+        assert release_all_locks()
+        assert not lock_files(cfg_path)
+        assert not held_lock_files()
+
+
+class TestSignals:
+    def test_chains_previous_handler(self, cfg_path):
+        received = []
+        previous = signal.signal(signal.SIGTERM, lambda s, f: received.append(s))
+        try:
+            ym = YAMLConfigManager(filepath=cfg_path)
+            ym.lock()
+            assert signal.getsignal(signal.SIGTERM) is _handle_signal
+            os.kill(os.getpid(), signal.SIGTERM)
+            assert received == [signal.SIGTERM]
+            assert not lock_files(cfg_path)
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+
+    def test_context_manager_keeps_handlers(self, cfg_path):
+        ym = YAMLConfigManager(filepath=cfg_path)
+        with ym:
+            handler = signal.getsignal(signal.SIGINT)
+        with ym:
+            assert signal.getsignal(signal.SIGINT) is handler
+        assert signal.getsignal(signal.SIGINT) is handler
+
+    def test_default_action_after_release(self, cfg_path):
+        script = textwrap.dedent(f"""
+            import os, signal
+            from yacman import YAMLConfigManager
+            ym = YAMLConfigManager(filepath={cfg_path!r})
+            ym.lock()
+            os.kill(os.getpid(), signal.SIGTERM)
+            """)
+        result = subprocess.run([sys.executable, "-c", script])
+        assert result.returncode == -signal.SIGTERM
+        assert not lock_files(cfg_path)
+
+
+class TestExitAndFork:
+    def test_released_at_exit(self, cfg_path):
+        script = textwrap.dedent(f"""
+            from yacman import ConfigLocker
+            ConfigLocker.__del__ = lambda self: None
+            locker = ConfigLocker({cfg_path!r})
+            locker.write_lock()
+            """)
+        subprocess.run([sys.executable, "-c", script], check=True)
+        assert not lock_files(cfg_path)
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+    def test_child_forgets_parent_locks(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        with write_lock(ym):
+            held = held_lock_files()
+            pid = os.fork()
+            if pid == 0:
+                code = 0 if not held_lock_files() else 1
+                release_all_locks()
+                os._exit(code)
+            _, status = os.waitpid(pid, 0)
+            assert os.waitstatus_to_exitcode(status) == 0
+            assert held_lock_files() == held
+            assert all(os.path.exists(p) for p in held)
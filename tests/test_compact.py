@@ -0,0 +1,70 @@
+import os
+
+import pytest
+import yaml
+
+from yacman import CompactYAMLConfigManager, read_lock, write_lock
+
+
+@pytest.fixture
+def cfg_text():
+    return "asset_path: fasta\nseek_keys: {fasta: hg38.fa, fai: hg38.fa.fai}\n"
+
+
+@pytest.fixture
+def schema_path(tmp_path):
+    filepath = str(tmp_path / "schema.yaml")
+    with open(filepath, "w") as f:
+        yaml.safe_dump({"type": "object"}, f)
+    return filepath
+
+
+class TestCompact:
+    def test_no_instance_dict(self):
+        ym = CompactYAMLConfigManager({"a": 1})
+        # all the attributes are in slots
+        assert not vars(ym)
+
+    def test_lazy_locker(self, cfg_path):
+        ym = CompactYAMLConfigManager.from_yaml_file(cfg_path)
+        assert ym._locker is None
+        with write_lock(ym) as locked_ym:
+            locked_ym.set_path("seek_keys.fai", "x")
+            locked_ym.write()
+        assert ym._locker is not None
+        assert CompactYAMLConfigManager.from_yaml_file(cfg_path)["seek_keys"] == {
+            "fasta": "hg38.fa",
+            "fai": "x",
+        }
+
+    def test_staleness_check_needs_no_locker(self, cfg_path, monkeypatch):
+        monkeypatch.chdir(os.path.dirname(cfg_path))
+        ym = CompactYAMLConfigManager.from_yaml_file(os.path.basename(cfg_path))
+        assert not ym.is_stale() and not ym.refresh_if_changed()
+        assert ym._own_file_signature(cfg_path) == ym._file_signature
+        assert ym._locker is None
+
+    def test_base_is_shared_and_rebase_merges(self, cfg_path):
+        ym = CompactYAMLConfigManager.from_yaml_file(cfg_path)
+        assert ym._base is ym.data
+        ym.set_path("seek_keys.fasta", "local.fa")
+        other = CompactYAMLConfigManager.from_yaml_file(cfg_path)
+        with write_lock(other) as locked_other:
+            locked_other.set_path("seek_keys.fai", "remote.fai")
+            locked_other.write()
+        with read_lock(ym) as locked_ym:
+            locked_ym.rebase()
+        assert ym.conflicts == []
+        assert ym["seek_keys"] == {"fasta": "local.fa", "fai": "remote.fai"}
+
+    def test_schemas_are_shared(self, cfg_path, schema_path):
+        a = CompactYAMLConfigManager.from_yaml_file(cfg_path, schema_source=schema_path)
+        b = CompactYAMLConfigManager.from_yaml_file(cfg_path, schema_source=schema_path)
+        assert a.schema is b.schema
+
+    def test_interned_strings(self, cfg_path):
+        a = CompactYAMLConfigManager.from_yaml_file(cfg_path, intern_strings=True)
+        b = CompactYAMLConfigManager.from_yaml_file(cfg_path, intern_strings=True)
+        assert a["asset_path"] is b["asset_path"]
+        assert [id(k) for k in a["seek_keys"]] == [id(k) for k in b["seek_keys"]]
+        assert a.intern_strings
@@ -0,0 +1,158 @@
+import pytest
+
+from yacman import AliasedYacAttMap, FutureYAMLConfigManager, YAMLConfigManager
+from yacman.keypath import get_path, get_paths, parse_key_path, set_path
+
+DATA = {
+    "genomes": {
+        "hg38": {"assets": {"fasta": {"seek_keys": {"fai": "hg38.fa.fai"}}}},
+        "mm10": {"assets": {}},
+    },
+    "servers": ["http://a", "http://b"],
+    "a.b": 1,
+}
+
+
+def nested():
+    return {
+        "genomes": {
+            "hg38": {"assets": {"fasta": {"seek_keys": {"fai": "hg38.fa.fai"}}}},
+            "mm10": {"assets": {}},
+        },
+        "servers": ["http://a", "http://b"],
+        "a.b": 1,
+    }
+
+
+@pytest.fixture
+def manager_data():
+    return nested()
+
+
+class TestParseKeyPath:
+    def test_forms(self):
+        assert parse_key_path("a.b") == ("a", "b")
+        assert parse_key_path(("a.b",)) == ("a.b",)
+        assert parse_key_path(["a", "b"]) == ("a", "b")
+        assert parse_key_path("") == ()
+
+    def test_dotted_paths_are_cached(self):
+        assert parse_key_path("x.y.z") is parse_key_path("x.y.z")
+
+
+class TestGetPath:
+    def test_get(self, ym):
+        assert ym.get_path("genomes.hg38.assets.fasta.seek_keys.fai") == "hg38.fa.fai"
+        assert ym.get_path(("a.b",)) == 1
+        assert ym.get_path("servers.1") == "http://b"
+
+    @pytest.mark.parametrize(
+        "path", ["genomes.rn6", "genomes.hg38.assets.x", "servers.2", "a.b.c"]
+    )
+    def test_missing(self, ym, path):
+        with pytest.raises(KeyError):
+            ym.get_path(path)
+        assert ym.get_path(path, None) is None
+
+    def test_get_paths(self, ym):
+        assert ym.get_paths(
+            [
+                "genomes.hg38.assets.fasta.seek_keys.fai",
+                "genomes.mm10.assets",
+                "genomes.rn6.assets",
+                "genomes.hg38",
+                ("a.b",),
+                "servers.0",
+            ],
+            default="?",
+        ) == [
+            "hg38.fa.fai",
+            {},
+            "?",
+            DATA["genomes"]["hg38"],
+            1,
+            "http://a",
+        ]
+
+
+class TestSetPath:
+    def test_set_creates_parents(self, ym):
+        ym.set_path("genomes.rn6.assets.fasta", "rn6.fa")
+        assert ym["genomes"]["rn6"] == {"assets": {"fasta": "rn6.fa"}}
+        ym.set_path("servers.0", "http://c")
+        assert ym["servers"] == ["http://c", "http://b"]
+
+    def test_no_parent_creation(self, ym):
+        with pytest.raises(KeyError):
+            ym.set_path("genomes.rn6.assets", {}, create_parents=False)
+        assert "rn6" not in ym["genomes"]
+
+    def test_scalar_parent(self, ym):
+        with pytest.raises(TypeError):
+            ym.set_path(("a.b", "c"), 1)
+
+    def test_del(self, ym):
+        ym.del_path("genomes.hg38.assets.fasta")
+        assert ym["genomes"]["hg38"]["assets"] == {}
+        ym.del_path("genomes")
+        assert "genomes" not in ym
+        with pytest.raises(KeyError):
+            ym.del_path("genomes.mm10")
+        with pytest.raises(KeyError):
+            ym.del_path("")
+
+
+class TestSharing:
+    def test_get_paths_share_prefixes(self):
+        class CountingDict(dict):
+            lookups = 0
+
+            def __getitem__(self, key):
+                CountingDict.lookups += 1
+                return super().__getitem__(key)
+
+        data = CountingDict(g=CountingDict(a=1, b=2, c=3))
+        assert get_paths(data, ["g.a", "g.b", "g.c"]) == [1, 2, 3]
+        assert CountingDict.lookups == 4
+
+    def test_thread_safe_changes_are_copy_on_write(self):
+        ym = FutureYAMLConfigManager(nested(), thread_safe=True)
+        data = ym.data
+        ym.set_path("genomes.hg38.assets.fasta.seek_keys.fai", "x")
+        ym.del_path("genomes.mm10")
+        assert data == DATA
+        assert ym["genomes"] == {
+            "hg38": {"assets": {"fasta": {"seek_keys": {"fai": "x"}}}}
+        }
+
+
+class Yacman1:
+    """Run the tests on a manager of the original API"""
+
+    @pytest.fixture
+    def ym(self, manager_data):
+        return YAMLConfigManager(entries=manager_data)
+
+
+class TestGetPathYacman1(Yacman1, TestGetPath):
+    pass
+
+
+class TestSetPathYacman1(Yacman1, TestSetPath):
+    pass
+
+
+class TestAliases:
+    def test_aliases_resolved_at_every_level(self):
+        aliases = {"hg38": ["human"], "mm10": ["mouse"]}
+        genomes = AliasedYacAttMap(
+            entries=nested()["genomes"], aliases=lambda x: aliases
+        )
+        data = {"genomes": genomes}
+        assert get_path(data, "genomes.human.assets.fasta.seek_keys.fai") == (
+            "hg38.fa.fai"
+        )
+        mouse, rat = get_paths(data, ["genomes.mouse.assets", "genomes.rat"])
+        assert len(mouse) == 0 and rat is None
+        set_path(data, "genomes.human.assets.bowtie2", "idx")
+        assert "bowtie2" in genomes["hg38"]["assets"]
@@ -0,0 +1,435 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from ubiquerg import READ, WRITE
+
+from yacman import (
+    FAIR,
+    READER_PREFERRING,
+    WRITER_PREFERRING,
+    ConfigLocker,
+    FutureYAMLConfigManager,
+    LockTimeoutError,
+    lock_queue,
+    read_lock,
+    upgradable_read_lock,
+    write_lock,
+)
+
+from .helpers import lock_files, wait_until
+
+
+@pytest.fixture
+def genomes_file(tmp_path):
+    filepath = str(tmp_path / "genomes.yaml")
+    with open(filepath, "w") as f:
+        f.write("genomes:\n  hg38:\n    assets: {}\n  mm10:\n    assets: {}\n")
+    return filepath
+
+
+def queue_ticket(filepath, ticket, role, pid=None, contents=""):
+    base, name = os.path.split(filepath)
+    ticket_path = os.path.join(
+        base, f"lock-queue-{ticket:012d}-{role}-{pid or os.getpid()}-{name}"
+    )
+    with open(ticket_path, "w") as f:
+        f.write(contents)
+    return ticket_path
+
+
+class TestKeyPathLocks:
+    def test_disjoint_key_paths_can_be_locked_concurrently(self, genomes_file):
+        ym1 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=1)
+        ym2 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=1)
+        with write_lock(ym1, path="genomes.hg38"):
+            with write_lock(ym2, path="genomes.mm10"):
+                assert ym1.locker.locked[WRITE]
+                assert ym2.locker.locked[WRITE]
+        assert lock_files(genomes_file) == []
+
+    @pytest.mark.parametrize("path", ["genomes", "genomes.hg38", "genomes.hg38.x"])
+    def test_overlapping_key_paths_conflict(self, genomes_file, path):
+        ym1 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=1)
+        ym2 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=0.1)
+        with write_lock(ym1, path="genomes.hg38"):
+            with pytest.raises(LockTimeoutError):
+                with write_lock(ym2, path=path):
+                    pass
+
+    def test_overlapping_read_locks_do_not_conflict(self, genomes_file):
+        ym1 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=0.1)
+        ym2 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=0.1)
+        with read_lock(ym1, path="genomes"):
+            with read_lock(ym2, path=("genomes", "hg38")):
+                assert ym2.locker.locked[READ]
+
+    def test_file_write_lock_waits_for_key_path_locks(self, genomes_file):
+        ym1 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=1)
+        ym2 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=0.1)
+        with write_lock(ym1, path="genomes.hg38"):
+            with pytest.raises(LockTimeoutError):
+                with write_lock(ym2):
+                    pass
+
+    def test_key_path_lock_waits_for_file_write_lock(self, genomes_file):
+        ym1 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=1)
+        ym2 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=0.1)
+        with write_lock(ym1):
+            with pytest.raises(LockTimeoutError):
+                with read_lock(ym2, path="genomes.mm10"):
+                    pass
+
+    def test_key_path_lock_does_not_wait_for_commit_lock(self, genomes_file):
+        ym1 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=1)
+        ym2 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=0.1)
+        with write_lock(ym1, path="genomes.hg38"), ym1.locker.commit_lock():
+            with write_lock(ym2, path="genomes.mm10"):
+                assert ym2.locker.locked[WRITE]
+
+    def test_file_write_lock_waits_for_commit_lock(self, genomes_file):
+        locker = ConfigLocker(genomes_file, wait_max=1)
+        with locker.commit_lock():
+            with pytest.raises(LockTimeoutError):
+                ConfigLocker(genomes_file, wait_max=0.1).write_lock()
+        assert lock_files(genomes_file) == []
+
+    def test_commit_locks_are_served_in_order(self, genomes_file):
+        ticket_path = queue_ticket(genomes_file, 1, "commit")
+        locker = ConfigLocker(genomes_file, wait_max=0.1)
+        with pytest.raises(LockTimeoutError):
+            with locker.commit_lock():
+                pass
+        os.remove(ticket_path)
+        with locker.commit_lock():
+            pass
+        assert lock_files(genomes_file) == []
+
+    @pytest.mark.parametrize(
+        ["queued", "waits"],
+        [(["genomes", "hg38"], True), (["genomes", "mm10"], False)],
+    )
+    def test_key_path_lock_waits_for_conflicting_waiters(
+        self, genomes_file, queued, waits
+    ):
+        entry = json.dumps({"mode": "write", "path": queued})
+        ticket_path = queue_ticket(genomes_file, 1, "key", contents=entry)
+        locker = ConfigLocker(genomes_file, wait_max=0.1)
+        if waits:
+            with pytest.raises(LockTimeoutError):
+                locker.key_path_lock("genomes.hg38")
+        else:
+            locker.key_path_lock("genomes.hg38")
+            locker.key_path_unlock()
+        os.remove(ticket_path)
+        assert lock_files(genomes_file) == []
+
+    def test_disjoint_writers_all_commit(self, genomes_file):
+        errors = []
+
+        def _write(genome):
+            ym = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=10)
+            try:
+                for i in range(10):
+                    with write_lock(ym, path=("genomes", genome)) as locked_ym:
+                        locked_ym["genomes"][genome]["assets"][f"a{i}"] = i
+                        locked_ym.write()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=_write, args=(g,)) for g in ("hg38", "mm10")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        genomes = FutureYAMLConfigManager.from_yaml_file(genomes_file)["genomes"]
+        for genome in ("hg38", "mm10"):
+            assert genomes[genome]["assets"] == {f"a{i}": i for i in range(10)}
+        assert lock_files(genomes_file) == []
+
+    def test_disjoint_writes_are_merged(self, genomes_file):
+        ym1 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=1)
+        ym2 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=1)
+        with write_lock(ym1, path="genomes.hg38") as locked_ym1:
+            with write_lock(ym2, path="genomes.mm10") as locked_ym2:
+                locked_ym1["genomes"]["hg38"]["assets"]["fasta"] = "hg38.fa"
+                locked_ym2["genomes"]["mm10"]["assets"]["fasta"] = "mm10.fa"
+                locked_ym2["other"] = "not written"
+                locked_ym1.write()
+                locked_ym2.write()
+        assert ym2["genomes"]["hg38"]["assets"]["fasta"] == "hg38.fa"
+        ym = FutureYAMLConfigManager.from_yaml_file(genomes_file)
+        assert ym["genomes"]["hg38"]["assets"] == {"fasta": "hg38.fa"}
+        assert ym["genomes"]["mm10"]["assets"] == {"fasta": "mm10.fa"}
+        assert "other" not in ym
+
+    def test_write_removes_deleted_key_path(self, genomes_file):
+        ym = FutureYAMLConfigManager.from_yaml_file(genomes_file)
+        with write_lock(ym, path="genomes.mm10") as locked_ym:
+            del locked_ym["genomes"]["mm10"]
+            locked_ym.write()
+        assert list(
+            FutureYAMLConfigManager.from_yaml_file(genomes_file)["genomes"]
+        ) == ["hg38"]
+
+
+class TestLockRegistry:
+    def test_managers_for_the_same_file_share_the_lock(self, genomes_file):
+        ym1 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=0.1)
+        ym2 = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=0.1)
+        with write_lock(ym1):
+            locks = lock_files(genomes_file)
+            with write_lock(ym2) as locked_ym2:
+                locked_ym2.rebase()
+                assert lock_files(genomes_file) == locks
+            assert lock_files(genomes_file) == locks
+            assert ym1.locker.locked[WRITE] and not ym2.locker.locked[WRITE]
+        assert lock_files(genomes_file) == []
+
+    def test_nested_read_lock_in_write_lock(self, genomes_file):
+        ym = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=0.1)
+        with write_lock(ym):
+            with read_lock(ym):
+                FutureYAMLConfigManager.from_yaml_file(genomes_file)
+            assert ym.locker.locked[WRITE]
+            ym.write()
+        assert lock_files(genomes_file) == []
+
+    def test_write_lock_in_read_lock_is_rejected(self, genomes_file):
+        ym = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=0.1)
+        with read_lock(ym):
+            with pytest.raises(RuntimeError):
+                with write_lock(ym):
+                    pass
+        assert lock_files(genomes_file) == []
+
+    def test_other_threads_wait_for_the_writer(self, genomes_file):
+        ym = FutureYAMLConfigManager.from_yaml_file(genomes_file)
+        errors = []
+
+        def _read():
+            try:
+                ConfigLocker(genomes_file, wait_max=0.1).read_lock()
+            except Exception as e:
+                errors.append(e)
+
+        with write_lock(ym):
+            thread = threading.Thread(target=_read)
+            thread.start()
+            thread.join()
+        assert len(errors) == 1 and isinstance(errors[0], LockTimeoutError)
+
+    def test_only_outermost_acquisition_touches_disk(self, genomes_file, monkeypatch):
+        calls = []
+        create_read_lock = ConfigLocker.create_read_lock
+
+        def _counting_create_read_lock(self, *args, **kwargs):
+            calls.append(1)
+            return create_read_lock(self, *args, **kwargs)
+
+        monkeypatch.setattr(
+            ConfigLocker, "create_read_lock", _counting_create_read_lock
+        )
+        lockers = [ConfigLocker(genomes_file) for _ in range(3)]
+        for locker in lockers:
+            locker.read_lock()
+            locker.read_lock()
+        for locker in lockers:
+            locker.read_unlock()
+            locker.read_unlock()
+        assert len(calls) == 1
+        assert lock_files(genomes_file) == []
+
+
+class TestLockPolicies:
+    @pytest.mark.parametrize(
+        ["policy", "role", "ticket", "allowed"],
+        [
+            (READER_PREFERRING, "read", None, True),
+            (READER_PREFERRING, "write", 3, False),
+            (WRITER_PREFERRING, "read", None, False),
+            (WRITER_PREFERRING, "write", 3, False),
+            (WRITER_PREFERRING, "write", 2, True),
+            (FAIR, "read", 3, False),
+            (FAIR, "read", 2, True),
+            (FAIR, "write", 2, False),
+        ],
+    )
+    def test_queue_allows(self, policy, role, ticket, allowed):
+        from yacman.locking import _queue_allows
+
+        queue = [(1, "read"), (2, "write"), (3, "read")]
+        queue = [(t, r) for t, r in queue if t != ticket]
+        assert _queue_allows(policy, role, ticket, queue) == allowed
+
+    def test_unknown_policy(self, genomes_file):
+        with pytest.raises(ValueError):
+            ConfigLocker(genomes_file, policy="random")
+
+    @pytest.mark.parametrize(
+        ["policy", "waits"],
+        [(READER_PREFERRING, False), (WRITER_PREFERRING, True), (FAIR, True)],
+    )
+    def test_readers_and_queued_writers(self, genomes_file, policy, waits):
+        ticket_path = queue_ticket(genomes_file, 1, "write")
+        locker = ConfigLocker(genomes_file, wait_max=0.1, policy=policy)
+        if waits:
+            with pytest.raises(LockTimeoutError):
+                locker.read_lock()
+        else:
+            locker.read_lock()
+            locker.read_unlock()
+        os.remove(ticket_path)
+        assert lock_files(genomes_file) == []
+
+    def test_tickets_of_dead_processes_are_dropped(self, genomes_file):
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        queue_ticket(genomes_file, 1, "write", pid=process.pid)
+        locker = ConfigLocker(genomes_file, wait_max=1, policy=FAIR)
+        locker.read_lock()
+        locker.read_unlock()
+        assert lock_files(genomes_file) == []
+
+    def test_queue_position(self, genomes_file):
+        queue_ticket(genomes_file, 1, "read")
+        queue_ticket(genomes_file, 2, "write")
+        locker = ConfigLocker(genomes_file, wait_max=1, policy=FAIR)
+        locker.ticket = locker._take_ticket("read")
+        assert locker.queue_position == 2
+        assert [w["role"] for w in lock_queue(genomes_file)] == [
+            "read",
+            "write",
+            "read",
+        ]
+
+    @pytest.mark.parametrize(
+        ["policy", "order"],
+        [(READER_PREFERRING, ["read", "write"]), (FAIR, ["write", "read"])],
+    )
+    def test_threads_are_served_by_policy(self, genomes_file, policy, order):
+        holder = ConfigLocker(genomes_file, policy=policy)
+        holder.read_lock()
+        served = []
+
+        def _lock(role):
+            locker = ConfigLocker(genomes_file, wait_max=5, policy=policy)
+            getattr(locker, f"{role}_lock")()
+            served.append(role)
+            getattr(locker, f"{role}_unlock")()
+
+        shared = holder._shared
+        writer = threading.Thread(target=_lock, args=("write",))
+        writer.start()
+        assert wait_until(lambda: len(shared.queue) == 1)
+        reader = threading.Thread(target=_lock, args=("read",))
+        reader.start()
+        assert wait_until(lambda: len(shared.queue) == 2 or served)
+        holder.read_unlock()
+        writer.join()
+        reader.join()
+        assert served == order
+        assert lock_files(genomes_file) == []
+
+
+class TestUpgradableLocks:
+    def test_upgrade_within_the_lock(self, genomes_file):
+        ym = FutureYAMLConfigManager.from_yaml_file(genomes_file)
+        with upgradable_read_lock(ym) as locked_ym:
+            assert locked_ym.locker.locked[READ]
+            assert not locked_ym.locker.locked[WRITE]
+            with write_lock(locked_ym):
+                locked_ym["genomes"]["hg19"] = {"assets": {}}
+                locked_ym.write()
+            assert not locked_ym.locker.locked[WRITE]
+            assert any(f.startswith("lock-upgrade") for f in lock_files(genomes_file))
+        assert lock_files(genomes_file) == []
+        assert "hg19" in FutureYAMLConfigManager.from_yaml_file(genomes_file)["genomes"]
+
+    def test_readers_are_not_blocked(self, genomes_file):
+        ym = FutureYAMLConfigManager.from_yaml_file(genomes_file)
+        errors = []
+
+        def _read():
+            try:
+                locker = ConfigLocker(genomes_file, wait_max=0.1)
+                locker.read_lock()
+                locker.read_unlock()
+            except Exception as e:
+                errors.append(e)
+
+        with upgradable_read_lock(ym):
+            thread = threading.Thread(target=_read)
+            thread.start()
+            thread.join()
+        assert errors == []
+
+    @pytest.mark.parametrize("lock", ["write_lock", "upgradable_lock"])
+    def test_writers_and_upgraders_are_blocked(self, genomes_file, lock):
+        ym = FutureYAMLConfigManager.from_yaml_file(genomes_file)
+        errors = []
+
+        def _lock():
+            try:
+                getattr(ConfigLocker(genomes_file, wait_max=0.1), lock)()
+            except Exception as e:
+                errors.append(e)
+
+        with upgradable_read_lock(ym):
+            thread = threading.Thread(target=_lock)
+            thread.start()
+            thread.join()
+        assert len(errors) == 1 and isinstance(errors[0], LockTimeoutError)
+        assert lock_files(genomes_file) == []
+
+    def test_upgrade_waits_for_readers(self, genomes_file):
+        ym = FutureYAMLConfigManager.from_yaml_file(genomes_file)
+        reader = ConfigLocker(genomes_file)
+        reader_locked = threading.Event()
+        events = []
+
+        def _read():
+            reader.read_lock()
+            reader_locked.set()
+            time.sleep(0.2)
+            events.append("read")
+            reader.read_unlock()
+
+        with upgradable_read_lock(ym):
+            thread = threading.Thread(target=_read)
+            thread.start()
+            reader_locked.wait()
+            with write_lock(ym):
+                events.append("write")
+            thread.join()
+        assert events == ["read", "write"]
+        assert lock_files(genomes_file) == []
+
+    def test_upgrade_times_out_on_readers_of_other_processes(self, genomes_file):
+        ym = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=0.1)
+        base, name = os.path.split(genomes_file)
+        other_read_lock = os.path.join(base, f"lock-read-1-{name}")
+        open(other_read_lock, "w").close()
+        with upgradable_read_lock(ym):
+            with pytest.raises(LockTimeoutError):
+                with write_lock(ym):
+                    pass
+            assert ym.locker.locked[READ]
+        os.remove(other_read_lock)
+        assert lock_files(genomes_file) == []
+
+    def test_stale_upgrade_lock_is_reclaimed(self, genomes_file):
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        base, name = os.path.split(genomes_file)
+        with open(os.path.join(base, f"lock-upgrade-{name}"), "w") as f:
+            f.write(str(process.pid))
+        ym = FutureYAMLConfigManager.from_yaml_file(genomes_file, wait_max=1)
+        with upgradable_read_lock(ym):
+            pass
+        assert lock_files(genomes_file) == []
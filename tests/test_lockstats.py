@@ -0,0 +1,104 @@
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+import ubiquerg
+
+from yacman import (
+    FAIR,
+    ConfigLocker,
+    FutureYAMLConfigManager,
+    LockTimeoutError,
+    read_lock,
+    reset_stats,
+    start_stats_log,
+    start_watchdog,
+    stats,
+    stop_stats_log,
+    stop_watchdog,
+    write_lock,
+)
+from yacman.locking import lock_key
+from yacman.lockstats import Histogram
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    reset_stats()
+    yield
+    stop_watchdog()
+    stop_stats_log()
+    reset_stats()
+
+
+def hold_the_lock_slowly(ym):
+    with write_lock(ym):
+        time.sleep(0.3)
+
+
+class TestLockStats:
+    def test_acquisitions_and_holds(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        with write_lock(ym):
+            with read_lock(ym):
+                pass
+        with write_lock(ym, path="key"):
+            pass
+        file_stats = stats(cfg_path)
+        # from_yaml_file read-locks the file once
+        assert file_stats["acquisitions"] == {"read": 2, "write": 1, "key_path": 1}
+        assert file_stats["hold"]["write"]["count"] == 1
+        assert file_stats["wait"]["read"]["count"] == 2
+        assert list(stats()) == [lock_key(cfg_path)]
+
+    def test_timeouts(self, cfg_path):
+        # a lock held by another process
+        with ubiquerg.write_lock(cfg_path):
+            with pytest.raises(LockTimeoutError):
+                ConfigLocker(cfg_path, wait_max=0.05).write_lock()
+        file_stats = stats(cfg_path)
+        assert file_stats["timeouts"] == {"write": 1}
+        assert file_stats["wait"]["write"]["max"] >= 0.05
+
+    def test_stale_reclaims(self, cfg_path):
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        base, name = os.path.split(cfg_path)
+        ticket = f"lock-queue-{1:012d}-write-{process.pid}-{name}"
+        open(os.path.join(base, ticket), "w").close()
+        locker = ConfigLocker(cfg_path, policy=FAIR)
+        locker.read_lock()
+        locker.read_unlock()
+        assert stats(cfg_path)["stale_reclaims"] == 1
+
+    def test_watchdog_logs_the_holder_stack(self, cfg_path, caplog):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        start_watchdog(threshold=0.05, interval=0.01)
+        with caplog.at_level(logging.WARNING, logger="yacman.lockstats"):
+            hold_the_lock_slowly(ym)
+            stop_watchdog()
+        warnings = [r.getMessage() for r in caplog.records]
+        assert len(warnings) == 1
+        assert "hold_the_lock_slowly" in warnings[0]
+
+    def test_periodic_log(self, cfg_path, caplog):
+        FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        with caplog.at_level(logging.INFO, logger="yacman.lockstats"):
+            start_stats_log(interval=0.01)
+            time.sleep(0.1)
+            stop_stats_log()
+        assert any("acquisitions: read=1" in r.getMessage() for r in caplog.records)
+
+
+class TestHistogram:
+    def test_percentiles(self):
+        h = Histogram()
+        for value in [0.0001] * 98 + [0.2, 3]:
+            h.add(value)
+        assert h.percentile(50) == 0.001
+        assert h.percentile(99) == 0.5
+        assert h.percentile(100) == 3
+        assert h.to_dict()["count"] == 100
@@ -0,0 +1,273 @@
+import os
+import time
+
+import pytest
+import yaml
+
+from yacman import FutureYAMLConfigManager, MergeConflictError, read_lock, write_lock
+from yacman.merge import (
+    APPEND,
+    DELETE,
+    REPLACE,
+    deep_update,
+    load_overlay,
+    three_way_merge,
+    union_by,
+)
+
+from .helpers import write_file
+
+
+@pytest.fixture
+def cfg_text():
+    return "a: 1\nb: 2\nnested:\n  x: 1\n  y: 2\n"
+
+
+def coarse_signature(monkeypatch, changed_ns):
+    """Make every file look last changed at the given time, whatever its changes"""
+
+    def signature(filepath):
+        return 0, 0, os.path.getsize(filepath), changed_ns, changed_ns
+
+    monkeypatch.setattr("yacman.yacman_future.file_signature", signature)
+
+
+class TestDeepUpdate:
+    def test_nested_update(self):
+        old = {"a": 1, "n": {"x": 1, "l": [1]}}
+        new = {"n": {"y": 2, "l": [2]}, "b": {"c": 3}}
+        assert deep_update(old, new) is old
+        assert old == {"a": 1, "n": {"x": 1, "y": 2, "l": [2]}, "b": {"c": 3}}
+        assert old["b"] is not new["b"]
+
+    def test_mapping_replaces_scalar(self):
+        assert deep_update({"a": "x"}, {"a": {"b": 1}}) == {"a": {"b": 1}}
+
+    def test_deep_trees(self):
+        old, new = {}, {}
+        leaf_old, leaf_new = old, new
+        for _ in range(5000):
+            leaf_old = leaf_old.setdefault("k", {})
+            leaf_new = leaf_new.setdefault("k", {})
+        leaf_old["a"] = 1
+        leaf_new["b"] = 2
+        deep_update(old, new)
+        assert leaf_old == {"a": 1, "b": 2}
+
+    def test_delete(self):
+        old = {"a": 1, "n": {"x": 1, "y": 2}}
+        assert deep_update(old, {"a": DELETE, "n": {"x": DELETE}, "z": DELETE}) == {
+            "n": {"y": 2}
+        }
+
+    def test_delete_tag(self):
+        new = load_overlay("n:\n  x: !delete\n")
+        assert deep_update({"n": {"x": 1, "y": 2}}, new) == {"n": {"y": 2}}
+
+    def test_delete_tag_is_only_for_overlays(self):
+        with pytest.raises(yaml.constructor.ConstructorError):
+            yaml.safe_load("x: !delete\n")
+
+    def test_strategies(self):
+        old = {
+            "steps": [1],
+            "pipelines": {"p1": {"steps": ["a"]}, "p2": {"steps": ["b"]}},
+            "n": {"x": 1},
+            "genomes": [{"name": "hg38", "fasta": "a", "size": 1}, {"name": "mm10"}],
+        }
+        new = {
+            "steps": [2],
+            "pipelines": {"p1": {"steps": ["c"]}, "p3": {"steps": ["d"]}},
+            "n": {"y": 2},
+            "genomes": [{"name": "hg38", "fasta": "b"}, {"name": "rn6"}],
+        }
+        result = deep_update(
+            old,
+            new,
+            strategies={
+                "steps": APPEND,
+                "pipelines.*.steps": APPEND,
+                ("n",): REPLACE,
+                "genomes": union_by("name"),
+            },
+        )
+        assert result == {
+            "steps": [1, 2],
+            "pipelines": {
+                "p1": {"steps": ["a", "c"]},
+                "p2": {"steps": ["b"]},
+                "p3": {"steps": ["d"]},
+            },
+            "n": {"y": 2},
+            "genomes": [
+                {"name": "hg38", "fasta": "b", "size": 1},
+                {"name": "mm10"},
+                {"name": "rn6"},
+            ],
+        }
+
+    def test_copy_on_write(self):
+        old = {"a": {"x": 1}, "b": {"y": 1}, "l": [1]}
+        result = deep_update(
+            old, {"a": {"x": 2}, "l": [2]}, strategies={"l": APPEND}, in_place=False
+        )
+        assert result == {"a": {"x": 2}, "b": {"y": 1}, "l": [1, 2]}
+        assert old == {"a": {"x": 1}, "b": {"y": 1}, "l": [1]}
+        assert result["b"] is old["b"]
+
+    def test_invalid_strategy(self):
+        with pytest.raises(TypeError):
+            deep_update({}, {"a": 1}, strategies={"a": "append"})
+
+
+class TestThreeWayMerge:
+    def test_changes_on_one_side(self):
+        base = {"a": 1, "b": 2, "nested": {"x": 1, "y": 2}}
+        theirs = {"a": 1, "b": 3, "nested": {"x": 1, "y": 2}, "c": 4}
+        ours = {"b": 2, "nested": {"x": 10, "y": 2}}
+        merged, conflicts = three_way_merge(base, theirs, ours)
+        assert merged == {"b": 3, "nested": {"x": 10, "y": 2}, "c": 4}
+        assert conflicts == []
+
+    def test_deletions_propagate(self):
+        base = {"a": 1, "nested": {"x": 1, "y": 2}}
+        theirs = {"a": 1, "nested": {"x": 1}}
+        ours = {"nested": {"x": 1, "y": 2}}
+        merged, conflicts = three_way_merge(base, theirs, ours)
+        assert merged == {"nested": {"x": 1}}
+        assert conflicts == []
+
+    @pytest.mark.parametrize(
+        ["strategy", "expected"],
+        [("ours", {"x": 10, "y": 3}), ("theirs", {"x": 20})],
+    )
+    def test_conflicts(self, strategy, expected):
+        base = {"nested": {"x": 1, "y": 2}}
+        theirs = {"nested": {"x": 20}}
+        ours = {"nested": {"x": 10, "y": 3}}
+        merged, conflicts = three_way_merge(base, theirs, ours, strategy)
+        assert sorted(conflicts) == [("nested", "x"), ("nested", "y")]
+        assert merged == {"nested": expected}
+
+    def test_raise(self):
+        with pytest.raises(MergeConflictError) as e:
+            three_way_merge({"a": 1}, {"a": 2}, {"a": 3}, "raise")
+        assert e.value.conflicts == [("a",)]
+        assert "a" in str(e.value)
+
+    def test_same_change_is_no_conflict(self):
+        merged, conflicts = three_way_merge({"a": 1}, {"a": 2, "b": 1}, {"a": 2})
+        assert merged == {"a": 2, "b": 1}
+        assert conflicts == []
+
+    def test_unknown_base_is_two_way(self):
+        merged, conflicts = three_way_merge(None, {"a": 1, "b": 1}, {"a": 2, "c": 3})
+        assert merged == {"a": 2, "b": 1, "c": 3}
+        assert conflicts == [("a",)]
+
+    def test_unchanged_subtrees_are_shared(self):
+        big = {str(i): {"v": i} for i in range(100)}
+        base = {"big": big, "a": 1}
+        theirs = {"big": big, "a": 2}
+        ours = {"big": dict(big), "a": 1}
+        merged, _ = three_way_merge(base, theirs, ours)
+        assert merged["big"] is big
+        assert merged["a"] == 2
+
+    def test_inputs_are_not_modified(self):
+        base = {"n": {"x": 1}}
+        theirs = {"n": {"x": 1, "y": 2}}
+        ours = {"n": {"x": 3}}
+        merged, _ = three_way_merge(base, theirs, ours)
+        assert merged == {"n": {"x": 3, "y": 2}}
+        assert theirs == {"n": {"x": 1, "y": 2}}
+        assert ours == {"n": {"x": 3}}
+
+    def test_unknown_strategy(self):
+        with pytest.raises(ValueError):
+            three_way_merge({}, {}, {}, "mine")
+
+
+class TestRebase:
+    def test_concurrent_changes_are_kept(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        other = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        with write_lock(other) as locked_other:
+            del locked_other["b"]
+            locked_other["nested"]["y"] = 20
+            locked_other.write()
+        with write_lock(ym) as locked_ym:
+            del locked_ym["a"]
+            locked_ym["nested"]["x"] = 10
+            locked_ym.rebase()
+            locked_ym.write()
+        assert ym.conflicts == []
+        result = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        assert result.data == {"nested": {"x": 10, "y": 20}}
+
+    @pytest.mark.parametrize(["strategy", "expected"], [("ours", 10), ("theirs", 20)])
+    def test_conflict_strategies(self, cfg_path, strategy, expected):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path, merge_strategy=strategy)
+        ym["a"] = 10
+        write_file(cfg_path, "a: 20\nb: 2\n")
+        with read_lock(ym) as locked_ym:
+            locked_ym.rebase()
+        assert ym.conflicts == [("a",)]
+        assert ym["a"] == expected
+        assert "nested" not in ym
+
+    def test_raise_leaves_object_unchanged(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        ym["a"] = 10
+        write_file(cfg_path, "a: 20\n")
+        with read_lock(ym) as locked_ym:
+            with pytest.raises(MergeConflictError):
+                locked_ym.rebase(strategy="raise")
+        assert ym["a"] == 10
+        assert ym["b"] == 2
+
+    def test_unchanged_file_is_not_read(self, cfg_path, monkeypatch):
+        # last changed long before it is loaded
+        coarse_signature(monkeypatch, time.time_ns() - 10**10)
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        ym["a"] = 10
+        monkeypatch.setattr("yacman.yacman_future.load_yaml", None)
+        with read_lock(ym) as locked_ym:
+            locked_ym.rebase()
+        assert ym["a"] == 10
+
+    def test_racily_clean_file_is_read(self, cfg_path, monkeypatch):
+        # the modification time does not tick between the two writes
+        coarse_signature(monkeypatch, time.time_ns())
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        ym["nested"]["x"] = 10
+        write_file(cfg_path, "a: 3\nb: 2\nnested:\n  x: 1\n  y: 2\n")
+        with read_lock(ym) as locked_ym:
+            locked_ym.rebase()
+        assert ym["a"] == 3
+        assert ym["nested"]["x"] == 10
+
+    def test_base_follows_writes(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        with write_lock(ym) as locked_ym:
+            locked_ym["a"] = 10
+            locked_ym.write()
+        write_file(cfg_path, "a: 10\nb: 3\n")
+        with read_lock(ym) as locked_ym:
+            locked_ym.rebase()
+        assert ym.conflicts == []
+        assert ym.data == {"a": 10, "b": 3}
+
+    def test_base_is_not_changed_in_place(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        ym["nested"]["x"] = 10
+        assert ym._merge_base()["nested"] == {"x": 1, "y": 2}
+        write_file(cfg_path, "a: 1\nb: 2\nnested:\n  x: 1\n  y: 20\n")
+        with read_lock(ym) as locked_ym:
+            locked_ym.rebase()
+        assert ym.conflicts == []
+        assert ym["nested"] == {"x": 10, "y": 20}
+
+    def test_unknown_strategy(self):
+        with pytest.raises(ValueError):
+            FutureYAMLConfigManager({}, merge_strategy="mine")
@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from yacman import FutureYAMLConfigManager, read_lock, write_lock
+from yacman.mvcc import is_versioned, list_versions, publish_version
+
+
+def write_value(filepath, value, **kwargs):
+    ym = FutureYAMLConfigManager.from_yaml_file(filepath, mvcc=True, **kwargs)
+    with write_lock(ym) as locked_ym:
+        locked_ym.rebase()
+        locked_ym["key"] = value
+        locked_ym.write()
+
+
+class TestMVCC:
+    def test_write_publishes_versions(self, cfg_path):
+        write_value(cfg_path, "v1")
+        write_value(cfg_path, "v2")
+        assert is_versioned(cfg_path)
+        assert [v for v, _ in list_versions(cfg_path)] == [1, 2]
+        assert FutureYAMLConfigManager.from_yaml_file(cfg_path)["key"] == "v2"
+
+    def test_versions_are_immutable(self, cfg_path):
+        write_value(cfg_path, "v1")
+        first = os.path.realpath(cfg_path)
+        # a manager that is not in MVCC mode must not write through the link
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        with write_lock(ym) as locked_ym:
+            locked_ym["key"] = "v2"
+            locked_ym.write()
+        with open(first) as f:
+            assert f.read() == "key: v1\n"
+        assert os.path.realpath(cfg_path) != first
+
+    def test_readers_do_not_wait_for_writers(self, cfg_path):
+        writer = FutureYAMLConfigManager.from_yaml_file(cfg_path, mvcc=True)
+        with write_lock(writer) as locked_writer:
+            locked_writer["key"] = "new"
+            locked_writer.write()
+            reader = FutureYAMLConfigManager.from_yaml_file(
+                cfg_path, mvcc=True, wait_max=0.1
+            )
+            with read_lock(reader) as locked_reader:
+                locked_reader.rebase()
+            assert reader["key"] == "new"
+
+    def test_readers_do_not_wait_for_writer_threads(self, cfg_path):
+        write_value(cfg_path, "old")
+        locked, done = threading.Event(), threading.Event()
+
+        def _write():
+            writer = FutureYAMLConfigManager.from_yaml_file(cfg_path, mvcc=True)
+            with write_lock(writer) as locked_writer:
+                locked_writer["key"] = "new"
+                locked_writer.write()
+                locked.set()
+                done.wait(5)
+
+        thread = threading.Thread(target=_write)
+        thread.start()
+        try:
+            assert locked.wait(5)
+            reader = FutureYAMLConfigManager.from_yaml_file(
+                cfg_path, mvcc=True, wait_max=0.1
+            )
+            with read_lock(reader) as locked_reader:
+                locked_reader.rebase()
+            assert reader["key"] == "new"
+        finally:
+            done.set()
+            thread.join()
+
+    def test_readers_do_not_wait_for_writer_processes(self, cfg_path):
+        write_value(cfg_path, "old")
+        script = (
+            "import sys\n"
+            "from yacman import FutureYAMLConfigManager, write_lock\n"
+            f"ym = FutureYAMLConfigManager.from_yaml_file({cfg_path!r}, mvcc=True)\n"
+            "with write_lock(ym) as locked_ym:\n"
+            "    locked_ym['key'] = 'new'\n"
+            "    locked_ym.write()\n"
+            "    print('locked', flush=True)\n"
+            "    sys.stdin.readline()\n"
+        )
+        process = subprocess.Popen(
+            [sys.executable, "-c", script],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            assert process.stdout.readline() == "locked\n"
+            reader = FutureYAMLConfigManager.from_yaml_file(
+                cfg_path, mvcc=True, wait_max=0.1
+            )
+            with read_lock(reader) as locked_reader:
+                locked_reader.rebase()
+            assert reader["key"] == "new"
+        finally:
+            process.communicate("\n", timeout=10)
+        assert process.returncode == 0
+
+    def test_superseded_versions_are_collected(self, cfg_path):
+        for i in range(3):
+            write_value(cfg_path, i, mvcc_grace_period=0)
+        time.sleep(0.01)
+        write_value(cfg_path, 3, mvcc_grace_period=0)
+        assert [v for v, _ in list_versions(cfg_path)] == [4]
+
+    def test_grace_period_keeps_recent_versions(self, cfg_path):
+        for i in range(3):
+            publish_version(cfg_path, f"key: {i}\n", grace_period=60)
+        assert len(list_versions(cfg_path)) == 3
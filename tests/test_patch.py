@@ -0,0 +1,108 @@
+import pytest
+
+from yacman import FutureYAMLConfigManager, JSONPatchError, apply_patch, diff
+
+
+def roundtrip(a, b):
+    ops = diff(a, b)
+    assert apply_patch(a, ops) == b
+    return ops
+
+
+class TestDiff:
+    def test_identical(self):
+        data = {"a": {"b": [1, 2]}}
+        assert diff(data, data) == []
+        assert diff(data, {"a": {"b": [1, 2]}}) == []
+
+    def test_nested_changes(self):
+        a = {"a": 1, "n": {"x": 1, "y": 2}, "gone": True}
+        b = {"a": 1, "n": {"x": 10, "y": 2, "z": 3}}
+        assert roundtrip(a, b) == [
+            {"op": "replace", "path": "/n/x", "value": 10},
+            {"op": "add", "path": "/n/z", "value": 3},
+            {"op": "remove", "path": "/gone"},
+        ]
+
+    def test_lists(self):
+        assert roundtrip({"l": [1, 2, 3, 4]}, {"l": [1, 5]}) == [
+            {"op": "replace", "path": "/l/1", "value": 5},
+            {"op": "remove", "path": "/l/3"},
+            {"op": "remove", "path": "/l/2"},
+        ]
+        assert roundtrip({"l": [1]}, {"l": [1, {"a": 1}, 3]}) == [
+            {"op": "add", "path": "/l/-", "value": {"a": 1}},
+            {"op": "add", "path": "/l/-", "value": 3},
+        ]
+
+    def test_escaped_keys(self):
+        ops = roundtrip({"a/b": 1, "c~d": 1}, {"a/b": 2, "c~d": 2})
+        assert [op["path"] for op in ops] == ["/a~1b", "/c~0d"]
+
+    def test_type_change(self):
+        assert roundtrip({"a": 1}, {"a": "1"}) == [
+            {"op": "replace", "path": "/a", "value": "1"}
+        ]
+        assert roundtrip({"a": 1}, [1]) == [{"op": "replace", "path": "", "value": [1]}]
+
+    def test_managers(self):
+        a = FutureYAMLConfigManager({"a": 1})
+        b = FutureYAMLConfigManager({"a": 2})
+        assert diff(a, b) == [{"op": "replace", "path": "/a", "value": 2}]
+
+
+class TestApplyPatch:
+    def test_all_operations(self):
+        doc = {"a": {"b": 1}, "l": [1, 2]}
+        patched = apply_patch(
+            doc,
+            [
+                {"op": "test", "path": "/a/b", "value": 1},
+                {"op": "add", "path": "/l/0", "value": 0},
+                {"op": "copy", "from": "/a", "path": "/c"},
+                {"op": "replace", "path": "/c/b", "value": 2},
+                {"op": "move", "from": "/a/b", "path": "/d"},
+            ],
+        )
+        assert patched == {"a": {}, "l": [0, 1, 2], "c": {"b": 2}, "d": 1}
+        assert doc == {"a": {"b": 1}, "l": [1, 2]}
+
+    def test_unchanged_subtrees_are_shared(self):
+        doc = {"a": {"x": 1}, "b": {"y": 2}}
+        patched = apply_patch(doc, [{"op": "replace", "path": "/a/x", "value": 3}])
+        assert patched["b"] is doc["b"]
+        assert patched["a"] is not doc["a"]
+
+    @pytest.mark.parametrize(
+        "op",
+        [
+            {"op": "remove", "path": "/missing"},
+            {"op": "replace", "path": "/l/5", "value": 1},
+            {"op": "test", "path": "/a", "value": 2},
+            {"op": "add", "path": "a", "value": 1},
+            {"op": "move", "from": "/n", "path": "/n/x"},
+            {"op": "copy", "path": "/b"},
+            {"op": "frobnicate", "path": "/a"},
+            {"op": "add", "path": "/b"},
+            {"op": "add", "path": "/l/01", "value": 1},
+        ],
+    )
+    def test_invalid_operations(self, op):
+        with pytest.raises(JSONPatchError):
+            apply_patch({"a": 1, "l": [1], "n": {}}, [op])
+
+    def test_manager_is_patched_all_or_nothing(self):
+        ym = FutureYAMLConfigManager({"a": 1, "b": {"c": 1}}, thread_safe=True)
+        data = ym.data
+        with pytest.raises(JSONPatchError):
+            apply_patch(
+                ym,
+                [
+                    {"op": "replace", "path": "/a", "value": 2},
+                    {"op": "remove", "path": "/missing"},
+                ],
+            )
+        assert ym.data is data
+        assert apply_patch(ym, [{"op": "replace", "path": "/b/c", "value": 2}]) is ym
+        assert ym.data == {"a": 1, "b": {"c": 2}}
+        assert data == {"a": 1, "b": {"c": 1}}
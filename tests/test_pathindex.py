@@ -0,0 +1,132 @@
+import random
+from functools import partial
+
+import pytest
+
+from yacman import FutureYAMLConfigManager, read_lock, write_lock
+from yacman.pathindex import KeyPathIndex, scan_tree
+
+
+def config():
+    return {
+        "genomes": {
+            "hg38": {"assets": {"fasta": {"tags": {"default": 1}}, "bowtie2": {}}},
+            "mm10": {"assets": {"fasta": {}}},
+        },
+        "servers": ["http://a"],
+        1: {"int": "key"},
+    }
+
+
+def assert_consistent(ym):
+    index = ym.key_path_index
+    rebuilt = KeyPathIndex(ym.data)
+    assert index._paths == rebuilt._paths
+    assert index._keys == rebuilt._keys
+    assert index._nodes.keys() == rebuilt._nodes.keys()
+    for path, node in rebuilt._nodes.items():
+        assert index._nodes[path] is node
+
+
+@pytest.fixture
+def manager_data():
+    return config()
+
+
+@pytest.fixture
+def make_manager():
+    return partial(FutureYAMLConfigManager, key_path_index=True)
+
+
+class TestKeyPathIndex:
+    def test_lookups(self, ym):
+        index = ym.key_path_index
+        assert "genomes.hg38.assets.fasta.tags.default" in index
+        assert (1, "int") in index
+        assert "servers.0" not in index
+        assert index["genomes.mm10"] is ym["genomes"]["mm10"]
+        assert len(index) == 13
+
+    @pytest.mark.parametrize(
+        "prefix", ["", "genomes", "genomes.*.assets", "*.*.assets.*", "missing", 1]
+    )
+    def test_scan_matches_tree_walk(self, ym, prefix):
+        prefix = (prefix,) if prefix == 1 else prefix
+        assert ym.scan(prefix) == scan_tree(ym.data, prefix)
+
+    def test_scan(self, ym):
+        assert [path for path, _ in ym.scan("genomes.*.assets")] == [
+            ("genomes", "hg38", "assets", "bowtie2"),
+            ("genomes", "hg38", "assets", "fasta"),
+            ("genomes", "hg38", "assets", "fasta", "tags"),
+            ("genomes", "hg38", "assets", "fasta", "tags", "default"),
+            ("genomes", "mm10", "assets", "fasta"),
+        ]
+
+    def test_maintained_on_changes(self, ym):
+        ym["genomes"] = {"rn6": {"assets": {}}, **ym["genomes"]}
+        assert_consistent(ym)
+        ym["servers"] = {"primary": "http://b"}
+        assert_consistent(ym)
+        del ym["genomes"]
+        assert_consistent(ym)
+        ym.update({"a": {"b": 1}}, c={"d": {}})
+        assert_consistent(ym)
+        ym.set_path("a.x.c", 2)
+        ym.set_path("x.y.z", 3)
+        ym.del_path("c.d")
+        assert_consistent(ym)
+        assert ym.get_path("x.y.z") == 3
+        ym.update_from_obj({"a": 1})
+        assert_consistent(ym)
+
+    def test_random_changes(self, ym):
+        rng = random.Random(0)
+        for _ in range(300):
+            paths = [path for path, _ in ym.scan()]
+            path = rng.choice(paths) if paths and rng.random() < 0.7 else ("new",)
+            depth = rng.randint(0, 2)
+            value = rng.randint(0, 3)
+            for _ in range(depth):
+                value = {f"k{rng.randint(0, 3)}": value}
+            try:
+                if rng.random() < 0.3 and paths:
+                    ym.del_path(path)
+                else:
+                    ym.set_path(path + ("k",) * rng.randint(0, 1), value)
+            except (KeyError, TypeError):
+                # under a list or a scalar
+                pass
+            assert_consistent(ym)
+
+    def test_nested_changes_in_place_need_reindex(self):
+        ym = FutureYAMLConfigManager(config(), key_path_index=True)
+        ym["genomes"]["hg38"]["assets"]["star"] = {}
+        assert "genomes.hg38.assets.star" not in ym.key_path_index
+        ym.reindex("genomes.hg38")
+        assert_consistent(ym)
+        ym["genomes"]["rn6"] = {}
+        ym.reindex()
+        assert_consistent(ym)
+
+
+class TestMaintainedFromFile:
+    @pytest.fixture
+    def cfg_text(self):
+        return "a: {b: 1}\nnested: {x: 1, y: {z: 2}}\n"
+
+    def test_rebase_and_reset(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path, key_path_index=True)
+        other = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        with write_lock(other) as locked_other:
+            locked_other["nested"] = {"x": 1, "w": {"v": 3}}
+            locked_other.write()
+        ym["c"] = {"d": 4}
+        with read_lock(ym) as locked_ym:
+            locked_ym.rebase()
+            assert_consistent(ym)
+            assert "nested.w.v" in ym.key_path_index
+            assert "c.d" in ym.key_path_index
+            locked_ym.reset()
+            assert_consistent(ym)
+            assert "c" not in ym.key_path_index
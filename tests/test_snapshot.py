@@ -0,0 +1,152 @@
+import pickle
+
+import pytest
+
+from yacman import FrozenList, FrozenMap, FutureYAMLConfigManager, read_lock
+
+
+def config():
+    return {
+        "genomes": {"hg38": {"assets": {"fasta": "hg38.fa"}}, "mm10": {}},
+        "servers": ["http://a", {"url": "http://b"}],
+        "version": 1,
+    }
+
+
+@pytest.fixture
+def manager_data():
+    return config()
+
+
+class TestFrozenMap:
+    def test_read_only_views(self, ym):
+        snapshot = ym.snapshot()
+        assert isinstance(snapshot["genomes"]["hg38"], FrozenMap)
+        assert isinstance(snapshot["servers"], FrozenList)
+        assert snapshot["servers"][1]["url"] == "http://b"
+        assert snapshot == config()
+        assert snapshot["servers"] == ["http://a", {"url": "http://b"}]
+        with pytest.raises(TypeError):
+            snapshot["version"] = 2
+        with pytest.raises(TypeError):
+            snapshot["servers"][0] = "http://c"
+
+    def test_hashable(self, ym):
+        snapshot = ym.snapshot()
+        other = FutureYAMLConfigManager(config()).snapshot()
+        assert hash(snapshot) == hash(other)
+        assert len({snapshot, other}) == 1
+
+    def test_thaw_and_pickle(self, ym):
+        snapshot = ym.snapshot()
+        thawed = snapshot.thaw()
+        thawed["genomes"]["hg38"]["assets"]["fasta"] = "x"
+        assert snapshot["genomes"]["hg38"]["assets"]["fasta"] == "hg38.fa"
+        assert pickle.loads(pickle.dumps(snapshot)) == snapshot
+
+
+class TestSnapshot:
+    def test_constant_time_and_cached(self, ym):
+        snapshot = ym.snapshot()
+        assert snapshot._data is ym.data
+        assert ym.snapshot() is snapshot
+
+    def test_changes_copy_the_changed_path(self, ym):
+        snapshot = ym.snapshot()
+        ym.set_path("genomes.hg38.assets.bowtie2", "idx")
+        ym["version"] = 2
+        del ym["servers"]
+        ym.del_path("genomes.mm10")
+        assert snapshot == config()
+        assert ym.data["genomes"]["hg38"]["assets"] == {
+            "fasta": "hg38.fa",
+            "bowtie2": "idx",
+        }
+        assert ym.snapshot() is not snapshot
+        assert ym.snapshot() == {
+            "genomes": {"hg38": {"assets": {"fasta": "hg38.fa", "bowtie2": "idx"}}},
+            "version": 2,
+        }
+
+    def test_unchanged_subtrees_are_shared(self):
+        data = config()
+        data["other"] = {"big": {}}
+        ym = FutureYAMLConfigManager(data)
+        ym.snapshot()
+        ym.set_path("genomes.hg38.assets.fasta", "x")
+        assert ym.data["other"] is data["other"]
+        assert ym.data["genomes"]["mm10"] is data["genomes"]["mm10"]
+
+    def test_manager_from_snapshot(self, ym):
+        snapshot = ym.snapshot()
+        copied = FutureYAMLConfigManager(snapshot)
+        copied.set_path("genomes.hg38.assets.fasta", "x")
+        copied["version"] = 2
+        assert snapshot == config()
+        assert ym.data == config()
+        assert copied.data["genomes"]["mm10"] is ym.data["genomes"]["mm10"]
+
+    def test_reset_keeps_old_snapshots(self, tmp_path):
+        filepath = str(tmp_path / "conf.yaml")
+        with open(filepath, "w") as f:
+            f.write("a: {b: 1}\n")
+        ym = FutureYAMLConfigManager.from_yaml_file(filepath)
+        snapshot = ym.snapshot()
+        with open(filepath, "w") as f:
+            f.write("a: {b: 2}\n")
+        with read_lock(ym) as locked_ym:
+            locked_ym.reset()
+        assert snapshot == {"a": {"b": 1}}
+        assert ym.snapshot() == {"a": {"b": 2}}
+
+
+class TestOwnership:
+    def test_adopt(self):
+        data = config()
+        ym = FutureYAMLConfigManager.from_obj(data, ownership="adopt")
+        assert ym.data is data
+
+    def test_copy(self):
+        data = config()
+        ym = FutureYAMLConfigManager.from_obj(data)
+        ym["version"] = 2
+        assert data["version"] == 1
+        assert ym.data["genomes"] is data["genomes"]
+
+    def test_deep(self):
+        data = config()
+        ym = FutureYAMLConfigManager.from_obj(data, ownership="deep")
+        ym["genomes"]["hg38"]["assets"]["fasta"] = "x"
+        ym["servers"][1]["url"] = "x"
+        assert data == config()
+
+    def test_frozen(self):
+        data = config()
+        ym = FutureYAMLConfigManager.from_obj(data, ownership="frozen")
+        assert ym.data is data
+        assert isinstance(ym["genomes"], FrozenMap)
+        assert ym.get_path("genomes.hg38.assets.fasta") == "hg38.fa"
+        for change in (
+            lambda: ym.__setitem__("version", 2),
+            lambda: ym.__delitem__("version"),
+            lambda: ym.update(version=2),
+            lambda: ym.set_path("genomes.hg38.assets.fasta", "x"),
+            lambda: ym.del_path("genomes.mm10"),
+        ):
+            with pytest.raises(TypeError):
+                change()
+        with pytest.raises(TypeError):
+            ym["genomes"]["mm10"]["assets"] = {}
+        assert data == config()
+
+    def test_parsed_entries_are_adopted(self, monkeypatch):
+        monkeypatch.setattr("yacman.yacman_future.copy", None)
+        ym = FutureYAMLConfigManager.from_yaml_data("a: {b: 1}\n")
+        assert ym.ownership == "adopt"
+        assert (
+            FutureYAMLConfigManager.from_yaml_data("a: 1", ownership="frozen")["a"] == 1
+        )
+
+    def test_unknown_ownership(self):
+        with pytest.raises(ValueError):
+            FutureYAMLConfigManager({}, ownership="borrow")
@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+from ubiquerg import READ, WRITE
+
+from yacman import FAIR, FutureYAMLConfigManager, read_lock, write_lock
+
+N_WRITES = 20
+
+
+@pytest.fixture
+def cfg_text():
+    return "a: 0\nb: 0\n"
+
+
+def run_threads(targets, duration=None):
+    """Run the targets in threads and return the exceptions they raised"""
+    errors = []
+    done = threading.Event()
+
+    def wrap(target):
+        def run():
+            try:
+                target(done)
+            except Exception as e:
+                errors.append(e)
+                done.set()
+
+        return run
+
+    threads = [threading.Thread(target=wrap(t)) for t in targets]
+    for t in threads:
+        t.start()
+    if duration is not None:
+        time.sleep(duration)
+        done.set()
+    for t in threads:
+        t.join()
+    return errors
+
+
+class TestThreadSafeMode:
+    def test_readers_see_consistent_state(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(
+            cfg_path, thread_safe=True, lock_policy=FAIR
+        )
+        writes_done = []
+
+        def writer(done):
+            for _ in range(N_WRITES):
+                with write_lock(ym) as locked_ym:
+                    locked_ym.rebase()
+                    n = locked_ym["a"] + 1
+                    locked_ym.update({"a": n, "b": n})
+                    locked_ym.write()
+            writes_done.append(True)
+
+        def resetter(done):
+            while not done.is_set():
+                with read_lock(ym) as locked_ym:
+                    locked_ym.reset()
+
+        def reader(done):
+            while not done.is_set():
+                data = ym.exp
+                assert data["a"] == data["b"]
+                assert sorted(ym) == ["a", "b"]
+                assert ym.to_yaml().count("\n") == len(ym)
+
+        def stop_when_written(done):
+            while len(writes_done) < 2 and not done.is_set():
+                time.sleep(0.01)
+            done.set()
+
+        errors = run_threads(
+            [writer, writer, resetter, reader, reader, stop_when_written]
+        )
+        assert errors == []
+        result = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        assert result["a"] == result["b"] == 2 * N_WRITES
+
+    def test_concurrent_setitem(self):
+        ym = FutureYAMLConfigManager({}, thread_safe=True)
+
+        def setter(i):
+            def run(done):
+                for j in range(200):
+                    ym[f"{i}-{j}"] = j
+
+            return run
+
+        def iterator(done):
+            while not done.is_set():
+                for key in ym:
+                    ym[key]
+
+        errors = run_threads([setter(i) for i in range(4)] + [iterator], 0.2)
+        assert errors == []
+        assert len(ym) == 800
+
+    def test_changes_do_not_touch_published_data(self):
+        ym = FutureYAMLConfigManager({"a": 1}, thread_safe=True)
+        data = ym.data
+        ym["b"] = 2
+        del ym["a"]
+        assert data == {"a": 1}
+        assert ym.data == {"b": 2}
+
+    def test_locks_are_held_per_thread(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path, thread_safe=True)
+        locked, release = threading.Event(), threading.Event()
+
+        def holder():
+            with read_lock(ym):
+                locked.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=holder)
+        thread.start()
+        try:
+            assert locked.wait(5)
+            assert not ym.locker.locked[READ]
+            with pytest.raises(OSError):
+                ym.rebase()
+        finally:
+            release.set()
+            thread.join()
+
+    def test_key_path_locks_are_held_per_thread(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path, thread_safe=True)
+        locker = ym.locker
+        barrier = threading.Barrier(2)
+        held = {}
+
+        def lock(key):
+            def run(done):
+                locker.key_path_lock(key)
+                barrier.wait(5)
+                held[key] = list(locker.key_paths)
+                barrier.wait(5)
+                assert locker.key_path_unlock()
+
+            return run
+
+        assert run_threads([lock("a"), lock("b")]) == []
+        assert held == {"a": [("a",)], "b": [("b",)]}
+        assert not locker.locked[WRITE]
+        assert locker._threads == {}
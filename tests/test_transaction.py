@@ -0,0 +1,123 @@
+import os
+
+import pytest
+from ubiquerg import WRITE, write_lock
+
+from yacman import (
+    FutureYAMLConfigManager,
+    LockTimeoutError,
+    multi_write_lock,
+    read_lock,
+)
+from yacman.transaction import Transaction
+
+
+@pytest.fixture
+def cfg_paths(tmp_path):
+    paths = []
+    for name in ["main.yaml", "index.yaml"]:
+        filepath = str(tmp_path / name)
+        with open(filepath, "w") as f:
+            f.write("version: 0\n")
+        paths.append(filepath)
+    return paths
+
+
+def read_version(filepath):
+    return FutureYAMLConfigManager.from_yaml_file(filepath)["version"]
+
+
+def sidecars(filepath):
+    return [f for f in os.listdir(os.path.dirname(filepath)) if f.startswith(".")]
+
+
+class TestMultiWriteLock:
+    def test_commits_all_files(self, cfg_paths):
+        managers = [FutureYAMLConfigManager.from_yaml_file(fp) for fp in cfg_paths]
+        with multi_write_lock(managers) as (main, index):
+            for ym in (main, index):
+                ym["version"] = 1
+                ym.write()
+            # writes are staged until the context exits
+            with open(cfg_paths[0]) as f:
+                assert f.read() == "version: 0\n"
+        assert [read_version(fp) for fp in cfg_paths] == [1, 1]
+        assert sidecars(cfg_paths[0]) == []
+
+    def test_committed_writes_are_not_stale(self, cfg_paths):
+        managers = [FutureYAMLConfigManager.from_yaml_file(fp) for fp in cfg_paths]
+        with multi_write_lock(managers) as (main, index):
+            for ym in (main, index):
+                ym["version"] = 1
+                ym.write()
+            assert main.is_stale() is False
+            main["version"] = 2
+        assert not main.is_stale() and not index.is_stale()
+        # the staged version, not the later change, is the merge base
+        with write_lock(cfg_paths[0]):
+            with open(cfg_paths[0], "w") as f:
+                f.write("version: 1\nother: 1\n")
+        with read_lock(main):
+            main.rebase()
+        assert main.to_dict() == {"version": 2, "other": 1}
+        assert main.conflicts == []
+
+    def test_exception_discards_writes(self, cfg_paths):
+        managers = [FutureYAMLConfigManager.from_yaml_file(fp) for fp in cfg_paths]
+        with pytest.raises(KeyError):
+            with multi_write_lock(managers) as (main, index):
+                main["version"] = 1
+                main.write()
+                index["missing"]
+        assert [read_version(fp) for fp in cfg_paths] == [0, 0]
+
+    def test_timeout_releases_acquired_locks(self, cfg_paths):
+        managers = [FutureYAMLConfigManager.from_yaml_file(fp) for fp in cfg_paths]
+        # a lock held by another process
+        with write_lock(cfg_paths[1]):
+            with pytest.raises(LockTimeoutError) as e:
+                with multi_write_lock(managers, wait_max=0.1):
+                    pass
+        # raised as is, not wrapped in another timeout
+        assert e.value.__context__ is None
+        assert not any(
+            f.startswith("lock") for f in os.listdir(os.path.dirname(cfg_paths[0]))
+        )
+
+    def test_lock_errors_are_not_timeouts(self, cfg_paths):
+        managers = [FutureYAMLConfigManager.from_yaml_file(fp) for fp in cfg_paths]
+        with read_lock(managers[0]):
+            with pytest.raises(RuntimeError, match="read-locked") as e:
+                with multi_write_lock(managers):
+                    pass
+        assert not isinstance(e.value, LockTimeoutError)
+        # the index file is locked first, and released
+        assert not managers[1].locker.locked[WRITE]
+
+    def test_same_file_twice_is_rejected(self, cfg_paths):
+        managers = [
+            FutureYAMLConfigManager.from_yaml_file(cfg_paths[0]) for _ in range(2)
+        ]
+        with pytest.raises(ValueError):
+            with multi_write_lock(managers):
+                pass
+
+
+class TestRecovery:
+    def test_roll_forward_after_commit_point(self, cfg_paths):
+        txn = Transaction()
+        for fp in cfg_paths:
+            txn.stage(fp, "version: 2\n")
+        txn._write_journal(txn._prepare())
+        # crash here: the journal exists, so the change is rolled forward
+        assert [read_version(fp) for fp in cfg_paths] == [2, 2]
+        assert sidecars(cfg_paths[0]) == []
+
+    def test_roll_back_before_commit_point(self, cfg_paths):
+        txn = Transaction()
+        for fp in cfg_paths:
+            txn.stage(fp, "version: 2\n")
+        txn._prepare()
+        # crash here: no journal, so the change is rolled back
+        assert [read_version(fp) for fp in cfg_paths] == [0, 0]
+        assert sidecars(cfg_paths[0]) == []
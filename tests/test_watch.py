@@ -0,0 +1,235 @@
+import threading
+import time
+
+import pytest
+from ubiquerg import READ
+
+from yacman import FutureYAMLConfigManager, read_lock, write_lock
+from yacman.watch import (
+    ConfigChanges,
+    ConfigWatcher,
+    diff_key_paths,
+    file_signature,
+    racily_clean,
+)
+
+from .helpers import wait_until, write_file
+
+
+@pytest.fixture
+def cfg_text():
+    return "a: 1\nnested:\n  b: 2\n  c: 3\n"
+
+
+class TestDiffKeyPaths:
+    def test_nested_changes(self):
+        old = {"a": 1, "nested": {"b": 2, "c": 3}, "gone": 0}
+        new = {"a": 1, "nested": {"b": 5, "d": 4}, "list": [1]}
+        assert diff_key_paths(old, new) == ConfigChanges(
+            added=[("list",), ("nested", "d")],
+            removed=[("gone",), ("nested", "c")],
+            changed=[("nested", "b")],
+        )
+
+    def test_no_changes_is_false(self):
+        assert not diff_key_paths({"a": {"b": [1]}}, {"a": {"b": [1]}})
+        assert diff_key_paths({"a": {"b": 1}}, {"a": 1})
+
+    def test_signature_follows_writes(self, cfg_path):
+        signature = file_signature(cfg_path)
+        write_file(cfg_path, "a: 100\n")
+        assert file_signature(cfg_path) != signature
+        assert file_signature(cfg_path + ".missing") is None
+
+    def test_racily_clean(self, cfg_path):
+        signature = file_signature(cfg_path)
+        assert racily_clean(signature, time.time_ns())
+        assert not racily_clean(signature, time.time_ns() + 10**10)
+        assert racily_clean(None, time.time_ns())
+        assert racily_clean(signature, None)
+
+
+class TestStaleness:
+    def test_fresh_after_load(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        assert not ym.is_stale()
+        assert not ym.refresh_if_changed()
+
+    def test_refresh_after_change(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        write_file(cfg_path, "a: 2\n")
+        assert ym.is_stale()
+        assert ym.refresh_if_changed()
+        assert ym.data == {"a": 2}
+        assert not ym.is_stale()
+
+    def test_unchanged_file_is_not_read(self, cfg_path, monkeypatch):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        monkeypatch.setattr("yacman.yacman_future.load_yaml", None)
+        assert not ym.refresh_if_changed()
+
+    def test_fresh_after_own_write(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        with write_lock(ym) as locked_ym:
+            locked_ym["a"] = 2
+            locked_ym.write()
+        assert not ym.is_stale()
+        other = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        with write_lock(other) as locked_other:
+            locked_other["a"] = 3
+            locked_other.write()
+        assert ym.is_stale()
+        assert not other.is_stale()
+
+    def test_fresh_after_mvcc_write(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path, mvcc=True)
+        with write_lock(ym) as locked_ym:
+            locked_ym["a"] = 2
+            locked_ym.write()
+        assert not ym.is_stale()
+        other = FutureYAMLConfigManager.from_yaml_file(cfg_path, mvcc=True)
+        with write_lock(other) as locked_other:
+            locked_other["a"] = 3
+            locked_other.write()
+        assert ym.refresh_if_changed()
+        assert ym["a"] == 3
+
+    def test_fresh_after_reset_and_rebase(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        write_file(cfg_path, "a: 2\n")
+        with read_lock(ym) as locked_ym:
+            locked_ym.rebase()
+        assert not ym.is_stale()
+        write_file(cfg_path, "a: 3\n")
+        with read_lock(ym) as locked_ym:
+            locked_ym.reset()
+        assert not ym.is_stale()
+
+    def test_not_stale_without_file(self):
+        assert not FutureYAMLConfigManager({"a": 1}).is_stale()
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+class TestWatch:
+    def test_reload_and_callback(self, cfg_path, use_inotify):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        received = []
+        ym.watch(received.append, interval=0.02, use_inotify=use_inotify)
+        try:
+            write_file(cfg_path, "a: 1\nnested:\n  b: 20\nnew: x\n")
+            assert wait_until(lambda: received)
+            assert ym["nested"] == {"b": 20}
+            assert received == [
+                ConfigChanges([("new",)], [("nested", "c")], [("nested", "b")])
+            ]
+        finally:
+            ym.unwatch()
+
+    def test_burst_is_coalesced(self, cfg_path, use_inotify):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        received = []
+        watcher = ym.watch(
+            received.append, interval=0.02, debounce=0.2, use_inotify=use_inotify
+        )
+        try:
+            for i in range(10):
+                write_file(cfg_path, f"a: {i}\n")
+                time.sleep(0.01)
+            assert wait_until(lambda: received)
+            time.sleep(0.3)
+            assert watcher.reloads == 1
+            assert ym["a"] == 9
+        finally:
+            ym.unwatch()
+
+    def test_own_write_calls_no_callback(self, cfg_path, use_inotify):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        received = []
+        watcher = ym.watch(received.append, interval=0.02, use_inotify=use_inotify)
+        try:
+            with write_lock(ym) as locked_ym:
+                locked_ym["a"] = 2
+                locked_ym.write()
+            assert wait_until(lambda: watcher.signature == ym._file_signature)
+            assert watcher.reloads == 0
+            assert received == []
+            assert ym["a"] == 2
+        finally:
+            ym.unwatch()
+
+
+class TestReload:
+    def test_reload_does_not_lock_the_manager(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path, thread_safe=True)
+        parse = ym._parse
+        locked = []
+
+        def spy(stream):
+            locked.append(ym.locker.locked[READ])
+            return parse(stream)
+
+        ym._parse = spy
+        watcher = ConfigWatcher(ym, use_inotify=False)
+        write_file(cfg_path, "a: 2\n")
+        watcher.reload(ym)
+        assert locked == [False]
+        assert ym.data == {"a": 2}
+
+    def test_reload_waits_for_edits(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path, thread_safe=True)
+        watcher = ConfigWatcher(ym, use_inotify=False)
+        write_file(cfg_path, "a: 2\n")
+        thread = threading.Thread(target=watcher.reload, args=(ym,))
+        with ym._edit_lock:
+            thread.start()
+            time.sleep(0.1)
+            assert ym["a"] == 1
+        thread.join()
+        assert ym.data == {"a": 2}
+
+
+class TestWatcherLifecycle:
+    def test_unwatch_stops_thread(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        callback = lambda changes: None
+        watcher = ym.watch(callback, interval=0.02)
+        assert ym.watch(interval=0.05) is watcher
+        assert watcher.interval == 0.05
+        ym.unwatch(callback)
+        assert not watcher.is_alive()
+        assert ym._watcher is None
+
+    def test_idle_watcher_does_not_reload(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        watcher = ym.watch(interval=0.01, use_inotify=False)
+        time.sleep(0.1)
+        assert watcher.reloads == 0
+        ym.unwatch()
+
+    def test_failing_callback_does_not_stop_watcher(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        received = []
+
+        def fail(changes):
+            raise RuntimeError("callback failure")
+
+        ym.watch(fail, interval=0.02, use_inotify=False)
+        assert ym.watch(received.append).interval == 0.02
+        try:
+            write_file(cfg_path, "a: 2\n")
+            assert wait_until(lambda: received)
+            write_file(cfg_path, "a: 3\n")
+            assert wait_until(lambda: len(received) == 2)
+        finally:
+            ym.unwatch()
+
+    def test_stops_when_manager_is_collected(self, cfg_path):
+        ym = FutureYAMLConfigManager.from_yaml_file(cfg_path)
+        watcher = ym.watch(interval=0.02)
+        del ym
+        watcher.join(timeout=5)
+        assert not watcher.is_alive()
+
+    def test_requires_a_file(self):
+        with pytest.raises(ValueError):
+            FutureYAMLConfigManager({"a": 1}).watch()
@@ -1,6 +1,7 @@
 import os
 
 import pytest
+import yaml
 from jsonschema.exceptions import ValidationError
 
 import yacman
@@ -234,6 +235,49 @@ def test_float_idx():
         data[2]
 
 
+nested_yaml_str = """\
+genomes:
+  hg38:
+    assets:
+      fasta: $HOME/hg38.fa
+      fai: ~/hg38.fa.fai
+  mm10:
+    assets: {}
+"""
+
+
+class TestLazyConversion:
+    def test_nested_mappings_converted_when_fetched(self):
+        data = yacman.YacAttMap(yamldata=nested_yaml_str)
+        assert type(dict.__getitem__(data, "genomes")) is dict
+        genomes = data["genomes"]
+        assert isinstance(genomes, yacman.YacAttMap)
+        assert data["genomes"] is genomes and data.genomes is genomes
+        assert type(dict.__getitem__(genomes, "mm10")) is dict
+        assert isinstance(genomes.mm10.assets, yacman.YacAttMap)
+
+    def test_same_as_converted_up_front(self):
+        lazy = yacman.YacAttMap(yamldata=nested_yaml_str)
+        eager = yacman.YacAttMap(entries=yaml.safe_load(nested_yaml_str))
+        assert lazy.to_dict() == eager.to_dict()
+        assert lazy.to_yaml() == eager.to_yaml()
+        assert lazy.genomes.mm10 == eager.genomes.mm10
+
+    def test_paths_expanded(self, monkeypatch):
+        monkeypatch.setenv("HOME", "/home/test")
+        assets = yacman.YacAttMap(yamldata=nested_yaml_str).genomes.hg38.assets
+        assert assets.fasta == "/home/test/hg38.fa"
+        assert assets["fai"] == os.path.expanduser("~/hg38.fa.fai")
+        assert assets.__getitem__("fasta", expand=False) == "$HOME/hg38.fa"
+        assert assets.to_dict(expand=True)["fasta"] == "/home/test/hg38.fa"
+
+    def test_entries_converted_up_front(self, cfg_file):
+        entries = {"testattr": {"a": 1}}
+        y = yacman.YacAttMap(entries=entries, filepath=cfg_file)
+        entries["testattr"]["a"] = 2
+        assert y.testattr.a == 1
+
+
 class TestSelectConfig:
     def test_select_config_works_with_filepath(self, cfg_file):
         assert isinstance(yacman.select_config(config_filepath=cfg_file), str)
@@ -1,7 +1,10 @@
+import os
+
 import pytest
 
 import yacman
-from yacman.exceptions import AliasError
+from yacman.aliascache import alias_cache_path
+from yacman.exceptions import AliasError, AmbiguousAliasError
 
 
 class TestAliases:
@@ -264,3 +267,79 @@ class TestAliases:
         assert x.set_aliases(key=key, aliases=alias)
         assert not (f"{key}_false" in x)
         assert not (f"{alias[0]}_false" in x)
+
+    def test_aliases_are_indexed(self):
+        x = yacman.AliasedYacAttMap(
+            entries={"d1": {}, "d2": {}}, aliases={"d1": ["hg38", "GRCh38"]}
+        )
+        assert x.get_aliases("d1") == ["hg38", "GRCh38"]
+        assert x.set_aliases("d1", "hg", reset_key=True) == (
+            ["hg"],
+            ["hg38", "GRCh38"],
+        )
+        assert x.set_aliases("d2", "hg") == ([], [])
+        assert x.set_aliases("d2", "hg", overwrite=True) == (["hg"], [])
+        assert x.get_key("hg") == "d2"
+        with pytest.warns(UserWarning):
+            assert x.alias_dict == {"hg": "d2"}
+
+    def test_prefix_and_fuzzy_resolution(self):
+        x = yacman.AliasedYacAttMap(
+            entries={"2230c5": {}, "2231aa": {}}, aliases={"2230c5": ["hg38"]}
+        )
+        assert x.resolve_prefix("hg") == "2230c5"
+        assert x.resolve_prefix("2230") == "2230c5"
+        with pytest.raises(AmbiguousAliasError):
+            x.resolve_prefix("223")
+        x.mm10 = {}
+        assert x.complete("mm") == ["mm10"]
+        assert x.suggest("hg39") == [("hg38", "2230c5", 1)]
+
+
+class TestAliasCache:
+    @pytest.fixture
+    def cfg_text(self):
+        return "d1: 1\nd2: 2\n"
+
+    @staticmethod
+    def counting(calls):
+        def upper_aliases(x):
+            calls.append(1)
+            return {k: [k.upper()] for k in x if k != yacman.IK}
+
+        return upper_aliases
+
+    def test_built_on_first_use_and_reused(self, cfg_path):
+        calls = []
+        x = yacman.AliasedYacAttMap(
+            filepath=cfg_path, aliases=self.counting(calls), alias_cache=True
+        )
+        assert x["d1"] == 1 and "d2" in x and not calls
+        assert x.get_key("D1") == "d1"
+        assert len(calls) == 1 and os.path.exists(alias_cache_path(cfg_path))
+        x = yacman.AliasedYacAttMap(
+            filepath=cfg_path, aliases=self.counting(calls), alias_cache=True
+        )
+        assert x.get_aliases("d2") == ["D2"] and len(calls) == 1
+
+    def test_rebuilt_when_config_changes(self, cfg_path):
+        calls = []
+        yacman.AliasedYacAttMap(
+            filepath=cfg_path, aliases=self.counting(calls), alias_cache=True
+        ).get_key("D1")
+        with open(cfg_path, "a") as f:
+            f.write("d3: 3\n")
+        x = yacman.AliasedYacAttMap(
+            filepath=cfg_path, aliases=self.counting(calls), alias_cache=True
+        )
+        assert x.get_key("D3") == "d3" and len(calls) == 2
+
+    def test_no_sidecar_with_entries(self, cfg_path):
+        x = yacman.AliasedYacAttMap(
+            entries={"d3": 3},
+            filepath=cfg_path,
+            aliases={"d3": ["mm10"]},
+            alias_cache=True,
+        )
+        assert x["mm10"] == 3
+        assert not os.path.exists(alias_cache_path(cfg_path))
@@ -8,5 +8,26 @@ from .yacman import *
 from .yacman1 import YAMLConfigManager, select_config, load_yaml
 
 # Future version (not backwards-compatible)
-from .yacman_future import FutureYAMLConfigManager
-from ubiquerg import read_lock, write_lock
+from .yacman_future import CompactYAMLConfigManager, FutureYAMLConfigManager
+from .cleanup import held_lock_files, release_all_locks
+from .locking import (
+    FAIR,
+    READER_PREFERRING,
+    WRITER_PREFERRING,
+    ConfigLocker,
+    lock_queue,
+    read_lock,
+    upgradable_read_lock,
+    write_lock,
+)
+from .lockstats import (
+    reset_stats,
+    start_stats_log,
+    start_watchdog,
+    stats,
+    stop_stats_log,
+    stop_watchdog,
+)
+from .patch import apply_patch, diff
+from .snapshot import FrozenList, FrozenMap
+from .transaction import multi_write_lock
@@ -1,11 +1,23 @@
 import logging
 from collections.abc import Mapping
+from contextlib import contextmanager
 from inspect import getfullargspec
 from warnings import warn
 
+from .aliascache import (
+    CACHE_FORMAT,
+    alias_cache_path,
+    load_alias_index,
+    save_alias_index,
+    source_fingerprint,
+)
+from .aliasindex import DEFAULT_MAX_DISTANCE, AliasIndex
 from .const import *
 from .exceptions import *
+from .keypath import _MISSING, parse_key_path
+from .watch import file_signature
 from .yacman import YacAttMap, _warn_deprecated
+from .yacman_future import FutureYAMLConfigManager
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -15,7 +27,16 @@ class AliasedYacAttMap(YacAttMap):
     A class that extends YacAttMap to provide alias feature.
 
     The items in the object can be accessed using the original key or an alias,
-    if defined in the aliases Mapping.
+    if defined in the aliases Mapping. The aliases are kept in an
+    `AliasIndex`, so resolving an alias and listing the aliases of a key take
+    constant time; keys and aliases can also be resolved from a unique
+    prefix, or suggested for a mistyped name.
+
+    With `alias_cache`, the index is only built on its first use, and saved
+    in a sidecar next to the config file, stamped with the version of the
+    file and a fingerprint of the alias source, as by
+    `AliasedYAMLConfigManager`. The sidecar is only used for objects read
+    from a file alone, without entries.
     """
 
     def __init__(
@@ -29,6 +50,7 @@ class AliasedYacAttMap(YacAttMap):
         aliases=None,
         exact=False,
         aliases_strict=None,
+        alias_cache=False,
     ):
         """
         Object constructor
@@ -49,8 +71,17 @@ class AliasedYacAttMap(YacAttMap):
         :param bool aliases_strict: how to handle aliases mapping issues;
             None for warning, True for AliasError, False to disregard
         :param bool exact: whether aliases should not be used, even if defined
+        :param bool | str alias_cache: whether to defer building the alias
+            index to its first use, and persist it in a sidecar next to the
+            config file; or the path to the sidecar. The alias function, if
+            any, must then only depend on the object
         """
 
+        # taken before the file is read, so that a sidecar saved for a later
+        # version of the file is stale
+        signature = None
+        if alias_cache and filepath and not entries:
+            signature = file_signature(filepath)
         super(AliasedYacAttMap, self).__init__(
             entries=entries,
             filepath=filepath,
@@ -60,47 +91,68 @@ class AliasedYacAttMap(YacAttMap):
             skip_read_lock=skip_read_lock,
         )
         setattr(self[IK], ALIASES_KEY_RAW, {})
-        if not exact:
-            if isinstance(aliases, Mapping) and is_aliases_mapping_valid(
-                aliases, aliases_strict
-            ):
-                setattr(self[IK], ALIASES_KEY_RAW, aliases)
-            elif callable(aliases):
-                if len(getfullargspec(aliases).args) != 1:
+        if exact:
+            setattr(self[IK], ALIASES_KEY, AliasIndex())
+            return
+        if callable(aliases) and len(getfullargspec(aliases).args) != 1:
+            _emit_msg(
+                aliases_strict,
+                "Provided function '{}' must be a one-arg function".format(
+                    aliases.__name__
+                ),
+            )
+        if alias_cache:
+            path = None
+            if signature is not None:
+                path = (
+                    alias_cache
+                    if isinstance(alias_cache, str)
+                    else alias_cache_path(filepath)
+                )
+            setattr(self[IK], ALIASES_KEY, None)
+            setattr(
+                self[IK], ALIASES_SOURCE_KEY, (aliases, aliases_strict, path, signature)
+            )
+            return
+        self._set_raw_aliases(aliases, aliases_strict)
+        # convert the original, condensed mapping to a data structure with
+        # optimal time complexity
+        setattr(self[IK], ALIASES_KEY, AliasIndex(aliases=self[IK][ALIASES_KEY_RAW]))
+
+    def _set_raw_aliases(self, aliases, aliases_strict):
+        """
+        Set the aliases mapping of the object out of an alias source
+
+        :param Mapping | callable(self) -> Mapping aliases: aliases mapping or
+            a callable that produces such a mapping out of the object
+        :param bool aliases_strict: how to handle aliases mapping issues
+        """
+        if isinstance(aliases, Mapping) and is_aliases_mapping_valid(
+            aliases, aliases_strict
+        ):
+            setattr(self[IK], ALIASES_KEY_RAW, aliases)
+        elif callable(aliases):
+            try:
+                res = aliases(self)
+            except Exception as e:
+                _emit_msg(
+                    aliases_strict,
+                    "Provided function '{}' errored: {}".format(
+                        aliases.__name__, getattr(e, "message", repr(e))
+                    ),
+                )
+            else:
+                if is_aliases_mapping_valid(res):
+                    setattr(self[IK], ALIASES_KEY_RAW, res)
+                else:
                     _emit_msg(
                         aliases_strict,
-                        "Provided function '{}' must be a one-arg function".format(
+                        "callable '{}' did not return a Mapping".format(
                             aliases.__name__
                         ),
                     )
-                try:
-                    res = aliases(self)
-                except Exception as e:
-                    _emit_msg(
-                        aliases_strict,
-                        "Provided function '{}' errored: {}".format(
-                            aliases.__name__, getattr(e, "message", repr(e))
-                        ),
-                    )
-                else:
-                    if is_aliases_mapping_valid(res):
-                        setattr(self[IK], ALIASES_KEY_RAW, res)
-                    else:
-                        _emit_msg(
-                            aliases_strict,
-                            "callable '{}' did not return a Mapping".format(
-                                aliases.__name__
-                            ),
-                        )
-            else:
-                _LOGGER.info("No aliases provided")
-
-        # convert the original, condensed mapping to a data structure with
-        # optimal time complexity
-        setattr(self[IK], ALIASES_KEY, {})
-        for k, v in self[IK][ALIASES_KEY_RAW].items():
-            for alias in v:
-                self[IK][ALIASES_KEY][alias] = k
+        else:
+            _LOGGER.info("No aliases provided")
 
     def __getitem__(self, item, expand=True, to_dict=False):
         """
@@ -165,10 +217,11 @@ class AliasedYacAttMap(YacAttMap):
         """
         Get the alias mapping bound to the object
 
-        :return dict: alias-key mapping (one to one)
+        :return dict: alias-key mapping (one to one), a copy
         """
         _warn_deprecated(obj=self)
-        return getattr(self[IK], ALIASES_KEY)
+        index = self._alias_index
+        return {alias: index.key(alias) for alias in index}
 
     @property
     def _raw_alias_dict(self):
@@ -179,6 +232,8 @@ class AliasedYacAttMap(YacAttMap):
         :return dict: key-aliases mapping (one to many)
         """
         _warn_deprecated(obj=self)
+        # the mapping of a deferred index is only set once it is built
+        self._alias_index
         return getattr(self[IK], ALIASES_KEY_RAW)
 
     def get_aliases(self, key):
@@ -192,10 +247,7 @@ class AliasedYacAttMap(YacAttMap):
         :raise UndefinedAliasError: if no alias has been defined for the
             requested key
         """
-        aliases = []
-        for a, k in self[IK][ALIASES_KEY].items():
-            if k == key:
-                aliases.append(a)
+        aliases = self._alias_index.aliases(key)
         if aliases:
             return aliases
         raise UndefinedAliasError("No alias defined for: {}".format(key))
@@ -219,10 +271,55 @@ class AliasedYacAttMap(YacAttMap):
         except KeyError:
             # raise UndefinedAliasError, which is caught in the updated __getitem__ method
             raise UndefinedAliasError()
-        if alias in self[IK][ALIASES_KEY].keys():
-            return self[IK][ALIASES_KEY][alias]
+        key = self._alias_index.key(alias, _MISSING)
+        if key is not _MISSING:
+            return key
         raise UndefinedAliasError("No key defined for: {}".format(alias))
 
+    def complete(self, prefix):
+        """
+        List the keys and aliases starting with a prefix
+
+        The keys are synchronized with the index first, in time linear in
+        their number, since they can be set as attributes unnoticed; use an
+        `AliasedYAMLConfigManager` for lookups in constant time.
+
+        :param str prefix: prefix, e.g. the beginning of a digest
+        :return list[str]: the keys and aliases, sorted
+        """
+        return self._synced_alias_index().complete(prefix)
+
+    def resolve_prefix(self, prefix):
+        """
+        Get the key that a name, or a prefix of the names of a single key,
+        refers to
+
+        The keys are synchronized with the index first, as by `complete`.
+
+        :param str prefix: key, alias, or unique prefix, e.g. "hg3"
+        :return str: the key
+        :raise UndefinedAliasError: if no key or alias starts with the prefix
+        :raise AmbiguousAliasError: if the keys and aliases starting with the
+            prefix belong to several keys, listed in its `candidates`
+        """
+        return self._synced_alias_index().resolve_prefix(prefix)
+
+    def suggest(self, name, max_distance=DEFAULT_MAX_DISTANCE, limit=None):
+        """
+        Suggest the keys and aliases close to a name, e.g. a mistyped one
+
+        The keys are synchronized with the index first, as by `complete`.
+        See `AliasedYAMLConfigManager.suggest` for the cost of larger
+        distances.
+
+        :param str name: name
+        :param int max_distance: largest edit distance to the name
+        :param int limit: largest number of suggestions; all if None
+        :return list[(str, str, int)]: the keys and aliases, the keys they
+            refer to, and their edit distances to the name, closest first
+        """
+        return self._synced_alias_index().suggest(name, max_distance, limit)
+
     def set_aliases(self, key, aliases, overwrite=False, reset_key=False):
         """
         Assign an alias to a key in the object.
@@ -235,26 +332,10 @@ class AliasedYacAttMap(YacAttMap):
             for a key
         :return list[str]: list of set aliases
         """
-        removed_aliases = []
-        if reset_key:
-            try:
-                current_aliases = self.get_aliases(key)
-            except UndefinedAliasError:
-                pass
-            else:
-                for a in current_aliases:
-                    del self[IK][ALIASES_KEY][a]
-                    removed_aliases.append(a)
-
-        set_aliases = []
-        for alias in _make_list_of_aliases(aliases):
-            if alias in self[IK][ALIASES_KEY]:
-                if overwrite:
-                    self[IK][ALIASES_KEY][alias] = key
-                    set_aliases.append(alias)
-            else:
-                self[IK][ALIASES_KEY][alias] = key
-                set_aliases.append(alias)
+        index = self._alias_index
+        # all the aliases of the key are removed, including the ones set again
+        removed_aliases = index.remove(key) if reset_key else []
+        set_aliases, _ = index.set(key, _make_list_of_aliases(aliases), overwrite)
         _LOGGER.debug("Added aliases ({}: {})".format(key, set_aliases))
         return set_aliases, removed_aliases
 
@@ -266,22 +347,467 @@ class AliasedYacAttMap(YacAttMap):
         :param str aliases: list of aliases to remove
         :return list[str]: list of removed aliases
         """
-        removed = []
-        aliases = _make_list_of_aliases(aliases)
+        return self._alias_index.remove(key, _make_list_of_aliases(aliases) or None)
+
+    @property
+    def _alias_index(self):
+        """
+        :return AliasIndex: the aliases of the keys, loaded or built first if
+            deferred
+        """
+        index = getattr(self[IK], ALIASES_KEY)
+        if index is None:
+            index = self._load_alias_index()
+        return index
+
+    def _load_alias_index(self):
+        """
+        Load the deferred alias index from the sidecar, or build it and save
+        it to the sidecar
+
+        :return AliasIndex: the index
+        """
+        aliases, aliases_strict, path, signature = getattr(self[IK], ALIASES_SOURCE_KEY)
+        delattr(self[IK], ALIASES_SOURCE_KEY)
+        if path is not None:
+            stamp = (CACHE_FORMAT, signature, source_fingerprint(aliases))
+            index = load_alias_index(path, stamp)
+            if index is not None:
+                _LOGGER.debug(f"Loaded the alias index from '{path}'")
+                setattr(self[IK], ALIASES_KEY, index)
+                return index
+        # the lookups of an alias function see no aliases
+        setattr(self[IK], ALIASES_KEY, AliasIndex())
+        self._set_raw_aliases(aliases, aliases_strict)
+        index = AliasIndex(aliases=self[IK][ALIASES_KEY_RAW])
+        setattr(self[IK], ALIASES_KEY, index)
+        if path is not None:
+            save_alias_index(path, index, stamp)
+        return index
+
+    def _synced_alias_index(self):
+        """
+        :return AliasIndex: the aliases of the keys, resolving the current
+            keys by prefix too
+        """
+        index = self._alias_index
+        index.sync_keys(key for key in self.keys() if key != IK)
+        return index
+
+
+class AliasedYAMLConfigManager(FutureYAMLConfigManager):
+    """
+    A FutureYAMLConfigManager whose top-level keys can also be accessed by
+    their aliases.
+
+    The aliases are kept in a bidirectional `AliasIndex`, beside the data, so
+    resolving an alias and listing the aliases of a key take constant time.
+    They are not written to the file. The index also follows the top-level
+    keys of the data, so that keys and aliases can be resolved from a unique
+    prefix, or suggested for a mistyped name.
+
+    With `alias_cache`, the index is only built on the first alias miss, and
+    saved in a sidecar next to the config file, stamped with the version of
+    the file and a fingerprint of the alias source; later objects load it
+    from the sidecar, as long as neither has changed.
+    """
+
+    __slots__ = ("_alias_index", "_alias_source", "_alias_cache")
+
+    def __init__(
+        self,
+        entries=None,
+        aliases=None,
+        exact=False,
+        aliases_strict=None,
+        alias_cache=False,
+        **kwargs,
+    ):
+        """
+        Object constructor
+
+        :param Iterable[(str, object)] | Mapping[str, object] entries: YAML
+            collection of key-value pairs.
+        :param Mapping | callable(self) -> Mapping aliases: aliases of each
+            key, as in {"key": ["alias1", "alias2"]}, or a callable that
+            produces such a mapping out of the object
+        :param bool exact: whether aliases should not be used, even if defined
+        :param bool aliases_strict: how to handle aliases mapping issues;
+            None for warning, True for AliasError, False to disregard
+        :param bool | str alias_cache: whether to defer building the alias
+            index to the first alias miss, and persist it in a sidecar next
+            to the config file; or the path to the sidecar. The alias
+            function, if any, must then only depend on the object
+        :param kwargs: Keyword arguments to pass to the FutureYAMLConfigManager
+            constructor.
+        """
+        self._alias_index = AliasIndex()
+        self._alias_source = None
+        self._alias_cache = alias_cache
+        super(AliasedYAMLConfigManager, self).__init__(entries, **kwargs)
+        self._alias_index.sync_keys(self._top_keys())
+        if exact:
+            return
+        if callable(aliases) and len(getfullargspec(aliases).args) != 1:
+            _emit_msg(
+                aliases_strict,
+                f"Provided function '{aliases.__name__}' must be a one-arg function",
+            )
+        if alias_cache:
+            # the file path is only known once the object is created
+            self._alias_index = None
+            self._alias_source = (aliases, aliases_strict)
+            return
+        self._add_aliases(aliases, aliases_strict)
+
+    def _add_aliases(self, aliases, aliases_strict):
+        """
+        Add the aliases of an alias source to the index
+
+        :param Mapping | callable(self) -> Mapping aliases: aliases of each
+            key, or a callable that produces them out of the object
+        :param bool aliases_strict: how to handle aliases mapping issues
+        """
+        if callable(aliases):
+            try:
+                aliases = aliases(self)
+            except Exception as e:
+                _emit_msg(
+                    aliases_strict,
+                    f"Provided function '{aliases.__name__}' errored: "
+                    f"{getattr(e, 'message', repr(e))}",
+                )
+                return
+        if aliases is None:
+            _LOGGER.info("No aliases provided")
+        elif is_aliases_mapping_valid(aliases, aliases_strict):
+            self._alias_index.update(aliases, overwrite=True)
+
+    @property
+    def alias_index(self):
+        """
+        Get the alias index of the object, loaded or built first if deferred
+
+        :return AliasIndex: the index
+        """
+        index = self._alias_index
+        if index is None:
+            index = self._load_alias_index()
+        return index
+
+    def _load_alias_index(self):
+        """
+        Load the deferred alias index from the sidecar, or build it and save
+        it to the sidecar
+
+        :return AliasIndex: the index
+        """
+        with self._edit_context():
+            if self._alias_index is not None:
+                return self._alias_index
+            aliases, aliases_strict = self._alias_source
+            self._alias_source = None
+            path = self._alias_cache_path()
+            if path is not None:
+                stamp = (
+                    CACHE_FORMAT,
+                    self._file_signature,
+                    source_fingerprint(aliases),
+                )
+                index = load_alias_index(path, stamp)
+                if index is not None:
+                    _LOGGER.debug(f"Loaded the alias index from '{path}'")
+                    index.sync_keys(self._top_keys())
+                    self._alias_index = index
+                    return index
+            # the lookups of an alias function see no aliases
+            self._alias_index = AliasIndex(keys=self._top_keys())
+            self._add_aliases(aliases, aliases_strict)
+            if path is not None:
+                save_alias_index(path, self._alias_index, stamp)
+            return self._alias_index
+
+    def _alias_cache_path(self):
+        """
+        :return str | NoneType: path to the alias index sidecar, None if the
+            object is not backed by a file
+        """
+        filepath = getattr(self.locker, "filepath", None)
+        if not filepath or self._file_signature is None:
+            return None
+        if isinstance(self._alias_cache, str):
+            return self._alias_cache
+        return alias_cache_path(filepath)
+
+    @property
+    def aliases(self):
+        """
+        Get the aliases of every key
+
+        :return dict[str, list[str]]: key-aliases mapping (one to many)
+        """
+        return self.alias_index.to_dict()
+
+    def __getitem__(self, item):
+        """
+        Fetch the value of a key, or of the key of an alias
+
+        :param hashable item: key or alias for which to fetch value
+        :return object: value mapped to given key, if available
+        :raise KeyError: if the requested key is unmapped.
+        """
         try:
-            current_aliases = self.get_aliases(key)
-        except UndefinedAliasError:
-            return removed
-        else:
-            existing_aliases = (
-                list(set(aliases) & set(current_aliases))
-                if aliases
-                else current_aliases
+            return super(AliasedYAMLConfigManager, self).__getitem__(item)
+        except KeyError:
+            key = self.alias_index.key(item, _MISSING)
+            if key is _MISSING:
+                raise
+        return super(AliasedYAMLConfigManager, self).__getitem__(key)
+
+    def __contains__(self, item):
+        data = self.data
+        return item in data or self.alias_index.key(item, _MISSING) in data
+
+    def __setitem__(self, item, value):
+        super(AliasedYAMLConfigManager, self).__setitem__(self._resolve(item), value)
+
+    def __delitem__(self, item):
+        """
+        Remove the value of a key, or of the key of an alias, and the aliases
+        of the key
+        """
+        key = self._resolve(item)
+        super(AliasedYAMLConfigManager, self).__delitem__(key)
+        with self._edit_context():
+            self.alias_index.remove(key)
+
+    @contextmanager
+    def _editing(self, keys=None):
+        if self._alias_index is None:
+            # built out of the data as loaded
+            self._load_alias_index()
+        with super(AliasedYAMLConfigManager, self)._editing(keys) as data:
+            yield data
+        with self._edit_context():
+            if keys is None:
+                self._alias_index.sync_keys(self._top_keys())
+                return
+            data = self.data
+            for key in keys:
+                if key in data:
+                    self._alias_index.add_keys((key,))
+                else:
+                    self._alias_index.remove_keys((key,))
+
+    def _replace_data(self, data):
+        if self._alias_index is None:
+            self._load_alias_index()
+        super(AliasedYAMLConfigManager, self)._replace_data(data)
+        self._alias_index.sync_keys(self._top_keys())
+
+    def _top_keys(self):
+        return self.data if isinstance(self.data, Mapping) else ()
+
+    def _resolve(self, name):
+        """
+        :param str name: key or alias
+        :return str: the key of an alias that is not a key, or the name
+        """
+        if name in self.data:
+            return name
+        return self.alias_index.key(name, name)
+
+    def _resolve_path(self, path):
+        """
+        :param str | Iterable[str] path: key path, starting with a key or an alias
+        :return tuple[str]: the key path, starting with the key
+        """
+        keys = parse_key_path(path)
+        if keys and keys[0] not in self.data:
+            key = self.alias_index.key(keys[0], _MISSING)
+            if key is not _MISSING:
+                return (key,) + keys[1:]
+        return keys
+
+    def get_path(self, path, default=_MISSING):
+        return super(AliasedYAMLConfigManager, self).get_path(
+            self._resolve_path(path), default
+        )
+
+    def get_paths(self, paths, default=None):
+        return super(AliasedYAMLConfigManager, self).get_paths(
+            [self._resolve_path(path) for path in paths], default
+        )
+
+    def set_path(self, path, value, create_parents=True):
+        super(AliasedYAMLConfigManager, self).set_path(
+            self._resolve_path(path), value, create_parents
+        )
+
+    def del_path(self, path):
+        super(AliasedYAMLConfigManager, self).del_path(self._resolve_path(path))
+
+    get_path.__doc__ = FutureYAMLConfigManager.get_path.__doc__
+    get_paths.__doc__ = FutureYAMLConfigManager.get_paths.__doc__
+    set_path.__doc__ = FutureYAMLConfigManager.set_path.__doc__
+    del_path.__doc__ = FutureYAMLConfigManager.del_path.__doc__
+
+    def resolve(self, name):
+        """
+        Get the key a name refers to
+
+        :param str name: key or alias
+        :return str: the name if it is a key, or the key of the alias
+        :raise KeyError: if the name is neither a key nor an alias
+        """
+        if name in self.data:
+            return name
+        key = self.alias_index.key(name, _MISSING)
+        if key is _MISSING:
+            raise KeyError(name)
+        return key
+
+    def resolve_many(self, names, default=None):
+        """
+        Get the keys several names refer to
+
+        :param Iterable[str] names: keys or aliases
+        :param object default: value for the names that are neither keys nor
+            aliases
+        :return list[str]: the keys, in the order of the names
+        """
+        data = self.data
+        keys = list(names)
+        for i, name in enumerate(keys):
+            if name not in data:
+                keys[i] = self.alias_index.key(name, default)
+        return keys
+
+    def complete(self, prefix):
+        """
+        List the keys and aliases starting with a prefix
+
+        :param str prefix: prefix, e.g. the beginning of a digest
+        :return list[str]: the keys and aliases, sorted
+        """
+        return self.alias_index.complete(prefix)
+
+    def resolve_prefix(self, prefix):
+        """
+        Get the key that a name, or a prefix of the names of a single key,
+        refers to
+
+        :param str prefix: key, alias, or unique prefix, e.g. "hg3"
+        :return str: the key
+        :raise UndefinedAliasError: if no key or alias starts with the prefix
+        :raise AmbiguousAliasError: if the keys and aliases starting with the
+            prefix belong to several keys, listed in its `candidates`
+        """
+        return self.alias_index.resolve_prefix(prefix)
+
+    def suggest(self, name, max_distance=DEFAULT_MAX_DISTANCE, limit=None):
+        """
+        Suggest the keys and aliases close to a name, e.g. a mistyped one
+
+        The cost grows quickly with the distance: over 100k names, about a
+        millisecond within one edit, and tens of milliseconds within two.
+
+        :param str name: name
+        :param int max_distance: largest edit distance to the name
+        :param int limit: largest number of suggestions; all if None
+        :return list[(str, str, int)]: the keys and aliases, the keys they
+            refer to, and their edit distances to the name, closest first
+        """
+        return self.alias_index.suggest(name, max_distance, limit)
+
+    def get_aliases(self, key):
+        """
+        Get the aliases of a key
+
+        :param str key: key to find the aliases of
+        :return list[str]: aliases of the key
+        :raise UndefinedAliasError: if no alias has been defined for the key
+        """
+        aliases = self.alias_index.aliases(key)
+        if aliases:
+            return aliases
+        raise UndefinedAliasError(f"No alias defined for: {key}")
+
+    def get_key(self, alias):
+        """
+        Get the key of an alias
+
+        :param str alias: alias to find the key of
+        :return str: key of the alias
+        :raise UndefinedAliasError: if the alias is not defined
+        """
+        key = self.alias_index.key(alias, _MISSING)
+        if key is _MISSING:
+            raise UndefinedAliasError(f"No key defined for: {alias}")
+        return key
+
+    def set_aliases(self, key, aliases, overwrite=False, reset_key=False):
+        """
+        Assign aliases to a key
+
+        :param str key: name of the key to assign the aliases to
+        :param str | list[str] aliases: aliases to use
+        :param bool overwrite: whether to force overwrite the key for an
+            already defined alias
+        :param bool reset_key: whether to remove the other aliases of the key
+        :return (list[str], list[str]): the aliases set, and the aliases
+            removed from the key
+        """
+        aliases = _make_list_of_aliases(aliases)
+        with self._edit_context():
+            set_aliases, removed_aliases = self.alias_index.set(
+                key, aliases, overwrite, reset_key
             )
-            for alias in existing_aliases:
-                del self[IK][ALIASES_KEY][alias]
-                removed.append(alias)
-            return removed
+        _LOGGER.debug(f"Added aliases ({key}: {set_aliases})")
+        return set_aliases, removed_aliases
+
+    def remove_aliases(self, key, aliases=None):
+        """
+        Remove aliases of a key
+
+        :param str key: name of the key to remove the aliases of
+        :param str | list[str] aliases: aliases to remove; all if None
+        :return list[str]: the aliases removed
+        """
+        aliases = _make_list_of_aliases(aliases)
+        with self._edit_context():
+            return self.alias_index.remove(key, aliases)
+
+    def set_aliases_many(self, aliases, overwrite=False, reset_key=False):
+        """
+        Assign aliases to several keys
+
+        :param Mapping[str, str | list[str]] aliases: aliases of each key
+        :param bool overwrite: whether to force overwrite the key for the
+            already defined aliases
+        :param bool reset_key: whether to remove the other aliases of the keys
+        :return dict[str, (list[str], list[str])]: the aliases set and
+            removed, by key
+        """
+        aliases = {k: _make_list_of_aliases(v) for k, v in aliases.items()}
+        with self._edit_context():
+            return self.alias_index.update(aliases, overwrite, reset_key)
+
+    def remove_aliases_many(self, aliases):
+        """
+        Remove aliases of several keys
+
+        :param Mapping[str, str | list[str]] | Iterable[str] aliases: aliases
+            to remove for each key, None to remove all the aliases of the
+            key, or keys to remove all the aliases of
+        :return dict[str, list[str]]: the aliases removed, by key
+        """
+        if not isinstance(aliases, Mapping):
+            aliases = dict.fromkeys(aliases)
+        aliases = {k: _make_list_of_aliases(v) for k, v in aliases.items()}
+        with self._edit_context():
+            remove = self.alias_index.remove
+            return {k: remove(k, v) for k, v in aliases.items()}
 
 
 def is_aliases_mapping_valid(aliases, strictness=None):
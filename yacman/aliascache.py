@@ -0,0 +1,141 @@
+"""
+Persisted alias indexes.
+
+Building the `AliasIndex` of a large alias mapping, or calling the function
+that produces the aliases out of the config, is repeated every time a
+config is loaded. The built index can instead be saved in a sidecar file
+next to the config, stamped with the version of the config file and a
+fingerprint of the alias source, and loaded back, for as long as both match.
+
+The sidecar holds two pickles: the stamp, read first so that a stale
+sidecar is detected without loading the index, and the index. Only the
+alias index classes are allowed when the index is unpickled.
+"""
+
+import hashlib
+import io
+import logging
+import marshal
+import os
+import pickle
+
+from .aliasindex import AliasIndex, SortedNames
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["alias_cache_path", "source_fingerprint"]
+
+ALIAS_CACHE_TEMPLATE = ".{name}.aliases"
+TMP_PREFIX = ".tmp-"
+# changed whenever the layout of the index classes changes
+CACHE_FORMAT = 1
+# the later versions have back references, which depend on reference counts
+MARSHAL_VERSION = 2
+
+_ALLOWED_CLASSES = {
+    ("yacman.aliasindex", "AliasIndex"): AliasIndex,
+    ("yacman.aliasindex", "SortedNames"): SortedNames,
+}
+
+
+def alias_cache_path(filepath):
+    """
+    Get the default path of the alias index sidecar of a config file
+
+    :param str filepath: path to the config file
+    :return str: path to the sidecar, in the directory of the config file
+    """
+    base, name = os.path.split(os.path.abspath(filepath))
+    return os.path.join(base, ALIAS_CACHE_TEMPLATE.format(name=name))
+
+
+def source_fingerprint(source):
+    """
+    Get a fingerprint of an alias source, which changes with the source
+
+    Mappings are fingerprinted by their contents, functions by their name
+    and their compiled code, so the fingerprint of a function changes when
+    its code is edited, but not when the objects it closes over change.
+
+    :param Mapping | callable | NoneType source: aliases of each key, or
+        function producing them
+    :return str: the fingerprint
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if callable(source):
+        name = getattr(source, "__qualname__", type(source).__qualname__)
+        digest.update(f"{getattr(source, '__module__', '')}.{name}".encode())
+        code = getattr(source, "__code__", None)
+        if code is not None:
+            digest.update(marshal.dumps(code, MARSHAL_VERSION))
+    elif source is not None:
+        try:
+            digest.update(marshal.dumps(source, MARSHAL_VERSION))
+        except ValueError:
+            digest.update(repr(list(source.items())).encode())
+    return digest.hexdigest()
+
+
+def load_alias_index(path, stamp):
+    """
+    Load an alias index from a sidecar, if it was saved with the same stamp
+
+    :param str path: path to the sidecar
+    :param tuple stamp: version of the config and of the alias source
+    :return AliasIndex | NoneType: the index, None if the sidecar is
+        missing, stale or unreadable
+    """
+    try:
+        with open(path, "rb") as f:
+            if _IndexUnpickler(f).load() != stamp:
+                _LOGGER.debug(f"Stale alias index: {path}")
+                return None
+            index = _IndexUnpickler(f).load()
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        _LOGGER.debug(f"Can't load the alias index from '{path}': {e}")
+        return None
+    return index if isinstance(index, AliasIndex) else None
+
+
+def save_alias_index(path, index, stamp):
+    """
+    Atomically save an alias index to a sidecar
+
+    Failures, e.g. in a read-only directory, are logged and ignored: the
+    index is then rebuilt the next time.
+
+    :param str path: path to the sidecar
+    :param AliasIndex index: index to save
+    :param tuple stamp: version of the config and of the alias source
+    :return bool: whether the index was saved
+    """
+    buffer = io.BytesIO()
+    pickle.dump(stamp, buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.dump(index, buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    base, name = os.path.split(os.path.abspath(path))
+    tmp_path = os.path.join(
+        base, f"{TMP_PREFIX}{os.getpid()}-{os.urandom(4).hex()}-{name}"
+    )
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        _LOGGER.debug(f"Can't save the alias index to '{path}': {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+    _LOGGER.debug(f"Saved the alias index to '{path}'")
+    return True
+
+
+class _IndexUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        try:
+            return _ALLOWED_CLASSES[(module, name)]
+        except KeyError:
+            raise pickle.UnpicklingError(f"Forbidden class: {module}.{name}")
@@ -0,0 +1,534 @@
+"""
+Bidirectional index of the aliases of config keys.
+
+`AliasIndex` maps every alias to its key, and every key to its aliases, so
+resolving an alias and listing the aliases of a key are single dictionary
+lookups, whatever the number of aliases. Both directions are updated
+together, alias by alias, when aliases are set or removed.
+
+The aliases, and the keys registered with `sync_keys`, are also kept in
+sorted arrays, so partial names are resolved by a binary search: the names
+starting with a prefix are contiguous. Suggestions within an edit distance
+are found by walking the sorted names as a trie, computing one row of the
+edit distance table per distinct prefix and skipping all the names under a
+prefix too far from the query.
+"""
+
+from bisect import bisect_left, insort
+
+from .exceptions import AmbiguousAliasError, UndefinedAliasError
+
+__all__ = ["AliasIndex", "SortedNames"]
+
+# above this many names, the sorted arrays are rebuilt rather than updated
+# name by name
+BULK_THRESHOLD = 64
+
+# suggestions within two edits cost tens of milliseconds for 100k names, ten
+# times those within one edit
+DEFAULT_MAX_DISTANCE = 1
+
+# names within one edit of a query are looked up directly, rather than
+# searched for, when there are at most this many strings one edit away
+NEIGHBORHOOD_LIMIT = 4096
+
+
+class SortedNames(object):
+    """
+    Set of strings kept in sorted arrays, for prefix and edit distance
+    searches
+
+    All the names are in one sorted array, for prefix searches, and the
+    names of each length in another, for edit distance searches, which only
+    look at the names of lengths close to the query.
+    """
+
+    __slots__ = ("_names", "_by_length", "_members", "_alphabet")
+
+    def __init__(self, names=()):
+        """
+        :param Iterable[str] names: names; the other objects are skipped
+        """
+        self._names = []
+        self._by_length = {}
+        self._members = set()
+        # characters of the names, added and never removed
+        self._alphabet = set()
+        self.update(names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._members
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def add(self, name):
+        if isinstance(name, str) and name not in self._members:
+            self._members.add(name)
+            self._alphabet.update(name)
+            insort(self._names, name)
+            insort(self._by_length.setdefault(len(name), []), name)
+
+    def discard(self, name):
+        if name in self._members:
+            self._members.remove(name)
+            names = self._names
+            del names[bisect_left(names, name)]
+            same_length = self._by_length[len(name)]
+            del same_length[bisect_left(same_length, name)]
+            if not same_length:
+                del self._by_length[len(name)]
+
+    def update(self, names):
+        """
+        :param Iterable[str] names: names to add
+        """
+        added = {n for n in names if isinstance(n, str) and n not in self._members}
+        if len(added) <= BULK_THRESHOLD:
+            for name in added:
+                self.add(name)
+            return
+        self._members.update(added)
+        for name in added:
+            self._alphabet.update(name)
+        self._rebuild(self._names + list(added))
+
+    def difference_update(self, names):
+        """
+        :param Iterable[str] names: names to remove
+        """
+        removed = {n for n in names if n in self._members}
+        if len(removed) <= BULK_THRESHOLD:
+            for name in removed:
+                self.discard(name)
+            return
+        self._members -= removed
+        self._rebuild([n for n in self._names if n not in removed])
+
+    def _rebuild(self, names):
+        names.sort()
+        self._names = names
+        self._by_length = {}
+        for name in names:
+            self._by_length.setdefault(len(name), []).append(name)
+
+    def starting_with(self, prefix):
+        """
+        Get the names starting with a prefix
+
+        :param str prefix: prefix
+        :return list[str]: the names, sorted
+        """
+        names = self._names
+        lo = bisect_left(names, prefix)
+        end = _successor(prefix)
+        hi = len(names) if end is None else bisect_left(names, end, lo)
+        return names[lo:hi]
+
+    def within(self, query, max_distance=DEFAULT_MAX_DISTANCE):
+        """
+        Get the names within an edit distance of a query
+
+        :param str query: query
+        :param int max_distance: largest Levenshtein distance to the query
+        :return list[(int, str)]: the distances and names, sorted
+        """
+        if max_distance == 0:
+            return [(0, query)] if query in self._members else []
+        size = len(query) * (2 * len(self._alphabet) + 1)
+        if max_distance == 1 and size <= NEIGHBORHOOD_LIMIT:
+            return self._one_edit_from(query)
+        found = []
+        for length in range(len(query) - max_distance, len(query) + max_distance + 1):
+            names = self._by_length.get(length)
+            if names:
+                _search(names, length, query, max_distance + 1, found)
+        found.sort()
+        return found
+
+    def _one_edit_from(self, query):
+        """
+        Look up the strings within one edit of a query
+
+        :param str query: query
+        :return list[(int, str)]: the distances and names, sorted
+        """
+        members = self._members
+        found = {query: 0} if query in members else {}
+        for i in range(len(query) + 1):
+            head, tail = query[:i], query[i:]
+            candidates = [head + c + tail for c in self._alphabet]
+            if tail:
+                rest = tail[1:]
+                candidates.append(head + rest)
+                candidates.extend(head + c + rest for c in self._alphabet)
+            for candidate in candidates:
+                if candidate in members and candidate != query:
+                    found[candidate] = 1
+        return sorted((d, name) for name, d in found.items())
+
+
+def _search(names, length, query, cap, found):
+    """
+    Find the names within an edit distance of a query, walking the sorted
+    names as a trie
+
+    :param list[str] names: sorted names, all of the same length
+    :param int length: length of the names
+    :param str query: query
+    :param int cap: distance above the largest one searched for
+    :param list[(int, str)] found: list to add the distances and names to
+    """
+    size = len(query)
+    # rows[i] is the edit distance row of prefix[:i], the deepest prefix of
+    # the current name computed so far, with distances capped
+    rows = [[min(j, cap) for j in range(size + 1)]]
+    prefix = ""
+    i = 0
+    while i < len(names):
+        name = names[i]
+        depth = _common_prefix_length(prefix, name)
+        del rows[depth + 1 :]
+        pruned = False
+        for depth in range(depth + 1, length + 1):
+            row = _next_row(rows[-1], name[depth - 1], depth, query, cap)
+            rows.append(row)
+            # the rest of the names is as long as the rest of the query at
+            # best, so the distance can not be smaller than this
+            rest = length - depth - size
+            band = range(max(depth - cap + 1, 0), min(depth + cap - 1, size) + 1)
+            if min((row[j] + abs(rest + j) for j in band), default=cap) >= cap:
+                # no name under this prefix is close enough
+                prefix = name[:depth]
+                end = _successor(prefix)
+                i = len(names) if end is None else bisect_left(names, end, i + 1)
+                pruned = True
+                break
+        if pruned:
+            continue
+        prefix = name
+        if rows[-1][-1] < cap:
+            found.append((rows[-1][-1], name))
+        i += 1
+
+
+def _successor(prefix):
+    """
+    :param str prefix: prefix
+    :return str: the smallest string greater than all the strings starting
+        with the prefix, or None if there is none
+    """
+    while prefix and prefix[-1] == "\U0010ffff":
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _common_prefix_length(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _next_row(row, char, depth, query, cap):
+    """
+    :param list[int] row: edit distances between a prefix and the prefixes
+        of the query
+    :param str char: next character of the prefix
+    :param int depth: length of the longer prefix
+    :param str query: query
+    :param int cap: distance above the largest one searched for; only the
+        band of the row where the distances can be smaller is computed
+    :return list[int]: edit distances between the longer prefix and the
+        prefixes of the query, capped
+    """
+    new = [cap] * len(row)
+    start = depth - cap + 1
+    if start <= 0:
+        new[0] = min(depth, cap)
+        start = 1
+    for j in range(start, min(len(query), depth + cap - 1) + 1):
+        new[j] = min(
+            row[j] + 1, new[j - 1] + 1, row[j - 1] + (query[j - 1] != char), cap
+        )
+    return new
+
+
+class AliasIndex(object):
+    """
+    Index of the aliases of keys, one key per alias, any number of aliases
+    per key
+    """
+
+    __slots__ = ("_keys", "_aliases", "_alias_names", "_key_names")
+
+    def __init__(self, aliases=None, keys=()):
+        """
+        :param Mapping[str, Iterable[str]] aliases: aliases of each key, as in
+            {"key": ["alias1", "alias2"]}; the aliases listed for several
+            keys are given to the last one
+        :param Iterable[str] keys: keys to resolve by prefix along with the
+            aliases, e.g. all the keys of the data
+        """
+        # key of each alias
+        self._keys = {}
+        # aliases of each key, in a dict used as an ordered set
+        self._aliases = {}
+        self._alias_names = SortedNames()
+        self._key_names = SortedNames(keys)
+        if aliases is not None:
+            self.update(aliases, overwrite=True)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, alias):
+        return alias in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __eq__(self, other):
+        if isinstance(other, AliasIndex):
+            return self._keys == other._keys
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.to_dict()!r})"
+
+    def key(self, alias, default=None):
+        """
+        Get the key of an alias
+
+        :param str alias: alias
+        :param object default: value to return for an undefined alias
+        :return str: the key
+        """
+        return self._keys.get(alias, default)
+
+    def keys_of(self, aliases, default=None):
+        """
+        Get the keys of several aliases
+
+        :param Iterable[str] aliases: aliases
+        :param object default: value for the undefined aliases
+        :return list[str]: the keys, in the order of the aliases
+        """
+        get = self._keys.get
+        return [get(alias, default) for alias in aliases]
+
+    def aliases(self, key):
+        """
+        Get the aliases of a key
+
+        :param str key: key
+        :return list[str]: the aliases, in the order they were set; empty if
+            the key has none
+        """
+        return list(self._aliases.get(key, ()))
+
+    def has_aliases(self, key):
+        """
+        :param str key: key
+        :return bool: whether the key has aliases
+        """
+        return key in self._aliases
+
+    def set(self, key, aliases, overwrite=False, reset_key=False):
+        """
+        Set aliases of a key
+
+        :param str key: key
+        :param Iterable[str] aliases: aliases to set
+        :param bool overwrite: whether to move the aliases already defined
+            for another key to this key; they are skipped otherwise
+        :param bool reset_key: whether to remove the other aliases of the key
+        :return (list[str], list[str]): the aliases set, and the aliases
+            removed from the key
+        """
+        return self._set(key, aliases, overwrite, reset_key, self._alias_names)
+
+    def remove(self, key, aliases=None):
+        """
+        Remove aliases of a key
+
+        :param str key: key
+        :param Iterable[str] aliases: aliases to remove; all the aliases of
+            the key if None
+        :return list[str]: the aliases removed; the aliases not defined for
+            the key are skipped
+        """
+        key_aliases = self._aliases.get(key)
+        if key_aliases is None:
+            return []
+        if aliases is None:
+            removed = list(key_aliases)
+        else:
+            removed = [a for a in dict.fromkeys(aliases) if a in key_aliases]
+        for alias in removed:
+            self._unlink(alias, self._alias_names)
+        return removed
+
+    def update(self, aliases, overwrite=False, reset_key=False):
+        """
+        Set aliases of several keys
+
+        :param Mapping[str, Iterable[str]] aliases: aliases of each key
+        :param bool overwrite: whether to move the aliases already defined
+            for other keys
+        :param bool reset_key: whether to remove the other aliases of the keys
+        :return dict[str, (list[str], list[str])]: the aliases set and
+            removed, by key
+        """
+        if len(aliases) <= BULK_THRESHOLD:
+            names = self._alias_names
+            return {
+                key: self._set(key, key_aliases, overwrite, reset_key, names)
+                for key, key_aliases in aliases.items()
+            }
+        # the sorted aliases are rebuilt once
+        result = {
+            key: self._set(key, key_aliases, overwrite, reset_key, None)
+            for key, key_aliases in aliases.items()
+        }
+        self._alias_names = SortedNames(self._keys)
+        return result
+
+    def clear(self):
+        """
+        Remove all the aliases
+        """
+        self._keys.clear()
+        self._aliases.clear()
+        self._alias_names = SortedNames()
+
+    def to_dict(self):
+        """
+        Get the aliases of every key
+
+        :return dict[str, list[str]]: aliases of each key that has some
+        """
+        return {key: list(key_aliases) for key, key_aliases in self._aliases.items()}
+
+    def sync_keys(self, keys):
+        """
+        Set the keys resolved by prefix along with the aliases
+
+        :param Iterable[str] keys: all the keys
+        """
+        keys = {key for key in keys if isinstance(key, str)}
+        current = set(self._key_names)
+        if keys == current:
+            return
+        self._key_names.difference_update(current - keys)
+        self._key_names.update(keys - current)
+
+    def add_keys(self, keys):
+        """
+        :param Iterable[str] keys: keys to resolve by prefix
+        """
+        self._key_names.update(keys)
+
+    def remove_keys(self, keys):
+        """
+        :param Iterable[str] keys: keys not to resolve by prefix any more
+        """
+        self._key_names.difference_update(keys)
+
+    def complete(self, prefix):
+        """
+        Get the aliases and keys starting with a prefix
+
+        :param str prefix: prefix, e.g. the beginning of a digest
+        :return list[str]: the names, sorted
+        """
+        return sorted(
+            set(self._alias_names.starting_with(prefix))
+            | set(self._key_names.starting_with(prefix))
+        )
+
+    def resolve_prefix(self, prefix):
+        """
+        Get the key that a name or a unique prefix refers to
+
+        A name that is a key or an alias resolves to its key, even if it is
+        the prefix of other names too.
+
+        :param str prefix: key, alias, or prefix of the aliases and keys of a
+            single key
+        :return str: the key
+        :raise UndefinedAliasError: if no alias or key starts with the prefix
+        :raise AmbiguousAliasError: if the aliases and keys starting with the
+            prefix belong to several keys
+        """
+        if prefix in self._key_names:
+            return prefix
+        key = self._keys.get(prefix)
+        if key is not None:
+            return key
+        candidates = dict.fromkeys(self._key_names.starting_with(prefix))
+        for alias in self._alias_names.starting_with(prefix):
+            candidates[self._keys[alias]] = None
+        if not candidates:
+            raise UndefinedAliasError(f"No key or alias starts with: {prefix}")
+        if len(candidates) > 1:
+            raise AmbiguousAliasError(prefix, sorted(candidates))
+        return next(iter(candidates))
+
+    def suggest(self, name, max_distance=DEFAULT_MAX_DISTANCE, limit=None):
+        """
+        Get the aliases and keys close to a name, e.g. to correct a typo
+
+        :param str name: name
+        :param int max_distance: largest Levenshtein distance to the name
+        :param int limit: largest number of suggestions; all if None
+        :return list[(str, str, int)]: the aliases and keys, their keys and
+            their distances to the name, closest first
+        """
+        found = {}
+        for names, key_of in (
+            (self._alias_names, self._keys.__getitem__),
+            (self._key_names, lambda key: key),
+        ):
+            for distance, match in names.within(name, max_distance):
+                found.setdefault(match, (match, key_of(match), distance))
+        suggestions = sorted(found.values(), key=lambda s: (s[2], s[0]))
+        return suggestions if limit is None else suggestions[:limit]
+
+    def _set(self, key, aliases, overwrite, reset_key, names):
+        aliases = list(aliases)
+        removed = []
+        if reset_key:
+            keep = set(aliases)
+            removed = [a for a in self._aliases.get(key, ()) if a not in keep]
+            for alias in removed:
+                self._unlink(alias, names)
+        added = []
+        for alias in aliases:
+            current = self._keys.get(alias)
+            if current is not None:
+                if not overwrite:
+                    continue
+                if current != key:
+                    self._unlink(alias, names)
+            self._aliases.setdefault(key, {})[alias] = None
+            self._keys[alias] = key
+            if names is not None:
+                names.add(alias)
+            added.append(alias)
+        return added, removed
+
+    def _unlink(self, alias, names):
+        key = self._keys.pop(alias)
+        key_aliases = self._aliases[key]
+        del key_aliases[alias]
+        if not key_aliases:
+            del self._aliases[key]
+        if names is not None:
+            names.discard(alias)
@@ -0,0 +1,147 @@
+"""
+Packed storage of long numeric lists.
+
+Configs may carry long lists of numbers, e.g. chromosome lengths or bin
+boundaries, which load as lists of boxed ints and floats, taking about 32
+bytes per item. The loader returned by `array_loader` packs the sequences of
+at least a given number of items, all ints or all floats, into
+`array.array` objects instead, taking 8 bytes per item.
+
+Arrays are written back as plain YAML sequences, so the text produced by
+`to_yaml` and `write` does not change. `as_numpy` gives a NumPy view of an
+array, without copying it, for vectorized access.
+"""
+
+from array import array
+from functools import lru_cache
+
+import yaml
+from jsonschema.validators import extend, validator_for
+
+__all__ = [
+    "DEFAULT_ARRAY_THRESHOLD",
+    "array_loader",
+    "array_validator",
+    "as_numpy",
+    "is_array",
+]
+
+# the sequences shorter than this are kept as lists by default
+DEFAULT_ARRAY_THRESHOLD = 64
+
+INT_TAG = "tag:yaml.org,2002:int"
+FLOAT_TAG = "tag:yaml.org,2002:float"
+SEQ_TAG = "tag:yaml.org,2002:seq"
+
+# signed 64-bit ints, and doubles
+INT_TYPECODE = "q"
+FLOAT_TYPECODE = "d"
+
+
+def is_array(value):
+    """
+    Check whether a value is a packed numeric array
+
+    :param object value: value
+    :return bool: whether the value is an array.array
+    """
+    return isinstance(value, array)
+
+
+@lru_cache(maxsize=None)
+def array_loader(threshold=None):
+    """
+    Get a YAML loader packing the long numeric sequences into arrays
+
+    :param int threshold: least number of items of the sequences to pack;
+        None for no packing
+    :return type: yaml.SafeLoader, or a subclass of it packing the sequences
+        of at least threshold items, all ints or all floats
+    """
+    if threshold is None:
+        return yaml.SafeLoader
+    if threshold < 1:
+        raise ValueError(f"Array threshold must be positive: {threshold}")
+
+    class ArrayLoader(yaml.SafeLoader):
+        def construct_numeric_seq(self, node):
+            items = node.value
+            if len(items) >= threshold:
+                packed = _pack(self, items)
+                if packed is not None:
+                    return packed
+            return self.construct_yaml_seq(node)
+
+    ArrayLoader.__name__ = f"ArrayLoader{threshold}"
+    ArrayLoader.add_constructor(SEQ_TAG, ArrayLoader.construct_numeric_seq)
+    return ArrayLoader
+
+
+def _pack(loader, items):
+    """
+    Pack the scalar nodes of a sequence into an array
+
+    :param yaml.SafeLoader loader: loader constructing the items
+    :param list[yaml.Node] items: nodes of the sequence
+    :return array.array: the array, or None if the items are not all ints
+        or all floats, or do not fit in the array
+    """
+    tag = items[0].tag
+    if tag == INT_TAG:
+        typecode, construct = INT_TYPECODE, loader.construct_yaml_int
+    elif tag == FLOAT_TAG:
+        typecode, construct = FLOAT_TYPECODE, loader.construct_yaml_float
+    else:
+        return None
+    for item in items:
+        if item.tag != tag or not isinstance(item, yaml.ScalarNode):
+            return None
+    try:
+        return array(typecode, [construct(item) for item in items])
+    except OverflowError:
+        return None
+
+
+def _represent_array(dumper, data):
+    return dumper.represent_list(data.tolist())
+
+
+for _dumper in (yaml.Dumper, yaml.SafeDumper):
+    _dumper.add_representer(array, _represent_array)
+
+
+def as_numpy(value):
+    """
+    Get a NumPy array for vectorized access to a packed numeric array
+
+    The NumPy array shares the memory of the packed array, so changes made
+    to either are seen by the other, and the packed array can not be resized
+    while the NumPy array exists.
+
+    :param array.array | list value: packed array, or a list, which is copied
+    :return numpy.ndarray: the NumPy array
+    :raise ImportError: if NumPy is not installed
+    """
+    import numpy
+
+    if isinstance(value, array):
+        return numpy.frombuffer(value, dtype=value.typecode)
+    return numpy.asarray(value)
+
+
+@lru_cache(maxsize=None)
+def _array_validator(cls):
+    def is_array_type(checker, instance):
+        return isinstance(instance, (list, array))
+
+    return extend(cls, type_checker=cls.TYPE_CHECKER.redefine("array", is_array_type))
+
+
+def array_validator(schema):
+    """
+    Get a jsonschema validator class that takes arrays for JSON arrays
+
+    :param dict schema: schema to validate against
+    :return type: validator class for the version of the schema
+    """
+    return _array_validator(validator_for(schema))
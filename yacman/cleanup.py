@@ -0,0 +1,153 @@
+"""
+Release of the lock files held by the process when it is interrupted or exits.
+
+Lock files are registered when created and unregistered when removed. The
+ones still registered are removed at interpreter exit, and by a single
+SIGINT/SIGTERM hook, which then calls the handler that was installed before
+it. A forked child process does not own the lock files of its parent, so it
+forgets them.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from signal import SIG_DFL, SIG_IGN, SIGINT, SIGTERM, Signals, getsignal, signal
+
+import ubiquerg
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["create_lock", "held_lock_files", "release_all_locks", "remove_lock"]
+
+HANDLED_SIGNALS = (SIGINT, SIGTERM)
+
+_LOCK_FILES = set()
+# re-entrant, since lock files are also removed by the finalizers of lockers
+# and by the signal hook, which may run while it is held
+_LOCK_FILES_LOCK = threading.RLock()
+_previous_handlers = {}
+
+
+def register_lock_file(lock_path):
+    """
+    Register a lock file created by this process, to be removed if the
+    process is interrupted or exits before releasing it
+
+    :param str lock_path: path to the lock file
+    """
+    with _LOCK_FILES_LOCK:
+        _LOCK_FILES.add(lock_path)
+    _install_signal_handlers()
+
+
+def unregister_lock_file(lock_path):
+    """
+    Unregister a lock file that has been removed
+
+    :param str lock_path: path to the lock file
+    """
+    with _LOCK_FILES_LOCK:
+        _LOCK_FILES.discard(lock_path)
+
+
+def held_lock_files():
+    """
+    Get the lock files held by this process
+
+    :return list[str]: paths to the lock files
+    """
+    with _LOCK_FILES_LOCK:
+        return sorted(_LOCK_FILES)
+
+
+def release_all_locks():
+    """
+    Remove all the lock files held by this process
+
+    :return list[str]: paths to the removed lock files
+    """
+    with _LOCK_FILES_LOCK:
+        lock_paths = sorted(_LOCK_FILES)
+        _LOCK_FILES.clear()
+    removed = []
+    for lock_path in lock_paths:
+        try:
+            os.remove(lock_path)
+            removed.append(lock_path)
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def create_lock(filepath, wait_max=10):
+    """
+    Securely create a single lock file for a file, like the ubiquerg
+    function, and register it
+
+    :param str filepath: path to a file to lock
+    :param int wait_max: max wait time if the file in question is already locked
+    """
+    ubiquerg.create_lock(filepath, wait_max)
+    register_lock_file(ubiquerg.make_lock_path(filepath))
+
+
+def remove_lock(filepath):
+    """
+    Remove the single lock file of a file, like the ubiquerg function, and
+    unregister it
+
+    :param str filepath: path to the file to remove the lock for
+    :return bool: whether the lock was found and removed
+    """
+    unregister_lock_file(ubiquerg.make_lock_path(filepath))
+    return ubiquerg.remove_lock(filepath)
+
+
+def _install_signal_handlers():
+    """
+    Install the signal hook, keeping the current handlers to chain to.
+
+    Signal handlers can only be installed from the main thread; other threads
+    leave it to the next lock taken in the main thread.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for signum in HANDLED_SIGNALS:
+        current = getsignal(signum)
+        if current is not _handle_signal:
+            _previous_handlers[signum] = current
+            try:
+                signal(signum, _handle_signal)
+            except ValueError:
+                # not in the main interpreter
+                return
+
+
+def _handle_signal(signum, frame):
+    released = release_all_locks()
+    if released:
+        _LOGGER.warning(
+            f"Received {Signals(signum).name}, released locks: {', '.join(released)}"
+        )
+    previous = _previous_handlers.get(signum)
+    if callable(previous):
+        return previous(signum, frame)
+    if previous == SIG_IGN:
+        return
+    # the default action, e.g. terminate the process
+    signal(signum, SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+def _forget_lock_files():
+    """Drop the lock files inherited from the parent process after a fork"""
+    global _LOCK_FILES_LOCK
+    # the lock may have been held by another thread of the parent at fork time
+    _LOCK_FILES_LOCK = threading.RLock()
+    _LOCK_FILES.clear()
+
+
+atexit.register(release_all_locks)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_lock_files)
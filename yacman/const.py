@@ -11,6 +11,7 @@ ORI_STATE_KEY = "ori_state"
 WAIT_MAX_KEY = "wait_time"
 ALIASES_KEY = "aliases"
 ALIASES_KEY_RAW = "aliases_raw"
+ALIASES_SOURCE_KEY = "aliases_source"
 WRITE_VALIDATE_KEY = "write_validate"
 SCHEMA_KEY = "schema"
 
@@ -23,6 +24,7 @@ ATTR_KEYS = (
     WAIT_MAX_KEY,
     ALIASES_KEY,
     ALIASES_KEY_RAW,
+    ALIASES_SOURCE_KEY,
     WRITE_VALIDATE_KEY,
     SCHEMA_KEY,
 )
@@ -1,6 +1,14 @@
 """Package exception types"""
 
-__all__ = ["FileFormatError", "AliasError", "UndefinedAliasError"]
+__all__ = [
+    "FileFormatError",
+    "AliasError",
+    "UndefinedAliasError",
+    "AmbiguousAliasError",
+    "LockTimeoutError",
+    "MergeConflictError",
+    "JSONPatchError",
+]
 
 
 class FileFormatError(Exception):
@@ -19,3 +27,42 @@ class UndefinedAliasError(AliasError):
     """Alias is is not defined."""
 
     pass
+
+
+class AmbiguousAliasError(AliasError):
+    """Prefix matches the aliases or names of several keys."""
+
+    def __init__(self, prefix, candidates):
+        """
+        :param str prefix: prefix that was looked up
+        :param list[str] candidates: keys matched by the prefix
+        """
+        self.prefix = prefix
+        self.candidates = candidates
+        super(AmbiguousAliasError, self).__init__(
+            f"Ambiguous prefix '{prefix}' matches: {', '.join(candidates)}"
+        )
+
+
+class LockTimeoutError(RuntimeError):
+    """Lock could not be acquired within the maximum wait time."""
+
+    pass
+
+
+class MergeConflictError(RuntimeError):
+    """Local and concurrent changes conflict."""
+
+    def __init__(self, conflicts):
+        """
+        :param list[tuple[str]] conflicts: conflicting key paths
+        """
+        self.conflicts = conflicts
+        paths = ", ".join(".".join(map(str, path)) or "<root>" for path in conflicts)
+        super(MergeConflictError, self).__init__(f"Conflicting changes to: {paths}")
+
+
+class JSONPatchError(ValueError):
+    """JSON Patch operation could not be applied."""
+
+    pass
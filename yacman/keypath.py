@@ -0,0 +1,330 @@
+"""
+Access to nested config values by key path.
+
+A key path is a dotted string, e.g. "genomes.hg38.assets.fasta", or a
+sequence of keys, for keys that contain dots. Parsed dotted paths are
+cached, so repeated lookups do not split the strings again. Lists, and
+packed numeric arrays, are indexed by the integer value of the key.
+
+Each key is looked up with the `[]` operator of the object it applies to,
+so aliases defined by the objects, e.g. `AliasedYacAttMap`, are resolved at
+every level.
+"""
+
+from array import array
+from collections.abc import Mapping, MutableMapping
+from contextlib import nullcontext
+from copy import copy
+from functools import lru_cache
+
+__all__ = ["KeyPathMixin", "del_path", "get_path", "get_paths", "set_path"]
+
+KEY_PATH_SEP = "."
+PARSED_PATHS_CACHE_SIZE = 4096
+
+# marks a missing default value
+_MISSING = object()
+
+# containers indexed by position
+_SEQUENCES = (list, array)
+
+
+@lru_cache(maxsize=PARSED_PATHS_CACHE_SIZE)
+def _split(path):
+    return tuple(path.split(KEY_PATH_SEP)) if path else ()
+
+
+def parse_key_path(path):
+    """
+    Convert a key path to a tuple of keys
+
+    :param str | Iterable[str] path: dotted key path or a sequence of keys
+    :return tuple[str]: keys
+    """
+    if isinstance(path, str):
+        return _split(path)
+    if isinstance(path, tuple):
+        return path
+    return tuple(path)
+
+
+def get_path(obj, path, default=_MISSING):
+    """
+    Get the value under a key path
+
+    :param Mapping obj: object to get the value from
+    :param str | Iterable[str] path: key path, e.g. "genomes.hg38.assets"
+    :param object default: value to return if the key path does not exist
+    :return object: the value
+    :raise KeyError: if the key path does not exist and no default is given
+    """
+    node = obj
+    try:
+        for key in parse_key_path(path):
+            node = _child(node, key)
+    except KeyError:
+        if default is _MISSING:
+            raise KeyError(path)
+        return default
+    return node
+
+
+def get_paths(obj, paths, default=None):
+    """
+    Get the values under several key paths
+
+    The paths are arranged in a tree, so the values under their common
+    prefixes are looked up only once.
+
+    :param Mapping obj: object to get the values from
+    :param Iterable[str | Iterable[str]] paths: key paths
+    :param object default: value for the key paths that do not exist
+    :return list[object]: the values, in the order of the paths
+    """
+    # each trie node is a pair of children by key and indices of the paths
+    # ending at the node
+    trie = ({}, [])
+    results = []
+    for i, path in enumerate(paths):
+        node = trie
+        for key in parse_key_path(path):
+            node = node[0].setdefault(key, ({}, []))
+        node[1].append(i)
+        results.append(default)
+    stack = [(obj, trie)]
+    while stack:
+        value, (children, indices) = stack.pop()
+        for i in indices:
+            results[i] = value
+        for key, child in children.items():
+            try:
+                stack.append((_child(value, key), child))
+            except KeyError:
+                pass
+    return results
+
+
+def set_path(obj, path, value, create_parents=True):
+    """
+    Set the value under a key path
+
+    :param MutableMapping obj: object to set the value in
+    :param str | Iterable[str] path: key path, e.g. "genomes.hg38.assets"
+    :param object value: value to set
+    :param bool create_parents: whether to create the missing mappings
+        along the key path
+    :raise KeyError: if a parent is missing and not to be created
+    :raise TypeError: if a parent is not a mapping or a list
+    """
+    keys = _non_empty(path)
+    parent = _parent(obj, keys, path, create_parents)
+    _assign(parent, keys[-1], value)
+
+
+def del_path(obj, path):
+    """
+    Delete the value under a key path
+
+    :param MutableMapping obj: object to delete the value from
+    :param str | Iterable[str] path: key path, e.g. "genomes.hg38.assets"
+    :raise KeyError: if the key path does not exist
+    """
+    keys = _non_empty(path)
+    parent = _parent(obj, keys, path, False)
+    _remove(parent, keys[-1], path)
+
+
+class KeyPathMixin(object):
+    """
+    Key path access for config managers
+
+    In thread-safe mode, or once a snapshot is taken, values are set and
+    deleted copy-on-write: the containers along the key path are copied and
+    the new data replace the current ones at once. Lookups use the
+    `key_path_index` of the object, if any.
+    """
+
+    __slots__ = ()
+
+    key_path_index = None
+
+    def get_path(self, path, default=_MISSING):
+        """
+        Get the value under a key path
+
+        :param str | Iterable[str] path: key path, e.g. "genomes.hg38.assets"
+        :param object default: value to return if the key path does not exist
+        :return object: the value
+        :raise KeyError: if the key path does not exist and no default is given
+        """
+        index = self.key_path_index
+        if index is not None:
+            node = index.get(path, _MISSING)
+            if node is not _MISSING:
+                return self._view(node)
+            if not index.under_list(path):
+                if default is _MISSING:
+                    raise KeyError(path)
+                return default
+        return get_path(self, path, default)
+
+    def get_paths(self, paths, default=None):
+        """
+        Get the values under several key paths, looking up common prefixes
+        only once
+
+        :param Iterable[str | Iterable[str]] paths: key paths
+        :param object default: value for the key paths that do not exist
+        :return list[object]: the values, in the order of the paths
+        """
+        return get_paths(self, paths, default)
+
+    def set_path(self, path, value, create_parents=True):
+        """
+        Set the value under a key path
+
+        :param str | Iterable[str] path: key path, e.g. "genomes.hg38.assets"
+        :param object value: value to set
+        :param bool create_parents: whether to create the missing mappings
+            along the key path
+        :raise KeyError: if a parent is missing and not to be created
+        :raise TypeError: if a parent is not a mapping or a list
+        """
+        self._check_writable()
+        if not self._copy_on_write():
+            set_path(self, path, value, create_parents)
+            self._key_path_changed(path)
+            return
+        keys = _non_empty(path)
+        with self._edit_context():
+            data = copy(self.data)
+            _assign(_parent(data, keys, path, create_parents, True), keys[-1], value)
+            self._publish(data)
+
+    def del_path(self, path):
+        """
+        Delete the value under a key path
+
+        :param str | Iterable[str] path: key path, e.g. "genomes.hg38.assets"
+        :raise KeyError: if the key path does not exist
+        """
+        self._check_writable()
+        if not self._copy_on_write():
+            del_path(self, path)
+            self._key_path_changed(path)
+            return
+        keys = _non_empty(path)
+        with self._edit_context():
+            data = copy(self.data)
+            _remove(_parent(data, keys, path, False, True), keys[-1], path)
+            self._publish(data)
+
+    def _copy_on_write(self):
+        """
+        :return bool: whether changes must be made on copies of the data
+        """
+        return getattr(self, "_edit_lock", None) is not None
+
+    def _view(self, value):
+        """
+        :return object: the value as handed out by the object
+        """
+        return value
+
+    def _check_writable(self):
+        """
+        :raise TypeError: if the object is read-only
+        """
+        pass
+
+    def _edit_context(self):
+        edit_lock = getattr(self, "_edit_lock", None)
+        return edit_lock if edit_lock is not None else nullcontext()
+
+    def _key_path_changed(self, path):
+        """
+        Called after a change made in place under a key path
+
+        :param str | Iterable[str] path: key path
+        """
+        pass
+
+
+def _non_empty(path):
+    keys = parse_key_path(path)
+    if not keys:
+        raise KeyError("Empty key path")
+    return keys
+
+
+def _parent(obj, keys, path, create_parents, copy_containers=False):
+    """
+    Get the container of the value under a key path
+
+    :param MutableMapping obj: object the key path applies to
+    :param tuple[str] keys: keys of the path
+    :param str | Iterable[str] path: key path, for error messages
+    :param bool create_parents: whether to create the missing mappings
+    :param bool copy_containers: whether to replace the containers along
+        the key path with copies, which can then be changed without
+        affecting the original ones
+    :return MutableMapping | list | array.array: the container
+    """
+    node = obj
+    for key in keys[:-1]:
+        try:
+            child = _child(node, key)
+        except KeyError:
+            if not create_parents:
+                raise KeyError(path)
+            child = {}
+        else:
+            if not isinstance(child, (MutableMapping,) + _SEQUENCES):
+                raise TypeError(
+                    f"Can't set a key in a {child.__class__.__name__}: '{key}' "
+                    f"in key path {path}"
+                )
+            if copy_containers:
+                child = copy(child)
+            else:
+                node = child
+                continue
+        _assign(node, key, child)
+        node = child
+    return node
+
+
+def _child(node, key):
+    """
+    Get a child value of a mapping or list
+
+    :raise KeyError: if there is no such child
+    """
+    if isinstance(node, _SEQUENCES):
+        try:
+            return node[int(key)]
+        except (ValueError, IndexError):
+            raise KeyError(key)
+    if type(node) is not dict and not isinstance(node, Mapping):
+        raise KeyError(key)
+    return node[key]
+
+
+def _assign(node, key, value):
+    if isinstance(node, _SEQUENCES):
+        try:
+            node[int(key)] = value
+        except (ValueError, IndexError):
+            raise KeyError(key)
+    else:
+        node[key] = value
+
+
+def _remove(node, key, path):
+    try:
+        if isinstance(node, _SEQUENCES):
+            del node[int(key)]
+        else:
+            del node[key]
+    except (KeyError, ValueError, IndexError):
+        raise KeyError(path)
@@ -0,0 +1,1458 @@
+"""
+File locking for yacman config managers.
+
+Extends the ubiquerg three-lock system (read, write, universal lock files)
+with key-path granular locks, so that processes updating unrelated sections
+of the same config do not serialize on a single per-file lock.
+
+Whole-file locks go through a process-level registry, keyed by path, so
+all the lockers for a file in a process share one re-entrant lock, and
+only the outermost acquisition creates lock files.
+
+An upgradable read lock coexists with read locks, but not with other
+upgradable or write locks, and can be turned into a write lock without
+being released, by taking a write lock within it.
+
+Waiters take tickets in a FIFO queue, both within the process and on disk,
+which is evaluated according to the lock policy: reader-preferring (readers
+go ahead whenever no writer holds the lock), writer-preferring (readers wait
+for all queued writers) or fair (every waiter waits for the earlier
+incompatible waiters).
+
+Lock files are registered for removal on interrupts and at exit (see
+yacman.cleanup). A forked child process forgets the locks it inherited.
+"""
+
+import glob
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from ubiquerg import READ, WRITE, ThreeLocker, create_file_racefree, ensure_write_access
+from ubiquerg.file_locking import READ_GLOB, UNIVERSAL
+
+from .cleanup import register_lock_file, unregister_lock_file
+from .const import DEFAULT_WAIT_TIME
+from .exceptions import LockTimeoutError
+from .lockstats import (
+    record_acquisition,
+    record_release,
+    record_stale_reclaim,
+    record_timeout,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "ConfigLocker",
+    "FAIR",
+    "READER_PREFERRING",
+    "WRITER_PREFERRING",
+    "lock_queue",
+    "read_lock",
+    "upgradable_read_lock",
+    "write_lock",
+]
+
+KEY_PATH_SEP = "."
+# key path lock entries look like ubiquerg read locks, with a key token
+# appended to the PID, so that whole-file writers wait for them
+KEY_LOCK_TEMPLATE = "lock-read-{pid}k{token}-{name}"
+QUEUE_TEMPLATE = "lock-queue-{ticket:012d}-{role}-{pid}-{name}"
+UPGRADE_TEMPLATE = "lock-upgrade-{name}"
+READ_LOCK_TEMPLATE = "lock-read-{pid}-{name}"
+UPGRADABLE = "upgradable"
+# lock modes, as named in the lock metrics
+STATS_MODES = {READ: "read", WRITE: "write", UPGRADABLE: "upgradable"}
+KEY_PATH_STATS_MODE = "key_path"
+MAX_SLEEP = 0.5
+# queued waiters poll more often, to notice when their turn comes, and less
+# often for every waiter they wait for
+QUEUED_MAX_SLEEP = 0.002
+# the universal lock is only held for short critical sections
+UNIVERSAL_MAX_SLEEP = 0.002
+# queue roles of the key path lock and commit lock waiters
+KEY_PATH_ROLE = "key"
+COMMIT_ROLE = "commit"
+# contents of the write lock file while it is a commit lock
+COMMIT_LOCK_MARK = "commit"
+
+READER_PREFERRING = "reader"
+WRITER_PREFERRING = "writer"
+FAIR = "fair"
+LOCK_POLICIES = (READER_PREFERRING, WRITER_PREFERRING, FAIR)
+
+
+class ConfigLocker(ThreeLocker):
+    """
+    A ThreeLocker that can also lock individual key paths within the file.
+
+    Key path locks follow the multiple-granularity locking protocol: every
+    key path lock acts as an intention lock on its ancestors, so a lock on
+    'genomes' conflicts with a lock on 'genomes.hg38', whereas locks on
+    'genomes.hg38' and 'genomes.mm10' do not. Each key path lock also counts
+    as a read lock for whole-file writers, which therefore wait until all
+    key path locks are released.
+
+    The locks are held by the thread that acquired them: a locker shared by
+    several threads reports, in `locked`, `key_paths` and `ticket`, the
+    locks of the calling thread only.
+
+    Unlike ThreeLocker, the universal lock is never held while waiting for
+    other locks to be released, so that key path holders can always enter the
+    short file-level critical section needed to commit their changes.
+
+    For files in the multi-version layout (see yacman.mvcc), read locks are
+    not backed by lock files: readers open an immutable version of the file,
+    so they never wait for writers, nor make writers wait.
+
+    Waiters are ordered by tickets, which are files in the lock directory, and
+    are let through according to the lock policy. Key path locks queue as
+    readers with respect to whole-file writers, since they are compatible with
+    each other at the file level, and wait for the earlier waiters for
+    conflicting key paths, whose entries their tickets hold. Commit locks wait
+    for the earlier commit locks only, so key path writers commit in turn.
+    Queued waiters only enter the universal lock once their turn has come.
+
+    An upgradable read lock is a read lock file, which keeps writers out,
+    and an upgrade lock file, which keeps other upgradable lock holders out.
+    Upgrading queues as a writer and waits for the other readers to leave,
+    so no other writer can get the lock in the meantime.
+    """
+
+    def __init__(
+        self,
+        filepath,
+        wait_max=DEFAULT_WAIT_TIME,
+        strict_ro_locks=False,
+        mvcc=False,
+        policy=READER_PREFERRING,
+    ):
+        if policy not in LOCK_POLICIES:
+            raise ValueError(
+                f"Unknown lock policy: '{policy}'. Choose from: {LOCK_POLICIES}"
+            )
+        self._shared = None
+        # locks held through this locker, by thread ID
+        self._threads = {}
+        self.policy = policy
+        super(ConfigLocker, self).__init__(
+            filepath, wait_max=wait_max, strict_ro_locks=strict_ro_locks
+        )
+        self.mvcc = mvcc
+        self.transaction = None
+        _LOCKERS.add(self)
+
+    @property
+    def locked(self):
+        """
+        Whole-file lock modes held by the calling thread, key path locks
+        counting as read locks, and write key path locks as write locks
+
+        :return dict[str, bool]: whether READ and WRITE are held
+        """
+        holds = self._threads.get(threading.get_ident())
+        if holds is None:
+            return {READ: False, WRITE: False}
+        key_path_modes = [mode for mode, _ in holds.key_paths.values()]
+        write = bool(holds.holds[WRITE]) or WRITE in key_path_modes
+        read = (
+            write
+            or bool(holds.holds[READ])
+            or bool(holds.holds[UPGRADABLE])
+            or bool(key_path_modes)
+        )
+        return {READ: read, WRITE: write}
+
+    @locked.setter
+    def locked(self, value):
+        # set by ThreeLocker; the state follows the locks of each thread
+        pass
+
+    @property
+    def key_paths(self):
+        """
+        Key paths locked by the calling thread through this locker
+
+        :return dict[tuple[str], (str, str)]: mode and lock entry path of
+            each key path
+        """
+        return self._thread_holds().key_paths
+
+    @property
+    def ticket(self):
+        """
+        Queue ticket of the calling thread, while it waits for a lock
+
+        :return (int, str) | NoneType: ticket number and path
+        """
+        holds = self._threads.get(threading.get_ident())
+        return None if holds is None else holds.ticket
+
+    @ticket.setter
+    def ticket(self, ticket):
+        self._thread_holds().ticket = ticket
+        self._forget_idle_thread()
+
+    @property
+    def _holds(self):
+        return self._thread_holds().holds
+
+    @property
+    def _stats_holds(self):
+        return self._thread_holds().stats_holds
+
+    @property
+    def _key_path_stats_holds(self):
+        return self._thread_holds().key_path_stats_holds
+
+    def _thread_holds(self):
+        """
+        :return _ThreadHolds: locks held by the calling thread through this
+            locker
+        """
+        tid = threading.get_ident()
+        holds = self._threads.get(tid)
+        if holds is None:
+            holds = self._threads[tid] = _ThreadHolds()
+        return holds
+
+    def _forget_idle_thread(self):
+        """
+        Drop the lock state of the calling thread if it holds nothing
+        """
+        tid = threading.get_ident()
+        holds = self._threads.get(tid)
+        if holds is not None and holds.idle:
+            del self._threads[tid]
+
+    def set_file_path(self, filepath):
+        if any(not holds.idle for holds in self._threads.values()):
+            raise RuntimeError("Can't change the file path of a held lock")
+        if self._shared is not None:
+            _release_shared_lock(self._shared)
+            self._shared = None
+        filepath = super(ConfigLocker, self).set_file_path(filepath)
+        if filepath:
+            self._set_own_lock_paths()
+            self._shared = _get_shared_lock(filepath)
+        return filepath
+
+    def _set_own_lock_paths(self):
+        base, name = os.path.split(self.filepath)
+        self.lock_paths[UPGRADABLE] = os.path.join(
+            base, UPGRADE_TEMPLATE.format(name=name)
+        )
+        # ubiquerg names read locks after the process ID at import time, which
+        # is the parent's in forked processes
+        self.lock_paths[READ] = os.path.join(
+            base, READ_LOCK_TEMPLATE.format(pid=os.getpid(), name=name)
+        )
+
+    def _forget_locks(self):
+        """
+        Drop the locks held by this locker without releasing them; used in
+        forked child processes, which do not own the locks of their parent
+        """
+        self._threads = {}
+        self.transaction = None
+        if self.filepath:
+            self._set_own_lock_paths()
+
+    def read_lock(self, wait_max=None):
+        """
+        Lock the whole file for reading.
+
+        Only the outermost lock acquisition in the process creates lock
+        files; nested or repeated acquisitions, also by other lockers for
+        the same file, are counted in the process lock registry.
+
+        :param int wait_max: max wait time if the file is already locked,
+            defaults to the locker setting
+        :return bool: whether the lock was acquired
+        """
+        if not self.filepath:
+            _LOGGER.warning("No filepath, no need to lock.")
+            return True
+        return self._lock(READ, self._shared.acquire_read, wait_max)
+
+    def upgradable_lock(self, wait_max=None):
+        """
+        Lock the whole file for reading, with the option to upgrade the lock
+        to a write lock later on, by calling `write_lock`.
+
+        Only one upgradable lock can be held on a file at a time, so upgrades
+        never deadlock with each other.
+
+        :param int wait_max: max wait time if the file is already locked,
+            defaults to the locker setting
+        :return bool: whether the lock was acquired
+        """
+        if not self.filepath:
+            _LOGGER.warning("No filepath, no need to lock.")
+            return True
+        return self._lock(UPGRADABLE, self._shared.acquire_upgradable, wait_max)
+
+    def upgradable_unlock(self):
+        if not self.filepath:
+            _LOGGER.warning("No filepath, no need to unlock.")
+            return True
+        return self._unlock(UPGRADABLE, self._shared.release_upgradable)
+
+    def write_lock(self, wait_max=None):
+        """
+        Lock the whole file for writing.
+
+        Only the outermost lock acquisition in the process creates lock
+        files; nested or repeated acquisitions, also by other lockers for
+        the same file, are counted in the process lock registry. Within an
+        upgradable lock, the lock is upgraded in place.
+
+        :param int wait_max: max wait time if the file is already locked,
+            defaults to the locker setting
+        :return bool: whether the lock was acquired
+        """
+        if not self.filepath:
+            _LOGGER.warning("No filepath, no need to lock.")
+            return True
+        lock_path = self.lock_paths[WRITE]
+        if not ensure_write_access(lock_path, self.strict_ro_locks):
+            # for writing, just fail anyway
+            raise OSError(f"No write access to '{lock_path}'; can't lock file.")
+        return self._lock(WRITE, self._shared.acquire_write, wait_max)
+
+    def read_unlock(self):
+        if not self.filepath:
+            _LOGGER.warning("No filepath, no need to unlock.")
+            return True
+        return self._unlock(READ, self._shared.release_read)
+
+    def write_unlock(self):
+        if not self.filepath:
+            _LOGGER.warning("No filepath, no need to unlock.")
+            return True
+        return self._unlock(WRITE, self._shared.release_write)
+
+    def _lock(self, mode, acquire, wait_max):
+        """
+        Acquire a whole-file lock through the process lock registry, and
+        record the lock metrics
+
+        :param str mode: READ, WRITE or UPGRADABLE
+        :param callable(ConfigLocker, float) acquire: shared lock method
+        :param int wait_max: max wait time, defaults to the locker setting
+        :return bool: whether the lock was acquired
+        """
+        start = time.monotonic()
+        try:
+            acquire(self, self._wait_max(wait_max))
+        except LockTimeoutError:
+            record_timeout(
+                self._shared.key, STATS_MODES[mode], time.monotonic() - start
+            )
+            raise
+        hold = record_acquisition(
+            self._shared.key, STATS_MODES[mode], time.monotonic() - start
+        )
+        holds = self._thread_holds()
+        holds.stats_holds[mode].append(hold)
+        holds.holds[mode] += 1
+        return True
+
+    def _unlock(self, mode, release):
+        """
+        Release a whole-file lock through the process lock registry
+
+        :param str mode: READ, WRITE or UPGRADABLE
+        :param callable(ConfigLocker) release: shared lock method
+        :return bool: whether a lock was released
+        """
+        holds = self._threads.get(threading.get_ident())
+        if holds is None or not holds.holds[mode]:
+            return False
+        release(self)
+        holds.holds[mode] -= 1
+        record_release(holds.stats_holds[mode].pop())
+        self._forget_idle_thread()
+        return True
+
+    def create_read_lock(self, filepath=None, wait_max=None):
+        """
+        Securely create a read lock file.
+
+        :param str filepath: ignored, kept for ThreeLocker compatibility
+        :param int wait_max: max wait time if the file is already locked
+        """
+        if self.mvcc:
+            # readers open an immutable version of the file
+            return
+        if not ensure_write_access(self.lock_paths[READ], self.strict_ro_locks):
+            return
+
+        def _try_read_lock():
+            if os.path.exists(self.lock_paths[WRITE]):
+                return False
+            self._create_lock_file(self.lock_paths[READ])
+            return True
+
+        self._acquire(_try_read_lock, wait_max, "read lock", role="read")
+
+    def create_write_lock(self, filepath=None, wait_max=None):
+        """
+        Securely create a write lock file.
+
+        :param str filepath: ignored, kept for ThreeLocker compatibility
+        :param int wait_max: max wait time if the file is already locked
+        """
+
+        def _try_write_lock():
+            if os.path.exists(self.lock_paths[WRITE]) or glob.glob(
+                self.lock_paths[READ_GLOB]
+            ):
+                return False
+            self._create_lock_file(self.lock_paths[READ])
+            self._create_lock_file(self.lock_paths[WRITE])
+            return True
+
+        self._acquire(_try_write_lock, wait_max, "write lock", role="write")
+
+    def create_upgradable_lock(self, wait_max=None):
+        """
+        Securely create the upgrade lock file, and a read lock file if needed
+
+        :param int wait_max: max wait time if the file is already locked
+        """
+        upgrade_path = self.lock_paths[UPGRADABLE]
+
+        def _try_upgradable_lock():
+            if os.path.exists(self.lock_paths[WRITE]):
+                return False
+            if os.path.exists(upgrade_path) and not _reclaim_stale(
+                upgrade_path, self.filepath
+            ):
+                return False
+            self._create_lock_file(upgrade_path, str(os.getpid()))
+            if not os.path.exists(self.lock_paths[READ]):
+                self._create_lock_file(self.lock_paths[READ])
+            return True
+
+        self._acquire(_try_upgradable_lock, wait_max, "upgradable lock", role="read")
+
+    def create_upgraded_lock(self, wait_max=None):
+        """
+        Securely create a write lock file for the holder of the upgradable
+        lock, once the other readers are gone
+
+        :param int wait_max: max wait time for the other readers
+        """
+        wait_max = self._wait_max(wait_max)
+
+        def _try_upgrade():
+            for lock_path in glob.glob(self.lock_paths[READ_GLOB]):
+                if lock_path != self.lock_paths[READ]:
+                    return False
+            self._create_lock_file(self.lock_paths[WRITE])
+            return True
+
+        # queue as a writer, so that new readers wait unless readers are
+        # preferred, but do not wait for the writers queued ahead, which are
+        # waiting for this lock anyway
+        with self._universal_lock(time.monotonic() + wait_max):
+            self.ticket = self._take_ticket("write")
+        self._acquire(_try_upgrade, wait_max, "lock upgrade")
+
+    def _wait_max(self, wait_max):
+        return self.wait_max if wait_max is None else wait_max
+
+    def __del__(self):
+        shared = getattr(self, "_shared", None)
+        if shared is None:
+            return
+        # the locks of every thread, which are all gone
+        for holds in list(self._threads.values()):
+            for key_path, (_, entry_path) in holds.key_paths.items():
+                _remove_lock_file(entry_path)
+                record_release(holds.key_path_stats_holds.pop(key_path))
+            for mode, release in (
+                (READ, shared.release_read),
+                (WRITE, shared.release_write),
+                (UPGRADABLE, shared.release_upgradable),
+            ):
+                while holds.holds[mode]:
+                    release(self)
+                    holds.holds[mode] -= 1
+                    record_release(holds.stats_holds[mode].pop())
+        self._threads = {}
+        _release_shared_lock(shared)
+        self._shared = None
+
+    def key_path_lock(self, path, mode=WRITE, wait_max=None):
+        """
+        Lock a key path within the file.
+
+        :param str | Iterable[str] path: dotted key path or a sequence of keys
+        :param str mode: READ or WRITE
+        :param int wait_max: max wait time if the key path is already locked
+        :return bool: whether the lock was acquired
+        """
+        if not self.filepath:
+            _LOGGER.warning("No filepath, no need to lock.")
+            return True
+        key_path = split_key_path(path)
+        entry = {"mode": "write" if mode == WRITE else "read", "path": list(key_path)}
+        entry_path = self._key_lock_path()
+
+        def _try_key_path_lock():
+            if _is_write_locked(self.lock_paths[WRITE]):
+                return False
+            for held in self._key_lock_entries():
+                if _key_paths_conflict(held, entry):
+                    return False
+            self._create_lock_file(entry_path, json.dumps(entry))
+            return True
+
+        start = time.monotonic()
+        try:
+            self._acquire(
+                _try_key_path_lock,
+                wait_max,
+                f"key path lock on {path}",
+                role=KEY_PATH_ROLE,
+                entry=entry,
+            )
+        except LockTimeoutError:
+            record_timeout(
+                self._shared.key, KEY_PATH_STATS_MODE, time.monotonic() - start
+            )
+            raise
+        self._key_path_stats_holds[key_path] = record_acquisition(
+            self._shared.key, KEY_PATH_STATS_MODE, time.monotonic() - start
+        )
+        self.key_paths[key_path] = (mode, entry_path)
+        return True
+
+    def key_path_unlock(self, path=None):
+        """
+        Release a key path lock held by this locker.
+
+        :param str | Iterable[str] path: key path to unlock; all the key
+            paths locked by this locker are unlocked if not provided
+        :return bool: whether any locks were released
+        """
+        if path is None:
+            key_paths = list(self.key_paths)
+        else:
+            key_paths = [split_key_path(path)]
+        released = False
+        for key_path in key_paths:
+            if key_path in self.key_paths:
+                _remove_lock_file(self.key_paths.pop(key_path)[1])
+                record_release(self._key_path_stats_holds.pop(key_path))
+                released = True
+        self._forget_idle_thread()
+        return released
+
+    @property
+    def write_key_paths(self):
+        """
+        Key paths write-locked by this locker
+
+        :return list[tuple[str]]: write-locked key paths
+        """
+        return [kp for kp, (mode, _) in self.key_paths.items() if mode == WRITE]
+
+    @contextmanager
+    def commit_lock(self, wait_max=None):
+        """
+        Briefly lock the whole file for writing, disregarding key path locks.
+
+        This is the file-level critical section used by key path lock holders
+        to merge their subtree changes into the file. It waits for whole-file
+        readers and writers, but not for other key path locks, and new key
+        path locks do not wait for it, since it only writes the subtrees its
+        holder locked. Commit lock waiters are served in the order they queued.
+        """
+
+        def _try_commit_lock():
+            if os.path.exists(self.lock_paths[WRITE]):
+                return False
+            if any(
+                _is_file_read_lock(p, self.filepath)
+                for p in glob.glob(self.lock_paths[READ_GLOB])
+            ):
+                return False
+            self._create_lock_file(self.lock_paths[WRITE], COMMIT_LOCK_MARK)
+            return True
+
+        self._acquire(_try_commit_lock, wait_max, "commit lock", role=COMMIT_ROLE)
+        try:
+            yield
+        finally:
+            _remove_lock_file(self.lock_paths[WRITE])
+
+    @property
+    def queue_position(self):
+        """
+        Number of waiters queued ahead of this locker for the file
+
+        :return int | None: queue position, None if this locker is not queued
+        """
+        ticket = self.ticket
+        if ticket is None:
+            return None
+        return sum(1 for t, _, _ in self._lock_queue() if t < ticket[0])
+
+    def _acquire(self, try_acquire, wait_max, what, role=None, entry=None):
+        """
+        Repeatedly attempt to acquire a lock within the universal lock.
+
+        With a role, the waiter is queued if the policy requires it, and only
+        attempts to acquire the lock when the policy allows it. Once queued,
+        the waiter checks its turn without the universal lock, since only the
+        tickets ahead of it matter, and no ticket is added ahead: until its
+        turn comes, it only checks that one of the tickets it waits for still
+        exists, and reads the whole queue again when it is gone.
+
+        :param callable() -> bool try_acquire: attempts to acquire the lock
+            and returns whether it succeeded; always called with the
+            universal lock held
+        :param int wait_max: max wait time
+        :param str what: description of the lock, for messages
+        :param str role: "read", "write", "key" or "commit"; the queue is
+            bypassed if not provided
+        :param dict entry: key path lock entry, for the "key" role
+        :raise LockTimeoutError: if the lock was not acquired within wait_max
+        """
+        wait_max = self.wait_max if wait_max is None else wait_max
+        deadline = time.monotonic() + wait_max
+        sleeptime = 0.001
+        queued = role in ("write", KEY_PATH_ROLE, COMMIT_ROLE) or (
+            role is not None and self.policy == FAIR
+        )
+        position = None
+        watched = None
+        waiting = 0
+        refreshed = 0
+        try:
+            while True:
+                if self.ticket is None:
+                    with self._universal_lock(deadline):
+                        if queued:
+                            self.ticket = self._take_ticket(role, entry)
+                        if not self._queue_blockers(role, entry):
+                            if try_acquire():
+                                return
+                elif (
+                    watched is None
+                    or not os.path.exists(watched)
+                    or time.monotonic() - refreshed >= MAX_SLEEP
+                ):
+                    # read the whole queue, also to drop the tickets of dead
+                    # processes every now and then
+                    queue = self._lock_queue()
+                    refreshed = time.monotonic()
+                    blockers = self._queue_blockers(role, entry, queue)
+                    if blockers:
+                        # the middle one, so the queue is read again about
+                        # log2(len(blockers)) times, and polled more often as
+                        # the turn of this waiter comes closer
+                        waiting = (len(blockers) + 1) // 2
+                        watched = blockers[waiting - 1][2]
+                    else:
+                        if watched is not None:
+                            # our turn came, so check again soon
+                            watched = None
+                            sleeptime = 0.001
+                        with self._universal_lock(deadline):
+                            if try_acquire():
+                                return
+                    new_position = sum(1 for t, _, _ in queue if t < self.ticket[0])
+                    if new_position != position:
+                        position = new_position
+                        _LOGGER.debug(
+                            f"Waiting for the {what}, queue position: {position}"
+                        )
+                if time.monotonic() >= deadline:
+                    raise LockTimeoutError(
+                        f"The maximum wait time ({wait_max}) has been reached and "
+                        f"the {what} could not be acquired for: {self.filepath}"
+                    )
+                time.sleep(sleeptime)
+                if self.ticket is None:
+                    max_sleep = MAX_SLEEP
+                else:
+                    max_sleep = min(QUEUED_MAX_SLEEP * max(waiting, 1), MAX_SLEEP)
+                sleeptime = min(sleeptime * 2, max_sleep)
+        finally:
+            if self.ticket is not None:
+                _remove_lock_file(self.ticket[1])
+                self.ticket = None
+
+    def _take_ticket(self, role, entry=None):
+        """
+        Queue for the lock; must be called with the universal lock held
+
+        :param str role: "read", "write", "key" or "commit"
+        :param dict entry: key path lock entry, written to the ticket file
+        :return (int, str): ticket number and path to the ticket file
+        """
+        ticket = max((t for t, _, _ in self._lock_queue()), default=0) + 1
+        base, name = os.path.split(self.filepath)
+        ticket_path = os.path.join(
+            base,
+            QUEUE_TEMPLATE.format(ticket=ticket, role=role, pid=os.getpid(), name=name),
+        )
+        self._create_lock_file(
+            ticket_path, None if entry is None else json.dumps(entry)
+        )
+        return ticket, ticket_path
+
+    def _queue_blockers(self, role, entry=None, queue=None):
+        """
+        Find the queued waiters that this locker has to wait for
+
+        :param str role: "read", "write", "key" or "commit"
+        :param dict entry: key path lock entry, for the "key" role
+        :param list[(int, str, str)] queue: the queue of waiters, read if
+            not provided
+        :return list[(int, str, str)]: the waiters to wait for, in queue order
+        """
+        if role is None or (role == "read" and self.policy == READER_PREFERRING):
+            return []
+        ticket = None if self.ticket is None else self.ticket[0]
+        if queue is None:
+            queue = self._lock_queue()
+        if role == COMMIT_ROLE:
+            return [
+                waiter
+                for waiter in queue
+                if waiter[1] == COMMIT_ROLE and (ticket is None or waiter[0] < ticket)
+            ]
+        blockers = []
+        if role == KEY_PATH_ROLE:
+            for waiter in queue:
+                if waiter[1] == KEY_PATH_ROLE and waiter[0] < ticket:
+                    ahead = _read_key_path_entry(waiter[2])
+                    # an entry that is being written may conflict
+                    if ahead is None or _key_paths_conflict(ahead, entry):
+                        blockers.append(waiter)
+            if self.policy == READER_PREFERRING:
+                return blockers
+            role = "read"
+        blockers.extend(_queue_blockers(self.policy, role, ticket, queue))
+        return sorted(blockers)
+
+    def _lock_queue(self):
+        """
+        Read the queue of the waiters for the file, dropping the tickets of
+        processes that no longer exist
+
+        :return list[(int, str, str)]: ticket numbers, roles and ticket paths
+        """
+        queue = []
+        for ticket, role, pid, ticket_path in _read_lock_queue(self.filepath):
+            if pid != os.getpid() and not _pid_alive(pid):
+                _LOGGER.debug(f"Removing the ticket of a dead process: {ticket_path}")
+                record_stale_reclaim(lock_key(self.filepath))
+                _remove_lock_file(ticket_path)
+                continue
+            queue.append((ticket, role, ticket_path))
+        return queue
+
+    def _writers_queued(self):
+        """
+        Check whether any writers are queued for the file
+
+        :return bool: whether there are queued writers
+        """
+        return any(role == "write" for _, role, _ in self._lock_queue())
+
+    @contextmanager
+    def _universal_lock(self, deadline):
+        sleeptime = 0.001
+        while True:
+            try:
+                self._create_lock_file(self.lock_paths[UNIVERSAL])
+                break
+            except FileExistsError:
+                if time.monotonic() >= deadline:
+                    raise LockTimeoutError(
+                        f"The maximum wait time has been reached and the universal "
+                        f"lock still exists for: {self.filepath}"
+                    )
+                time.sleep(sleeptime)
+                sleeptime = min(sleeptime * 2, UNIVERSAL_MAX_SLEEP)
+        try:
+            yield
+        finally:
+            _remove_lock_file(self.lock_paths[UNIVERSAL])
+
+    def _create_lock_file(self, lock_path, contents=None):
+        create_file_racefree(lock_path)
+        register_lock_file(lock_path)
+        if contents is not None:
+            with open(lock_path, "w") as f:
+                f.write(contents)
+
+    def _key_lock_path(self):
+        base, name = os.path.split(self.filepath)
+        token = os.urandom(4).hex()
+        return os.path.join(
+            base, KEY_LOCK_TEMPLATE.format(pid=os.getpid(), token=token, name=name)
+        )
+
+    def _key_lock_entries(self):
+        """
+        Read all the key path lock entries for the file
+
+        :return list[dict]: entries with 'mode' and 'path' keys
+        """
+        entries = []
+        for lock_path in glob.glob(self.lock_paths[READ_GLOB]):
+            if _is_file_read_lock(lock_path, self.filepath):
+                continue
+            entry = _read_key_path_entry(lock_path)
+            # None if released in the meantime or not a key path lock
+            if entry is not None:
+                entries.append(entry)
+        return entries
+
+
+class _ThreadHolds(object):
+    """Locks held by a thread through a locker"""
+
+    __slots__ = ("holds", "stats_holds", "key_paths", "key_path_stats_holds", "ticket")
+
+    def __init__(self):
+        # nested acquisitions of each whole-file lock mode
+        self.holds = {READ: 0, WRITE: 0, UPGRADABLE: 0}
+        # lock metrics hold records, in acquisition order
+        self.stats_holds = {READ: [], WRITE: [], UPGRADABLE: []}
+        self.key_paths = {}
+        self.key_path_stats_holds = {}
+        self.ticket = None
+
+    @property
+    def idle(self):
+        """
+        :return bool: whether no lock is held nor waited for
+        """
+        return (
+            not any(self.holds.values()) and not self.key_paths and self.ticket is None
+        )
+
+
+class SharedFileLock(object):
+    """
+    Lock state of a file, shared by all the lockers for it in this process.
+
+    It is a re-entrant, in-process reader-writer lock that backs the lock
+    files: only the outermost acquisition creates lock files, and only the
+    last release removes them. Nested acquisitions by the thread that holds
+    the lock, like a read lock within a write lock, are counter increments.
+
+    Threads waiting for the lock take tickets, and are let through according
+    to the policy of the locker they use. Unless readers are preferred, new
+    readers also do not join a read lock already held by the process while
+    writers of other processes are queued for the file.
+
+    The thread that holds the upgradable lock is also counted as a reader.
+    While it upgrades, new readers wait.
+
+    Read locks taken through a locker in multi-version mode are only counted
+    per thread: the readers open an immutable version of the file, so they
+    neither wait for writers nor make writers wait, and create no lock files.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.refs = 0
+        self._reset()
+
+    def _reset(self):
+        """Set the initial, unlocked state"""
+        # re-entrant, like the registry lock
+        self.cond = threading.Condition(threading.RLock())
+        self.readers = {}
+        self.version_readers = {}
+        self.writer = None
+        self.write_count = 0
+        self.on_disk = None
+        self.transitioning = False
+        self.queue = []
+        self.tickets = itertools.count(1)
+        self.upgrader = None
+        self.upgrade_count = 0
+        self.upgrading = False
+
+    @property
+    def held(self):
+        return bool(self.readers) or self.writer is not None
+
+    def acquire_read(self, locker, wait_max):
+        tid = threading.get_ident()
+        with self.cond:
+            if locker.mvcc:
+                self.version_readers[tid] = self.version_readers.get(tid, 0) + 1
+                return
+            if self.writer == tid or self.readers.get(tid):
+                self.readers[tid] = self.readers.get(tid, 0) + 1
+                return
+            deadline = time.monotonic() + wait_max
+            policy = locker.policy
+            with self._queued("read") as ticket:
+                self._wait_for(
+                    lambda: self.writer is None
+                    and not self.transitioning
+                    and not self.upgrading
+                    and _queue_allows(policy, "read", ticket, self.queue)
+                    and (
+                        policy == READER_PREFERRING
+                        or self.on_disk is None
+                        or not locker._writers_queued()
+                    ),
+                    deadline,
+                )
+                if self.on_disk is None:
+                    self._lock_on_disk(READ, locker.create_read_lock, deadline)
+                self.readers[tid] = 1
+
+    def acquire_write(self, locker, wait_max):
+        tid = threading.get_ident()
+        with self.cond:
+            if self.writer == tid:
+                self.write_count += 1
+                return
+            if self.readers.get(tid):
+                if self.upgrader == tid:
+                    self._upgrade(locker, wait_max)
+                    return
+                raise RuntimeError(
+                    f"Can't write-lock a file that is read-locked by the same "
+                    f"thread, it would deadlock: {self.key}"
+                )
+            deadline = time.monotonic() + wait_max
+            policy = locker.policy
+            with self._queued("write") as ticket:
+                self._wait_for(
+                    lambda: self.writer is None
+                    and not self.readers
+                    and not self.transitioning
+                    and _queue_allows(policy, "write", ticket, self.queue),
+                    deadline,
+                )
+                self._lock_on_disk(WRITE, locker.create_write_lock, deadline)
+                self.writer = tid
+                self.write_count = 1
+
+    def acquire_upgradable(self, locker, wait_max):
+        tid = threading.get_ident()
+        with self.cond:
+            if self.upgrader == tid:
+                self.upgrade_count += 1
+                self.readers[tid] += 1
+                return
+            if self.writer == tid:
+                raise RuntimeError(
+                    f"Can't take an upgradable lock on a file that is write-locked "
+                    f"by the same thread: {self.key}"
+                )
+            deadline = time.monotonic() + wait_max
+            policy = locker.policy
+            with self._queued("read") as ticket:
+                self._wait_for(
+                    lambda: self.writer is None
+                    and self.upgrader is None
+                    and not self.transitioning
+                    and _queue_allows(policy, "read", ticket, self.queue),
+                    deadline,
+                )
+                self._lock_on_disk(READ, locker.create_upgradable_lock, deadline)
+                self.upgrader = tid
+                self.upgrade_count = 1
+                self.readers[tid] = self.readers.get(tid, 0) + 1
+
+    def _upgrade(self, locker, wait_max):
+        """
+        Turn the upgradable lock of the calling thread into a write lock,
+        once the other readers are gone; must be called with the condition
+        lock held
+        """
+        tid = threading.get_ident()
+        deadline = time.monotonic() + wait_max
+        self.upgrading = True
+        try:
+            self._wait_for(
+                lambda: list(self.readers) == [tid] and not self.transitioning,
+                deadline,
+            )
+            self._lock_on_disk(WRITE, locker.create_upgraded_lock, deadline)
+        finally:
+            self.upgrading = False
+            self.cond.notify_all()
+        self.writer = tid
+        self.write_count = 1
+
+    def release_upgradable(self, locker):
+        with self.cond:
+            tid = self.upgrader
+            self.upgrade_count -= 1
+            self.readers[tid] -= 1
+            if not self.readers[tid]:
+                del self.readers[tid]
+            if not self.upgrade_count:
+                self.upgrader = None
+                _remove_lock_file(locker.lock_paths[UPGRADABLE])
+            if not self.held:
+                _remove_lock_file(locker.lock_paths[READ])
+                self.on_disk = None
+            self.cond.notify_all()
+
+    def release_read(self, locker):
+        tid = threading.get_ident()
+        with self.cond:
+            if locker.mvcc and self.version_readers:
+                if not self.version_readers.get(tid):
+                    tid = next(iter(self.version_readers))
+                self.version_readers[tid] -= 1
+                if not self.version_readers[tid]:
+                    del self.version_readers[tid]
+                return
+            if not self.readers.get(tid):
+                tid = next(iter(self.readers))
+            self.readers[tid] -= 1
+            if not self.readers[tid]:
+                del self.readers[tid]
+            if not self.held:
+                _remove_lock_file(locker.lock_paths[READ])
+                self.on_disk = None
+            self.cond.notify_all()
+
+    def release_write(self, locker):
+        with self.cond:
+            self.write_count -= 1
+            if self.write_count:
+                return
+            writer, self.writer = self.writer, None
+            _remove_lock_file(locker.lock_paths[WRITE])
+            if self.readers.get(writer):
+                # still read-locked by the same thread; keep the read lock
+                self.on_disk = READ
+            else:
+                _remove_lock_file(locker.lock_paths[READ])
+                self.on_disk = None
+            self.cond.notify_all()
+
+    @contextmanager
+    def _queued(self, role):
+        """
+        Queue the calling thread for the lock; must be called with the
+        condition lock held
+
+        :param str role: "read" or "write"
+        :return int: ticket number
+        """
+        entry = (next(self.tickets), role)
+        self.queue.append(entry)
+        try:
+            yield entry[0]
+        finally:
+            self.queue.remove(entry)
+            self.cond.notify_all()
+
+    def _wait_for(self, predicate, deadline):
+        if not self.cond.wait_for(predicate, timeout=deadline - time.monotonic()):
+            raise LockTimeoutError(
+                f"The maximum wait time has been reached and the file is still "
+                f"locked by another thread: {self.key}"
+            )
+
+    def _lock_on_disk(self, mode, create_lock, deadline):
+        """
+        Create the lock files without holding the condition lock, so that
+        other threads are not blocked while we wait for other processes
+        """
+        self.transitioning = True
+        self.cond.release()
+        try:
+            create_lock(wait_max=max(deadline - time.monotonic(), 0))
+        finally:
+            self.cond.acquire()
+            self.transitioning = False
+            self.cond.notify_all()
+        self.on_disk = mode
+
+
+_REGISTRY = {}
+# re-entrant: a locker may be garbage collected, and release its shared lock,
+# while the registry is locked
+_REGISTRY_LOCK = threading.RLock()
+_LOCKERS = weakref.WeakSet()
+
+
+def lock_key(filepath):
+    """
+    Get the key that identifies a locked file within the process
+
+    The directory is resolved, but not the file itself, which may be a
+    symbolic link swapped by writers in the multi-version layout.
+
+    :param str filepath: path to the file
+    :return str: absolute path with the directory resolved
+    """
+    base, name = os.path.split(os.path.abspath(filepath))
+    return os.path.join(os.path.realpath(base), name)
+
+
+def _get_shared_lock(filepath):
+    key = lock_key(filepath)
+    with _REGISTRY_LOCK:
+        shared = _REGISTRY.get(key)
+        if shared is None:
+            shared = _REGISTRY[key] = SharedFileLock(key)
+        shared.refs += 1
+        return shared
+
+
+def _release_shared_lock(shared):
+    with _REGISTRY_LOCK:
+        shared.refs -= 1
+        if shared.refs <= 0 and not shared.held:
+            _REGISTRY.pop(shared.key, None)
+
+
+def _forget_inherited_locks():
+    """
+    Drop the lock state inherited from the parent process after a fork: the
+    parent keeps owning its lock files, and the threads that held them do not
+    exist in the child
+    """
+    global _REGISTRY_LOCK
+    _REGISTRY_LOCK = threading.RLock()
+    for shared in _REGISTRY.values():
+        shared._reset()
+    for locker in list(_LOCKERS):
+        locker._forget_locks()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_inherited_locks)
+
+
+def locked_read_file(filepath, create_file=False, locker=None):
+    """
+    Read a file contents into memory after read-locking the file.
+
+    Unlike the ubiquerg function, the lock goes through the process lock
+    registry, so it does not deadlock if the file is already locked by
+    this thread.
+
+    :param str filepath: path to the file that should be read
+    :param bool create_file: whether to create the file if it doesn't exist
+    :param ConfigLocker locker: locker to use, a new one is created if not provided
+    :return str: file contents
+    """
+    if os.path.exists(filepath):
+        locker = locker or ConfigLocker(filepath)
+        locker.read_lock()
+        try:
+            with open(filepath, "r") as f:
+                return f.read()
+        finally:
+            locker.read_unlock()
+    if create_file:
+        _LOGGER.info("File does not exist, but create_file is true. Creating...")
+        create_file_racefree(filepath)
+        return ""
+    raise FileNotFoundError(f"No such file: {filepath}")
+
+
+def lock_queue(filepath):
+    """
+    List the waiters queued for a file, in the order they are served
+
+    :param str filepath: path to the locked file
+    :return list[dict]: waiters, with 'ticket', 'role' and 'pid' keys
+    """
+    return [
+        {"ticket": ticket, "role": role, "pid": pid}
+        for ticket, role, pid, _ in _read_lock_queue(filepath)
+    ]
+
+
+def _read_lock_queue(filepath):
+    """
+    Read the ticket files of a locked file
+
+    :param str filepath: path to the locked file
+    :return list[(int, str, int, str)]: ticket numbers, roles, process IDs and
+        ticket paths, sorted by ticket
+    """
+    base, name = os.path.split(os.path.abspath(filepath))
+    pattern = re.compile(
+        r"^lock-queue-(\d+)-(read|write|key|commit)-(\d+)-" + re.escape(name) + r"$"
+    )
+    queue = []
+    for ticket_path in glob.glob(os.path.join(glob.escape(base), "lock-queue-*")):
+        match = pattern.match(os.path.basename(ticket_path))
+        if match is not None:
+            ticket, role, pid = match.groups()
+            queue.append((int(ticket), role, int(pid), ticket_path))
+    return sorted(queue)
+
+
+def _queue_allows(policy, role, ticket, queue):
+    """
+    Determine whether the lock policy lets a waiter acquire the lock, given
+    the waiters queued for it
+
+    :param str policy: lock policy
+    :param str role: "read" or "write"
+    :param int ticket: ticket of the waiter, None if it is not queued
+    :param Iterable[(int, str)] queue: tickets and roles of the queued waiters
+    :return bool: whether the waiter may acquire the lock
+    """
+    return not _queue_blockers(policy, role, ticket, queue)
+
+
+def _queue_blockers(policy, role, ticket, queue):
+    """
+    Find the queued waiters that the lock policy makes a waiter wait for
+
+    :param str policy: lock policy
+    :param str role: "read" or "write"
+    :param int ticket: ticket of the waiter, None if it is not queued
+    :param Iterable[tuple] queue: queued waiters, as tuples starting with
+        their ticket and role
+    :return list[tuple]: the waiters to wait for, in queue order
+    """
+    if role == "read":
+        if policy == READER_PREFERRING:
+            return []
+        if policy == WRITER_PREFERRING:
+            # readers wait for all the queued writers
+            ticket = None
+    ahead = [waiter for waiter in queue if ticket is None or waiter[0] < ticket]
+    if role == "write" and policy == FAIR:
+        return ahead
+    return [waiter for waiter in ahead if waiter[1] == "write"]
+
+
+def _reclaim_stale(lock_path, filepath):
+    """
+    Remove a lock file that holds the ID of a process that no longer exists
+
+    :param str lock_path: path to the lock file
+    :param str filepath: path to the locked file
+    :return bool: whether the lock file was removed
+    """
+    try:
+        with open(lock_path, "r") as f:
+            pid = int(f.read())
+    except (FileNotFoundError, ValueError):
+        return False
+    if pid == os.getpid() or _pid_alive(pid):
+        return False
+    _LOGGER.warning(f"Removing a stale lock of process {pid}: {lock_path}")
+    record_stale_reclaim(lock_key(filepath))
+    return _remove_lock_file(lock_path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # e.g. no permission to signal the process, which then exists
+        return True
+    return True
+
+
+def split_key_path(path):
+    """
+    Convert a key path to a tuple of keys
+
+    :param str | Iterable[str] path: dotted key path or a sequence of keys
+    :return tuple[str]: keys
+    """
+    if isinstance(path, str):
+        return tuple(path.split(KEY_PATH_SEP)) if path else ()
+    return tuple(path)
+
+
+def _is_write_locked(lock_path):
+    """
+    Determine whether a write lock file is held by a whole-file writer, as
+    opposed to a commit lock
+
+    :param str lock_path: path to the write lock file
+    :return bool: whether the file is write-locked as a whole
+    """
+    try:
+        with open(lock_path, "r") as f:
+            # a commit lock whose mark is not written yet is taken for a writer
+            return f.read() != COMMIT_LOCK_MARK
+    except FileNotFoundError:
+        return False
+
+
+def _read_key_path_entry(lock_path):
+    """
+    Read the key path lock entry held by a lock or ticket file
+
+    :param str lock_path: path to the lock or ticket file
+    :return dict | NoneType: entry with 'mode' and 'path' keys, None if the
+        file is gone, or not written yet
+    """
+    try:
+        with open(lock_path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _key_paths_conflict(a, b):
+    """
+    Determine whether two key path lock entries conflict.
+
+    Entries conflict when one key path is a prefix of the other (the locked
+    subtrees overlap) and at least one of them is a write lock.
+    """
+    if a["mode"] == "read" and b["mode"] == "read":
+        return False
+    pa, pb = a["path"], b["path"]
+    n = min(len(pa), len(pb))
+    return pa[:n] == pb[:n]
+
+
+def _is_file_read_lock(lock_path, filepath):
+    """
+    Determine whether a read lock file is a whole-file read lock, as opposed
+    to a key path lock entry
+
+    :param str lock_path: path to the lock file
+    :param str filepath: path to the locked file
+    """
+    name = os.path.basename(filepath)
+    match = re.match(
+        r"^lock-read-(.+)-" + re.escape(name) + r"$", os.path.basename(lock_path)
+    )
+    return match is not None and match.group(1).isdigit()
+
+
+def _remove_lock_file(lock_path):
+    unregister_lock_file(lock_path)
+    try:
+        os.remove(lock_path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _get_locker(obj, feature=None):
+    """
+    Get the locker for a file path or an object with a locker attribute
+
+    :param str | object obj: file path or object with a locker attribute
+    :param str feature: name of a lock feature that only ConfigLocker
+        supports, if it is needed
+    :return ThreeLocker: the locker
+    """
+    if isinstance(obj, str):
+        return ConfigLocker(obj)
+    if not hasattr(obj, "locker"):
+        raise AttributeError(f"Cannot lock: {obj}.")
+    if feature is not None and not isinstance(obj.locker, ConfigLocker):
+        raise TypeError(
+            f"{feature} requires a {ConfigLocker.__name__}, "
+            f"got: {obj.locker.__class__.__name__}"
+        )
+    return obj.locker
+
+
+@contextmanager
+def read_lock(obj, path=None):
+    """
+    Read-lock a file path or object with locker attribute.
+
+    Locks are re-entrant within a thread, so read locks can be nested in
+    read or write locks on the same file.
+
+    :param str | object obj: file path or object with a locker attribute
+    :param str | Iterable[str] path: key path to lock, e.g. "genomes.hg38".
+        The whole file is locked if not provided.
+    :return object: the locked object
+    """
+    locker = _get_locker(obj, None if path is None else "Key path locking")
+    if path is None:
+        locker.read_lock()
+    else:
+        locker.key_path_lock(path, READ)
+    try:
+        yield obj
+    finally:
+        if path is None:
+            locker.read_unlock()
+        else:
+            locker.key_path_unlock(path)
+
+
+@contextmanager
+def upgradable_read_lock(obj):
+    """
+    Read-lock a file path or object with locker attribute, so that the lock
+    can be upgraded without being released.
+
+    Taking a `write_lock` within the context upgrades the lock: no other
+    writer can modify the file between the read and the write, so there is
+    no need to `rebase` before writing. Only one upgradable lock can be
+    held on a file at a time; plain readers are not blocked by it.
+
+    :param str | object obj: file path or object with a locker attribute
+    :return object: the locked object
+    """
+    locker = _get_locker(obj, "Upgradable locking")
+    locker.upgradable_lock()
+    try:
+        yield obj
+    finally:
+        locker.upgradable_unlock()
+
+
+@contextmanager
+def write_lock(obj, path=None):
+    """
+    Write-lock a file path or object with locker attribute.
+
+    With a key path, only the subtree under that path is locked. Concurrent
+    writers of disjoint subtrees proceed in parallel, and `write` merges the
+    locked subtree into the current file contents in a short file-level
+    critical section.
+
+    Locks are re-entrant within a thread, so write locks can be nested in
+    write locks on the same file.
+
+    :param str | object obj: file path or object with a locker attribute
+    :param str | Iterable[str] path: key path to lock, e.g. "genomes.hg38".
+        The whole file is locked if not provided.
+    :return object: the locked object
+    """
+    locker = _get_locker(obj, None if path is None else "Key path locking")
+    if path is None:
+        locker.write_lock()
+    else:
+        locker.key_path_lock(path, WRITE)
+    try:
+        yield obj
+    finally:
+        if path is None:
+            locker.write_unlock()
+        else:
+            locker.key_path_unlock(path)
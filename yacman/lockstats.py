@@ -0,0 +1,357 @@
+"""
+Lock contention metrics for yacman config managers.
+
+For every locked file, the process records the number of lock acquisitions,
+histograms of the time spent waiting for and holding the locks, timeouts
+and reclaimed stale locks. They can be read with `stats`, logged
+periodically, and a watchdog can warn about locks held for too long,
+logging the stack of the holding thread.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "reset_stats",
+    "start_stats_log",
+    "start_watchdog",
+    "stats",
+    "stop_stats_log",
+    "stop_watchdog",
+]
+
+# upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+
+
+class Histogram(object):
+    """
+    Counts of durations in buckets with fixed upper bounds
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p):
+        """
+        Estimate a percentile, as the upper bound of the bucket it falls in
+
+        :param float p: percentile, between 0 and 100
+        :return float: the estimate, None if the histogram is empty
+        """
+        if not self.count:
+            return None
+        rank = self.count * p / 100
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        buckets = {f"le_{bound}": count for bound, count in zip(BUCKETS, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "buckets": buckets,
+        }
+
+
+class FileLockStats(object):
+    """
+    Lock metrics of one file
+    """
+
+    def __init__(self):
+        self.acquisitions = Counter()
+        self.timeouts = Counter()
+        self.stale_reclaims = 0
+        self.wait = defaultdict(Histogram)
+        self.hold = defaultdict(Histogram)
+
+    def to_dict(self):
+        return {
+            "acquisitions": dict(self.acquisitions),
+            "timeouts": dict(self.timeouts),
+            "stale_reclaims": self.stale_reclaims,
+            "wait": {mode: h.to_dict() for mode, h in self.wait.items()},
+            "hold": {mode: h.to_dict() for mode, h in self.hold.items()},
+        }
+
+    def summary(self):
+        """
+        Get a one-line summary of the metrics
+
+        :return str: the summary
+        """
+        wait = _merged(self.wait.values())
+        hold = _merged(self.hold.values())
+        acquisitions = ", ".join(
+            f"{m}={n}" for m, n in sorted(self.acquisitions.items())
+        )
+        return (
+            f"acquisitions: {acquisitions or 0}; "
+            f"wait p50/p99/max: {_ms(wait.percentile(50))}/{_ms(wait.percentile(99))}"
+            f"/{_ms(wait.max)} ms; "
+            f"hold p50/p99/max: {_ms(hold.percentile(50))}/{_ms(hold.percentile(99))}"
+            f"/{_ms(hold.max)} ms; "
+            f"timeouts: {sum(self.timeouts.values())}; "
+            f"stale reclaims: {self.stale_reclaims}"
+        )
+
+
+class Hold(object):
+    """
+    A lock held by a thread
+    """
+
+    __slots__ = ("key", "mode", "thread", "start", "reported")
+
+    def __init__(self, key, mode):
+        self.key = key
+        self.mode = mode
+        self.thread = threading.current_thread()
+        self.start = time.monotonic()
+        self.reported = False
+
+
+_STATS = defaultdict(FileLockStats)
+_HOLDS = set()
+# re-entrant, since releases are also recorded by the finalizers of lockers,
+# which the garbage collector may run while it is held
+_STATS_LOCK = threading.RLock()
+_stats_logger = None
+_watchdog = None
+
+
+def stats(filepath=None):
+    """
+    Get the lock metrics recorded in this process
+
+    :param str filepath: path to a file to get the metrics for; all the
+        files are included if not provided
+    :return dict: metrics of the file, or a mapping of file paths to metrics;
+        durations are in seconds
+    """
+    if filepath is not None:
+        key = _lock_key(filepath)
+        with _STATS_LOCK:
+            return _STATS.get(key, FileLockStats()).to_dict()
+    with _STATS_LOCK:
+        return {key: file_stats.to_dict() for key, file_stats in _STATS.items()}
+
+
+def reset_stats():
+    """
+    Discard the lock metrics recorded so far
+    """
+    with _STATS_LOCK:
+        _STATS.clear()
+
+
+def record_acquisition(key, mode, wait):
+    """
+    Record a lock acquisition and start timing the hold
+
+    :param str key: lock key of the file
+    :param str mode: lock mode, e.g. "read"
+    :param float wait: time spent waiting for the lock, in seconds
+    :return Hold: the hold, to pass to `record_release`
+    """
+    hold = Hold(key, mode)
+    with _STATS_LOCK:
+        file_stats = _STATS[key]
+        file_stats.acquisitions[mode] += 1
+        file_stats.wait[mode].add(wait)
+        _HOLDS.add(hold)
+    return hold
+
+
+def record_release(hold):
+    """
+    Record the release of a lock
+
+    :param Hold hold: the hold returned by `record_acquisition`
+    """
+    duration = time.monotonic() - hold.start
+    with _STATS_LOCK:
+        _HOLDS.discard(hold)
+        _STATS[hold.key].hold[hold.mode].add(duration)
+
+
+def record_timeout(key, mode, wait):
+    """
+    Record a lock acquisition that timed out
+
+    :param str key: lock key of the file
+    :param str mode: lock mode, e.g. "read"
+    :param float wait: time spent waiting for the lock, in seconds
+    """
+    with _STATS_LOCK:
+        file_stats = _STATS[key]
+        file_stats.timeouts[mode] += 1
+        file_stats.wait[mode].add(wait)
+
+
+def record_stale_reclaim(key):
+    """
+    Record the removal of a lock left behind by a dead process
+
+    :param str key: lock key of the file
+    """
+    with _STATS_LOCK:
+        _STATS[key].stale_reclaims += 1
+
+
+def start_stats_log(interval=60, level=logging.INFO):
+    """
+    Periodically log a line of lock metrics for every locked file
+
+    :param float interval: time between logs, in seconds
+    :param int level: logging level
+    """
+    global _stats_logger
+    stop_stats_log()
+
+    def _log():
+        with _STATS_LOCK:
+            lines = [(key, s.summary()) for key, s in _STATS.items()]
+        for key, line in lines:
+            _LOGGER.log(level, f"Lock stats for '{key}': {line}")
+
+    _stats_logger = _Periodic(_log, interval, "yacman-stats-log")
+    _stats_logger.start()
+
+
+def stop_stats_log():
+    """
+    Stop logging lock metrics periodically
+    """
+    global _stats_logger
+    if _stats_logger is not None:
+        _stats_logger.stop()
+        _stats_logger = None
+
+
+def start_watchdog(threshold=10, interval=None):
+    """
+    Warn, with the stack of the holding thread, about locks that are held
+    longer than a threshold. Each hold is reported once.
+
+    :param float threshold: hold time to warn after, in seconds
+    :param float interval: time between checks, in seconds; defaults to
+        half of the threshold
+    """
+    global _watchdog
+    stop_watchdog()
+
+    def _check():
+        now = time.monotonic()
+        with _STATS_LOCK:
+            overdue = [
+                h for h in _HOLDS if not h.reported and now - h.start > threshold
+            ]
+            for hold in overdue:
+                hold.reported = True
+        frames = sys._current_frames() if overdue else {}
+        for hold in overdue:
+            frame = frames.get(hold.thread.ident)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            _LOGGER.warning(
+                f"The {hold.mode} lock on '{hold.key}' has been held for "
+                f"{now - hold.start:.1f} s by thread '{hold.thread.name}', "
+                f"currently at:\n{stack}"
+            )
+
+    _watchdog = _Periodic(_check, interval or threshold / 2, "yacman-lock-watchdog")
+    _watchdog.start()
+
+
+def stop_watchdog():
+    """
+    Stop the lock hold time watchdog
+    """
+    global _watchdog
+    if _watchdog is not None:
+        _watchdog.stop()
+        _watchdog = None
+
+
+class _Periodic(threading.Thread):
+    """
+    A daemon thread that calls a function at regular intervals
+    """
+
+    def __init__(self, function, interval, name):
+        super(_Periodic, self).__init__(name=name, daemon=True)
+        self.function = function
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.function()
+            except Exception as e:
+                _LOGGER.debug(f"{self.name} failed: {e}")
+
+    def stop(self):
+        self.stopped.set()
+        if self is not threading.current_thread():
+            self.join()
+
+
+def _forget_holds():
+    """Drop the holds inherited from the parent process after a fork"""
+    global _STATS_LOCK, _stats_logger, _watchdog
+    _STATS_LOCK = threading.RLock()
+    _HOLDS.clear()
+    # threads are not inherited
+    _stats_logger = None
+    _watchdog = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_holds)
+
+
+def _lock_key(filepath):
+    from .locking import lock_key
+
+    return lock_key(filepath)
+
+
+def _merged(histograms):
+    merged = Histogram()
+    for h in histograms:
+        merged.counts = [a + b for a, b in zip(merged.counts, h.counts)]
+        merged.count += h.count
+        merged.total += h.total
+        merged.max = max(merged.max, h.max)
+    return merged
+
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.1f}"
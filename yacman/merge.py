@@ -0,0 +1,329 @@
+"""
+Merging of config data.
+
+`deep_update` merges an overlay into a config, e.g. the files of a conf.d
+directory into a base config. Mappings are merged key by key, walking the
+trees iteratively, so deep trees do not hit the recursion limit. Other
+values are replaced, unless a strategy is set for their key path: lists can
+be appended or merged by key. A `DELETE` value removes a key; overlay files
+parsed by `load_overlay` write it `!delete`.
+
+`three_way_merge` merges concurrent changes. The local changes to a config
+object are merged with the concurrent changes to its file by comparing both
+with the base, the data the object was loaded from. A key changed only on
+one side takes that side's value, deletions included; a key changed on both
+sides to different values is a conflict, resolved according to the merge
+strategy.
+
+Only the subtrees that differ from the base on both sides are walked. A
+subtree shared with the base, as left by copy-on-write changes, is skipped
+by an identity check; any other subtree is compared with the base by
+equality, which still visits all of its nodes, so a merge costs time linear
+in the size of the config, however few the changes.
+"""
+
+import logging
+from array import array
+from collections.abc import Mapping, MutableMapping
+
+import yaml
+
+from .exceptions import MergeConflictError
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "APPEND",
+    "DELETE",
+    "MERGE_STRATEGIES",
+    "OURS",
+    "RAISE",
+    "REPLACE",
+    "THEIRS",
+    "deep_update",
+    "load_overlay",
+    "three_way_merge",
+    "union_by",
+]
+
+OURS = "ours"
+THEIRS = "theirs"
+RAISE = "raise"
+MERGE_STRATEGIES = (OURS, THEIRS, RAISE)
+
+# marks a key missing from one version of the data
+_MISSING = object()
+
+DELETE_TAG = "!delete"
+WILDCARD = "*"
+
+
+class _Delete(object):
+    """Type of the marker of keys to delete"""
+
+    def __repr__(self):
+        return "DELETE"
+
+    def __reduce__(self):
+        return "DELETE"
+
+
+DELETE = _Delete()
+
+
+class _OverlayLoader(yaml.SafeLoader):
+    """Safe YAML loader constructing `!delete` values as `DELETE`"""
+
+
+_OverlayLoader.add_constructor(DELETE_TAG, lambda loader, node: DELETE)
+
+
+def load_overlay(stream):
+    """
+    Parse a YAML overlay, e.g. a file of a conf.d directory, to merge with
+    `deep_update`
+
+    Its `!delete` values are `DELETE`, removing their keys. Other YAML
+    files, parsed with `yaml.SafeLoader`, reject the tag.
+
+    :param str | TextIO stream: YAML text, or a file to read it from
+    :return object: the overlay
+    """
+    return yaml.load(stream, _OverlayLoader)
+
+
+def _replace(old, new):
+    """Strategy: the new value replaces the old one"""
+    return new
+
+
+def _append(old, new):
+    """Strategy: the items of the new list are appended to the old list"""
+    if not isinstance(new, list):
+        return new
+    if not isinstance(old, list):
+        return list(new)
+    return old + new
+
+
+REPLACE = _replace
+APPEND = _append
+
+
+def union_by(key):
+    """
+    Get a list strategy that merges lists of mappings by the value of a key
+
+    An item of the new list is deep-updated into the item of the old list
+    with the same value for the key, if any, and appended otherwise.
+
+    :param str key: key identifying the items, e.g. "name"
+    :return callable: the strategy
+    """
+
+    def union(old, new):
+        if not isinstance(new, list):
+            return new
+        if not isinstance(old, list):
+            return list(new)
+        merged = list(old)
+        positions = {
+            item[key]: i
+            for i, item in enumerate(merged)
+            if isinstance(item, Mapping) and key in item
+        }
+        for item in new:
+            position = (
+                positions.get(item[key])
+                if isinstance(item, Mapping) and key in item
+                else None
+            )
+            if position is None:
+                if isinstance(item, Mapping) and key in item:
+                    positions[item[key]] = len(merged)
+                merged.append(item)
+            else:
+                merged[position] = deep_update(merged[position], item, in_place=False)
+        return merged
+
+    union.__name__ = f"union_by_{key}"
+    return union
+
+
+def deep_update(old, new, strategies=None, in_place=True):
+    """
+    Merge an overlay into nested config data
+
+    Mappings are merged key by key; other values, lists included, replace
+    the old ones, unless a strategy is set for their key path. A DELETE
+    value removes the key.
+
+    :param MutableMapping old: data to update
+    :param Mapping new: overlay to merge into the data
+    :param Mapping[str | tuple[str], callable] strategies: functions merging
+        the old and new values under key paths, e.g.
+        {"pipelines.*.steps": APPEND, "genomes": union_by("name")}. Key paths
+        are dotted strings or tuples of keys, "*" matches any key. A strategy
+        is called with the old value, None if missing, and the new one, and
+        returns the merged value.
+    :param bool in_place: whether to update the data in place; otherwise,
+        the mappings along the changed key paths are copied, the rest is
+        shared, and the data are not modified
+    :return MutableMapping: the updated data
+    """
+    exact, patterns = _compile_strategies(strategies)
+    track_paths = bool(exact or patterns)
+    root = old if in_place else dict(old)
+    stack = [(root, new, ())]
+    while stack:
+        target, source, path = stack.pop()
+        for key, value in source.items():
+            if value is DELETE:
+                target.pop(key, None)
+                continue
+            key_path = None
+            if track_paths:
+                key_path = path + (key,)
+                strategy = exact.get(key_path) or _match(patterns, key_path)
+                if strategy is not None:
+                    target[key] = strategy(target.get(key), value)
+                    continue
+            # exact type checks first, the ABC checks are much slower
+            if (type(value) is dict or isinstance(value, Mapping)) and value:
+                current = target.get(key)
+                if type(current) is not dict and not isinstance(
+                    current, MutableMapping
+                ):
+                    current = target[key] = {}
+                elif not in_place:
+                    current = target[key] = dict(current)
+                stack.append((current, value, key_path))
+            else:
+                target[key] = value
+    return root
+
+
+def _compile_strategies(strategies):
+    """
+    Split the strategies into the ones for exact key paths and the ones for
+    key paths with wildcards
+
+    :return (dict, list): strategies by key path, and (key path, strategy)
+        pairs for key paths with wildcards
+    """
+    exact, patterns = {}, []
+    for path, strategy in (strategies or {}).items():
+        if not callable(strategy):
+            raise TypeError(f"Merge strategy for '{path}' is not callable: {strategy}")
+        keys = tuple(path.split(".")) if isinstance(path, str) else tuple(path)
+        if WILDCARD in keys:
+            patterns.append((keys, strategy))
+        else:
+            exact[keys] = strategy
+    return exact, patterns
+
+
+def _match(patterns, key_path):
+    for keys, strategy in patterns:
+        if len(keys) == len(key_path) and all(
+            k == WILDCARD or k == p for k, p in zip(keys, key_path)
+        ):
+            return strategy
+    return None
+
+
+def three_way_merge(base, theirs, ours, strategy=OURS):
+    """
+    Merge two versions of config data that diverged from a common base
+
+    Unchanged subtrees of the result are shared with the inputs, which are
+    not modified.
+
+    :param object base: data both versions derive from, None if unknown,
+        in which case every difference is a conflict
+    :param object theirs: concurrently changed version, e.g. the file contents
+    :param object ours: locally changed version
+    :param str strategy: how conflicts are resolved: "ours" to keep the local
+        value, "theirs" to keep the concurrent value, "raise" to raise an error
+    :return (object, list[tuple[str]]): merged data and conflicting key paths
+    :raise MergeConflictError: if there are conflicts and the strategy is "raise"
+    :raise ValueError: if the strategy is unknown
+    """
+    if strategy not in MERGE_STRATEGIES:
+        raise ValueError(
+            f"Unknown merge strategy: {strategy}. "
+            f"Choose from: {', '.join(MERGE_STRATEGIES)}"
+        )
+    conflicts = []
+    merged = _merge((), {} if base is None else base, theirs, ours, conflicts, strategy)
+    if conflicts:
+        if strategy == RAISE:
+            raise MergeConflictError(conflicts)
+        _LOGGER.debug(f"Resolved merge conflicts with '{strategy}': {conflicts}")
+    return merged, conflicts
+
+
+def _merge(path, base, theirs, ours, conflicts, strategy):
+    """
+    Merge a subtree, adding the conflicting key paths to the list
+
+    :return object: the merged subtree, _MISSING if it is deleted
+    """
+    if _same(ours, base):
+        return theirs
+    if _same(theirs, base) or _same(theirs, ours):
+        return ours
+    if (
+        isinstance(ours, Mapping)
+        and isinstance(theirs, Mapping)
+        and isinstance(base, Mapping)
+    ):
+        merged = dict(theirs)
+        # keys deleted on both sides are already missing from the result
+        for key in list(theirs) + [k for k in ours if k not in theirs]:
+            value = _merge(
+                path + (key,),
+                base.get(key, _MISSING),
+                theirs.get(key, _MISSING),
+                ours.get(key, _MISSING),
+                conflicts,
+                strategy,
+            )
+            if value is _MISSING:
+                merged.pop(key, None)
+            else:
+                merged[key] = value
+        return merged
+    if isinstance(ours, Mapping) and isinstance(theirs, Mapping):
+        # added on both sides, or replaced by mappings on both sides
+        return _merge(path, {}, theirs, ours, conflicts, strategy)
+    conflicts.append(path)
+    return theirs if strategy == THEIRS else ours
+
+
+def _same(a, b):
+    """Compare two subtrees, by identity first"""
+    if a is b:
+        return True
+    if a is _MISSING or b is _MISSING:
+        return False
+    return type(a) is type(b) and a == b
+
+
+def snapshot_tree(data):
+    """
+    Copy the mappings and lists of config data, sharing the other values
+
+    Faster than a deep copy for the plain data loaded from YAML files, whose
+    other values are immutable.
+
+    :param object data: data to copy
+    :return object: the copy
+    """
+    if isinstance(data, dict):
+        return {k: snapshot_tree(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [snapshot_tree(v) for v in data]
+    if isinstance(data, array):
+        return array(data.typecode, data)
+    return data
@@ -0,0 +1,185 @@
+"""
+Multi-version storage for YAML config files.
+
+Each write produces a new, immutable version of the file in a sidecar
+directory, and the config path itself is a symbolic link to the current
+version, swapped atomically. Readers simply open the config path: they get
+whichever version is current, without taking any lock, and keep reading it
+even if it is superseded in the meantime. Superseded versions are removed
+after a grace period.
+"""
+
+import logging
+import os
+import re
+import time
+
+from ubiquerg import create_file_racefree
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["is_versioned", "read_current_version", "publish_version"]
+
+VERSIONS_DIR_TEMPLATE = ".{name}.versions"
+VERSION_TEMPLATE = "{name}.{version:08d}"
+TMP_PREFIX = ".tmp-"
+DEFAULT_GRACE_PERIOD = 60
+
+
+def versions_dir(filepath):
+    """
+    Get the path to the directory holding the versions of a file
+
+    :param str filepath: path to the config file
+    :return str: path to the versions directory
+    """
+    base, name = os.path.split(os.path.abspath(filepath))
+    return os.path.join(base, VERSIONS_DIR_TEMPLATE.format(name=name))
+
+
+def is_versioned(filepath):
+    """
+    Determine whether a file is stored in the multi-version layout
+
+    :param str filepath: path to the config file
+    :return bool: whether the file points to a version in its versions directory
+    """
+    if not os.path.islink(filepath):
+        return False
+    target = os.path.realpath(filepath)
+    return os.path.dirname(target) == os.path.realpath(versions_dir(filepath))
+
+
+def list_versions(filepath):
+    """
+    List the versions of a file, oldest first
+
+    :param str filepath: path to the config file
+    :return list[(int, str)]: version numbers and paths to the version files
+    """
+    vdir = versions_dir(filepath)
+    name = os.path.basename(filepath)
+    pattern = re.compile(r"^" + re.escape(name) + r"\.(\d+)$")
+    try:
+        files = os.listdir(vdir)
+    except FileNotFoundError:
+        return []
+    versions = []
+    for f in files:
+        match = pattern.match(f)
+        if match:
+            versions.append((int(match.group(1)), os.path.join(vdir, f)))
+    return sorted(versions)
+
+
+def read_current_version(filepath, create_file=False):
+    """
+    Read the current version of a file, without locking it.
+
+    :param str filepath: path to the config file
+    :param bool create_file: whether to create the file if it doesn't exist
+    :return str: file contents
+    """
+    try:
+        with open(filepath, "r") as f:
+            return f.read()
+    except FileNotFoundError:
+        if not create_file:
+            raise FileNotFoundError(f"No such file: {filepath}")
+    _LOGGER.info("File does not exist, but create_file is true. Creating...")
+    try:
+        create_file_racefree(filepath)
+    except FileExistsError:
+        pass
+    return ""
+
+
+def publish_version(filepath, text, grace_period=DEFAULT_GRACE_PERIOD):
+    """
+    Write a new version of a file and make it the current one.
+
+    Must be called with the file write-locked, since version numbers are
+    assigned sequentially. A regular file is converted to the multi-version
+    layout on the first publication.
+
+    :param str filepath: path to the config file
+    :param str text: contents of the new version
+    :param float grace_period: how long, in seconds, superseded versions are
+        kept for readers that may still be opening them
+    :return str: path to the new version file
+    """
+    vdir = versions_dir(filepath)
+    os.makedirs(vdir, exist_ok=True)
+    versions = list_versions(filepath)
+    number = versions[-1][0] + 1 if versions else 1
+    name = os.path.basename(filepath)
+    version_path = os.path.join(
+        vdir, VERSION_TEMPLATE.format(name=name, version=number)
+    )
+    _write_durably(version_path, text)
+    _swap_pointer(filepath, version_path, text)
+    _LOGGER.debug(f"Published version {number} of '{filepath}'")
+    collect_garbage(filepath, grace_period)
+    return version_path
+
+
+def collect_garbage(filepath, grace_period=DEFAULT_GRACE_PERIOD):
+    """
+    Remove versions that were superseded more than the grace period ago.
+
+    A version stops being current when its successor is created, so its age
+    is measured with the modification time of the successor.
+
+    :param str filepath: path to the config file
+    :param float grace_period: how long, in seconds, superseded versions are kept
+    :return list[str]: paths to the removed version files
+    """
+    current = os.path.realpath(filepath)
+    cutoff = time.time() - grace_period
+    versions = [p for _, p in list_versions(filepath)]
+    removed = []
+    for version_path, successor in zip(versions, versions[1:]):
+        if os.path.realpath(version_path) == current:
+            break
+        try:
+            if os.path.getmtime(successor) > cutoff:
+                break
+            os.remove(version_path)
+        except FileNotFoundError:
+            continue
+        removed.append(version_path)
+    if removed:
+        _LOGGER.debug(f"Removed {len(removed)} superseded versions of '{filepath}'")
+    return removed
+
+
+def _write_durably(path, text):
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _swap_pointer(filepath, version_path, text):
+    """
+    Atomically point the config path at a version file
+
+    Falls back to atomically replacing the config path with a copy of the
+    version on file systems that do not support symbolic links.
+    """
+    tmp_link = _tmp_path(filepath)
+    target = os.path.relpath(version_path, os.path.dirname(os.path.abspath(filepath)))
+    try:
+        os.symlink(target, tmp_link)
+    except (OSError, NotImplementedError) as e:
+        _LOGGER.debug(f"Can't create symbolic links, copying the version: {e}")
+        _write_durably(filepath, text)
+        return
+    os.replace(tmp_link, filepath)
+
+
+def _tmp_path(path):
+    base, name = os.path.split(os.path.abspath(path))
+    return os.path.join(base, f"{TMP_PREFIX}{os.getpid()}-{os.urandom(4).hex()}-{name}")
@@ -0,0 +1,247 @@
+"""
+JSON Patch (RFC 6902) diffs between versions of config data.
+
+`diff` lists the operations turning one version into another, and
+`apply_patch` applies them to config data or a config manager. Identical
+subtrees are skipped as in `three_way_merge`, see `yacman.merge`: only the
+subtrees shared by both versions are skipped without being visited, so a
+diff costs time linear in the size of the config.
+"""
+
+import logging
+from collections.abc import Mapping
+
+from .exceptions import JSONPatchError
+from .merge import snapshot_tree
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["apply_patch", "diff"]
+
+OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+
+
+def diff(a, b):
+    """
+    List the JSON Patch operations that turn a version of config data into
+    another
+
+    Mappings are compared key by key. Lists are compared item by item, items
+    added or removed at the end being added or removed; an item inserted
+    elsewhere makes the following items replaced.
+
+    :param object | FutureYAMLConfigManager a: old version
+    :param object | FutureYAMLConfigManager b: new version
+    :return list[dict]: JSON Patch operations, e.g.
+        [{"op": "replace", "path": "/genomes/hg38/fasta", "value": "hg38.fa"}]
+    """
+    ops = []
+    _diff("", _data(a), _data(b), ops)
+    return ops
+
+
+def _diff(pointer, a, b, ops):
+    if a is b or (type(a) is type(b) and a == b):
+        return
+    if isinstance(a, Mapping) and isinstance(b, Mapping):
+        for key, value in a.items():
+            if key not in b:
+                ops.append({"op": "remove", "path": _join(pointer, key)})
+            else:
+                _diff(_join(pointer, key), value, b[key], ops)
+        for key, value in b.items():
+            if key not in a:
+                ops.append({"op": "add", "path": _join(pointer, key), "value": value})
+    elif isinstance(a, list) and isinstance(b, list):
+        common = min(len(a), len(b))
+        for i in range(common):
+            _diff(_join(pointer, i), a[i], b[i], ops)
+        # from the end, so the indices of the items left are unchanged
+        for i in reversed(range(common, len(a))):
+            ops.append({"op": "remove", "path": _join(pointer, i)})
+        for i in range(common, len(b)):
+            ops.append({"op": "add", "path": _join(pointer, "-"), "value": b[i]})
+    else:
+        ops.append({"op": "replace", "path": pointer, "value": b})
+
+
+def apply_patch(obj, ops):
+    """
+    Apply JSON Patch operations to config data or a config manager
+
+    The operations are applied all or nothing: the containers along the
+    changed paths are copied, the others are shared, and the input is not
+    modified. A config manager gets the patched data at once.
+
+    :param object | FutureYAMLConfigManager obj: config data or manager
+    :param Iterable[dict] ops: JSON Patch operations
+    :return object | FutureYAMLConfigManager: the patched data, or the
+        manager
+    :raise JSONPatchError: if an operation is invalid, a path does not
+        exist, or a test operation fails
+    """
+    if not _is_manager(obj):
+        return _apply_all(obj, ops)
+    obj._check_writable()
+    if obj._edit_lock is None:
+        obj._publish(_apply_all(obj.data, ops))
+    else:
+        with obj._edit_lock:
+            obj._publish(_apply_all(obj.data, ops))
+    return obj
+
+
+def _apply_all(doc, ops):
+    copied = set()
+    for op in ops:
+        doc = _apply(doc, op, copied)
+    return doc
+
+
+def _apply(doc, op, copied):
+    """
+    Apply one operation
+
+    :param object doc: document
+    :param dict op: operation
+    :param set[int] copied: ids of the containers already copied by this
+        patch, which can be changed in place
+    :return object: the patched document
+    """
+    try:
+        name, path = op["op"], op["path"]
+    except (KeyError, TypeError):
+        raise JSONPatchError(f"Invalid operation, 'op' and 'path' required: {op}")
+    if name not in OPERATIONS:
+        raise JSONPatchError(f"Unknown operation '{name}': {op}")
+    tokens = _split(path)
+    if name == "test":
+        if _get(doc, tokens) != _value(op):
+            raise JSONPatchError(f"Test failed: {op}")
+        return doc
+    if name in ("move", "copy"):
+        if "from" not in op:
+            raise JSONPatchError(f"Invalid operation, 'from' required: {op}")
+        source = _split(op["from"])
+        value = _get(doc, source)
+        if name == "copy":
+            # the copy must not change with the source
+            value = snapshot_tree(value)
+        else:
+            if tokens[: len(source)] == source and tokens != source:
+                raise JSONPatchError(f"Can't move a value into itself: {op}")
+            doc = _change(doc, source, "remove", None, copied)
+        return _change(doc, tokens, "add", value, copied)
+    return _change(doc, tokens, name, None if name == "remove" else _value(op), copied)
+
+
+def _change(doc, tokens, name, value, copied):
+    """
+    Add, remove or replace the value at a path, copying the containers along
+    it that were not copied yet
+
+    :return object: the changed document
+    """
+    if not tokens:
+        if name == "remove":
+            raise JSONPatchError("Can't remove the whole document")
+        return value
+    root = doc = _copy(doc, copied)
+    for token in tokens[:-1]:
+        container = doc
+        key = _key(container, token)
+        doc = _copy(container[key], copied)
+        container[key] = doc
+    last = tokens[-1]
+    if isinstance(doc, list):
+        if name == "add":
+            index = len(doc) if last == "-" else _index(doc, last, allow_end=True)
+            doc.insert(index, value)
+        elif name == "remove":
+            del doc[_index(doc, last)]
+        else:
+            doc[_index(doc, last)] = value
+    elif isinstance(doc, dict):
+        if name != "add" and last not in doc:
+            raise JSONPatchError(f"No such key: '{last}'")
+        if name == "remove":
+            del doc[last]
+        else:
+            doc[last] = value
+    else:
+        raise JSONPatchError(f"Can't {name} a value in a {type(doc).__name__}")
+    return root
+
+
+def _copy(container, copied):
+    if id(container) in copied:
+        return container
+    if isinstance(container, Mapping):
+        container = dict(container)
+    elif isinstance(container, list):
+        container = list(container)
+    else:
+        return container
+    copied.add(id(container))
+    return container
+
+
+def _get(doc, tokens):
+    for token in tokens:
+        doc = doc[_key(doc, token)]
+    return doc
+
+
+def _key(container, token):
+    if isinstance(container, list):
+        return _index(container, token)
+    if isinstance(container, Mapping):
+        if token not in container:
+            raise JSONPatchError(f"No such key: '{token}'")
+        return token
+    raise JSONPatchError(f"No such key: '{token}' in a {type(container).__name__}")
+
+
+def _index(container, token, allow_end=False):
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JSONPatchError(f"Invalid list index: '{token}'")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JSONPatchError(f"List index out of range: {index}")
+    return index
+
+
+def _value(op):
+    if "value" not in op:
+        raise JSONPatchError(f"Invalid operation, 'value' required: {op}")
+    return op["value"]
+
+
+def _join(pointer, token):
+    token = str(token).replace("~", "~0").replace("/", "~1")
+    return f"{pointer}/{token}"
+
+
+def _split(pointer):
+    """
+    Split a JSON pointer into its unescaped reference tokens
+
+    :param str pointer: JSON pointer, e.g. "/genomes/hg38"
+    :return list[str]: tokens
+    """
+    if pointer == "":
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise JSONPatchError(f"Invalid JSON pointer: '{pointer}'")
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _is_manager(obj):
+    from .yacman_future import FutureYAMLConfigManager
+
+    return isinstance(obj, FutureYAMLConfigManager)
+
+
+def _data(obj):
+    """Get the data of a config manager, or the object itself"""
+    return obj.data if _is_manager(obj) else obj
@@ -0,0 +1,328 @@
+"""
+Flattened index of the key paths of config data.
+
+`KeyPathIndex` maps every key path of a tree of mappings to its node, so
+membership tests and lookups of deep paths are single dictionary lookups,
+and keeps the key paths sorted, so all the key paths under a prefix are
+found by a binary search and a contiguous scan instead of a tree walk.
+Lists are values: the items of lists, and of packed numeric arrays, are not
+indexed.
+
+The index is maintained incrementally: `apply_changes` compares two versions
+of the data, skipping the subtrees they share, and `refresh` reindexes the
+subtrees under given key paths, after changes made in place.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from .keypath import parse_key_path
+
+__all__ = ["KeyPathIndex", "scan_tree"]
+
+WILDCARD = "*"
+
+_MISSING = object()
+
+
+class KeyPathIndex(object):
+    """
+    Index of the key paths of config data, with lookups and prefix scans
+    """
+
+    def __init__(self, data=None):
+        """
+        Index config data
+
+        :param Mapping data: config data
+        """
+        self.rebuild(data)
+
+    def rebuild(self, data):
+        """
+        Index config data from scratch
+
+        :param Mapping data: config data
+        """
+        entries = _descendants((), data)
+        self._root = data
+        self._nodes = dict(entries)
+        # sort keys and key paths, in the same order
+        self._keys = [_sort_key(path) for path, _ in entries]
+        self._paths = [path for path, _ in entries]
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, path):
+        return parse_key_path(path) in self._nodes
+
+    def __getitem__(self, path):
+        return self._nodes[parse_key_path(path)]
+
+    def under_list(self, path):
+        """
+        Check whether a key path not indexed may still exist, under a list
+
+        :param str | Iterable[str] path: key path not indexed
+        :return bool: whether the deepest indexed ancestor of the key path,
+            or the data, is a list or an array
+        """
+        path = parse_key_path(path)
+        for depth in range(len(path) - 1, 0, -1):
+            node = self._nodes.get(path[:depth], _MISSING)
+            if node is not _MISSING:
+                return isinstance(node, (list, array))
+        return isinstance(self._root, (list, array))
+
+    def get(self, path, default=None):
+        """
+        Get the node under a key path
+
+        :param str | Iterable[str] path: key path, e.g. "genomes.hg38"
+        :param object default: value to return if the key path is not indexed
+        :return object: the node
+        """
+        return self._nodes.get(parse_key_path(path), default)
+
+    def scan(self, prefix=""):
+        """
+        List the key paths under a prefix, in sorted order
+
+        :param str | Iterable[str] prefix: key path prefix, in which "*"
+            matches any key, e.g. "genomes.*.assets"
+        :return list[(tuple, object)]: key paths under the prefix, the
+            prefix excluded, and their nodes
+        """
+        pattern = parse_key_path(prefix)
+        literal = pattern[: pattern.index(WILDCARD)] if WILDCARD in pattern else pattern
+        wildcards = len(literal) < len(pattern)
+        lo, hi = self._range(literal)
+        nodes = self._nodes
+        if not wildcards:
+            if lo < hi and len(self._paths[lo]) == len(literal):
+                lo += 1
+            return [(path, nodes[path]) for path in self._paths[lo:hi]]
+        depth = len(pattern)
+        checks = [
+            (i, key)
+            for i, key in enumerate(pattern)
+            if i > len(literal) and key != WILDCARD
+        ]
+        if not checks:
+            return [
+                (path, nodes[path]) for path in self._paths[lo:hi] if len(path) > depth
+            ]
+        if len(checks) == 1:
+            ((i, key),) = checks
+            return [
+                (path, nodes[path])
+                for path in self._paths[lo:hi]
+                if len(path) > depth and path[i] == key
+            ]
+        return [
+            (path, nodes[path])
+            for path in self._paths[lo:hi]
+            if len(path) > depth and all(path[i] == key for i, key in checks)
+        ]
+
+    def apply_changes(self, old, new):
+        """
+        Update the index from a version of the data to a new one
+
+        The subtrees shared by both versions are skipped, so for versions
+        made by copy-on-write changes the work is proportional to the size
+        of the change; other subtrees are walked in full. The old version
+        must be the indexed data, unchanged since.
+
+        :param Mapping old: indexed version
+        :param Mapping new: new version
+        """
+        self._root = new
+        self._sync((), old, new)
+
+    def refresh(self, data, paths):
+        """
+        Reindex the subtrees under key paths, after changes made in place
+
+        :param Mapping data: config data
+        :param Iterable[str | Iterable[str]] paths: key paths changed
+        """
+        self._root = data
+        for path in paths:
+            path = parse_key_path(path)
+            # the first ancestor missing from the index, if any, is new
+            for depth in range(1, len(path)):
+                if path[:depth] not in self._nodes:
+                    path = path[:depth]
+                    break
+            node = _lookup(data, path)
+            old = self._nodes.get(path, _MISSING)
+            if node is _MISSING:
+                if old is not _MISSING:
+                    self._remove(path)
+            elif old is _MISSING:
+                self._add(path, node)
+            elif old is node:
+                if _is_mapping(node):
+                    # changed in place, or not at all
+                    self._remove(path, descendants_only=True)
+                    self._insert(_descendants(path, node))
+            else:
+                self._sync(path, old, node)
+
+    def _sync(self, path, old, new):
+        stack = [(path, old, new)]
+        while stack:
+            path, a, b = stack.pop()
+            if a is b:
+                continue
+            if path:
+                self._nodes[path] = b
+            a_mapping, b_mapping = _is_mapping(a), _is_mapping(b)
+            if a_mapping and b_mapping:
+                for key in a:
+                    if key not in b:
+                        self._remove(path + (key,))
+                for key, value in b.items():
+                    if key in a:
+                        stack.append((path + (key,), a[key], value))
+                    else:
+                        self._add(path + (key,), value)
+            elif a_mapping:
+                self._remove(path, descendants_only=True)
+            elif b_mapping:
+                self._insert(_descendants(path, b))
+
+    def _add(self, path, node):
+        """Index a node and its descendants, under a key path not indexed"""
+        self._insert([(path, node)] + _descendants(path, node))
+
+    def _insert(self, entries):
+        """Insert sorted entries, which are contiguous in the sort order"""
+        if not entries:
+            return
+        i = bisect_left(self._keys, _sort_key(entries[0][0]))
+        self._keys[i:i] = [_sort_key(path) for path, _ in entries]
+        self._paths[i:i] = [path for path, _ in entries]
+        self._nodes.update(entries)
+
+    def _remove(self, path, descendants_only=False):
+        """Remove a key path and its descendants from the index"""
+        lo, hi = self._range(path)
+        if descendants_only and lo < hi and len(self._paths[lo]) == len(path):
+            lo += 1
+        for removed in self._paths[lo:hi]:
+            del self._nodes[removed]
+        del self._keys[lo:hi]
+        del self._paths[lo:hi]
+
+    def _range(self, path):
+        """
+        Find the key path and its descendants, which are contiguous
+
+        :param tuple path: key path
+        :return (int, int): start and end of the range of the sorted key paths
+        """
+        start = _sort_key(path)
+        size = len(start)
+        keys = self._keys
+        lo = bisect_left(keys, start)
+        # the key path prefixes of the sorted key paths are sorted too
+        hi = len(keys)
+        low = lo
+        while low < hi:
+            mid = (low + hi) // 2
+            if keys[mid][:size] > start:
+                hi = mid
+            else:
+                low = mid + 1
+        return lo, hi
+
+
+def scan_tree(data, prefix=""):
+    """
+    List the key paths under a prefix by walking the tree, without an index
+
+    :param Mapping data: config data
+    :param str | Iterable[str] prefix: key path prefix, in which "*" matches
+        any key, e.g. "genomes.*.assets"
+    :return list[(tuple, object)]: key paths under the prefix, the prefix
+        excluded, and their nodes, in sorted order
+    """
+    matches = [((), data)]
+    for key in parse_key_path(prefix):
+        found = []
+        for path, node in matches:
+            if not isinstance(node, Mapping):
+                continue
+            if key == WILDCARD:
+                found.extend((path + (k,), v) for k, v in node.items())
+            elif key in node:
+                found.append((path + (key,), node[key]))
+        matches = found
+    matches.sort(key=lambda entry: _sort_key(entry[0]))
+    return [entry for path, node in matches for entry in _descendants(path, node)]
+
+
+def _descendants(path, node):
+    """
+    List the key paths under a node, and their nodes, in sorted order
+
+    :param tuple path: key path of the node
+    :param object node: node
+    :return list[(tuple, object)]: key paths and nodes
+    """
+    entries = []
+    if not _is_mapping(node):
+        return entries
+    # children pushed in reverse order, so they are popped in order
+    stack = _children(path, node)
+    while stack:
+        path, node = stack.pop()
+        entries.append((path, node))
+        if _is_mapping(node) and node:
+            stack.extend(_children(path, node))
+    return entries
+
+
+def _children(path, node):
+    return [
+        (path + (key,), value)
+        for key, value in sorted(node.items(), key=_item_sort_key, reverse=True)
+    ]
+
+
+def _item_sort_key(item):
+    key = item[0]
+    return key if type(key) is str else _encode(key)
+
+
+def _sort_key(path):
+    """
+    Get a key path comparable with any other: keys that are not strings,
+    such as integers, are encoded as strings that do not collide with usual
+    string keys
+    """
+    for key in path:
+        if type(key) is not str:
+            return tuple(k if type(k) is str else _encode(k) for k in path)
+    return path
+
+
+def _encode(key):
+    return f"\0{type(key).__name__}\0{key!r}"
+
+
+def _is_mapping(value):
+    return type(value) is dict or isinstance(value, Mapping)
+
+
+def _lookup(data, path):
+    node = data
+    for key in path:
+        if not _is_mapping(node) or key not in node:
+            return _MISSING
+        node = node[key]
+    return node
@@ -0,0 +1,146 @@
+"""
+Immutable snapshots of config data.
+
+A snapshot is a read-only, hashable view of a version of the data of a
+`FutureYAMLConfigManager`, sharing its containers rather than copying them,
+so taking a snapshot takes constant time. Nested mappings and lists are
+wrapped in read-only views when accessed.
+
+Once a snapshot of its data is taken, the manager stops changing the shared
+containers in place: a change copies the containers along the changed key
+path only, and the other subtrees stay shared by both versions.
+"""
+
+from array import array
+from collections.abc import Mapping, Sequence
+
+from .merge import snapshot_tree
+
+__all__ = ["FrozenList", "FrozenMap", "freeze"]
+
+
+def freeze(value):
+    """
+    Get a read-only view of a value
+
+    :param object value: value
+    :return object: a FrozenMap for a mapping, a FrozenList for a list or an
+        array, or the value itself
+    """
+    if type(value) is dict:
+        return FrozenMap(value)
+    if type(value) is list:
+        return FrozenList(value)
+    if isinstance(value, (FrozenMap, FrozenList)):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenMap(value)
+    if isinstance(value, (list, array)):
+        return FrozenList(value)
+    return value
+
+
+class FrozenMap(Mapping):
+    """
+    Read-only, hashable view of a mapping, for a version of config data
+    that is no longer changed in place
+    """
+
+    __slots__ = ("_data", "_hash")
+
+    def __init__(self, data):
+        """
+        :param Mapping data: data, which must not be changed after
+        """
+        self._data = data
+        self._hash = None
+
+    def __getitem__(self, key):
+        return freeze(self._data[key])
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __eq__(self, other):
+        if isinstance(other, (FrozenMap, FrozenList)):
+            other = other._data
+        if isinstance(other, Mapping):
+            return self._data == other
+        return NotImplemented
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset((k, freeze(v)) for k, v in self._data.items()))
+        return self._hash
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def __reduce__(self):
+        return self.__class__, (self._data,)
+
+    def thaw(self):
+        """
+        Get a mutable copy of the data
+
+        :return dict: deep copy of the data
+        """
+        return snapshot_tree(self._data)
+
+
+class FrozenList(Sequence):
+    """
+    Read-only, hashable view of a list, for a version of config data that
+    is no longer changed in place
+    """
+
+    __slots__ = ("_data", "_hash")
+
+    def __init__(self, data):
+        """
+        :param list | array.array data: data, which must not be changed after
+        """
+        self._data = data
+        self._hash = None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return FrozenList(self._data[index])
+        return freeze(self._data[index])
+
+    def __len__(self):
+        return len(self._data)
+
+    def __eq__(self, other):
+        if isinstance(other, (FrozenMap, FrozenList)):
+            other = other._data
+        if isinstance(other, (list, tuple, array)):
+            if type(self._data) is list:
+                return self._data == list(other)
+            return list(self._data) == list(other)
+        return NotImplemented
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(tuple(freeze(v) for v in self._data))
+        return self._hash
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def __reduce__(self):
+        return self.__class__, (self._data,)
+
+    def thaw(self):
+        """
+        Get a mutable copy of the data
+
+        :return list: deep copy of the data
+        """
+        return snapshot_tree(self._data)
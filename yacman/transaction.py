@@ -0,0 +1,241 @@
+"""
+Multi-file transactions for yacman config managers.
+
+Several config files are write-locked together, in a canonical order, and
+their new contents are committed through an intent journal:
+
+1. the new contents of every file are staged next to it,
+2. every file gets an intent sidecar pointing to its staged contents and to
+   the journal,
+3. the journal is written atomically: this is the commit point,
+4. the staged contents are moved into place, and the intents and the journal
+   are removed.
+
+If the process crashes in the middle, the next open of any of the files
+finds its intent: the change is rolled forward if the journal exists, and
+rolled back otherwise.
+"""
+
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from .locking import lock_key
+from .mvcc import _write_durably, is_versioned, publish_version
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["multi_write_lock", "Transaction", "recover"]
+
+INTENT_TEMPLATE = ".{name}.txn"
+STAGED_TEMPLATE = ".{name}.txn-{txid}"
+JOURNAL_TEMPLATE = ".yacman-txn-{txid}.json"
+
+
+class Transaction(object):
+    """
+    A set of file writes that are committed all together, or not at all.
+    """
+
+    def __init__(self):
+        self.id = f"{int(time.time())}-{os.getpid()}-{os.urandom(4).hex()}"
+        self.staged = {}
+        self.hooks = {}
+
+    def stage(self, filepath, text, on_commit=None):
+        """
+        Stage new contents of a file, to be written on commit
+
+        Staging a file again replaces its contents and its hook.
+
+        :param str filepath: path to the file
+        :param str text: new file contents
+        :param callable() on_commit: function to call once the contents are
+            written, e.g. so that the object that staged them records the new
+            version of the file
+        """
+        target = os.path.abspath(filepath)
+        self.staged[target] = text
+        if on_commit is None:
+            self.hooks.pop(target, None)
+        else:
+            self.hooks[target] = on_commit
+
+    def commit(self):
+        """
+        Write all the staged file contents through the intent journal
+
+        :return list[str]: paths to the written files
+        """
+        if not self.staged:
+            return []
+        entries = self._prepare()
+        journal_path = self._write_journal(entries)
+        _roll_forward(journal_path, entries)
+        _LOGGER.debug(f"Committed transaction {self.id}: {list(self.staged)}")
+        for hook in self.hooks.values():
+            hook()
+        return list(self.staged)
+
+    def _prepare(self):
+        """
+        Write the staged contents and the intents next to the target files
+
+        :return list[dict]: journal entries
+        """
+        journal_path = _journal_path(next(iter(self.staged)), self.id)
+        entries = []
+        for target, text in self.staged.items():
+            base, name = os.path.split(target)
+            staged = os.path.join(base, STAGED_TEMPLATE.format(name=name, txid=self.id))
+            _write_durably(staged, text)
+            entry = {"target": target, "staged": staged, "journal": journal_path}
+            _write_durably(_intent_path(target), json.dumps(entry))
+            entries.append(entry)
+        return entries
+
+    def _write_journal(self, entries):
+        journal_path = entries[0]["journal"]
+        _write_durably(journal_path, json.dumps({"id": self.id, "entries": entries}))
+        return journal_path
+
+
+def recover(filepath):
+    """
+    Roll an interrupted transaction on a file forward or back.
+
+    Must be called with the file write-locked.
+
+    :param str filepath: path to the file
+    :return bool | None: True if a transaction was rolled forward, False if it
+        was rolled back, None if there was nothing to recover
+    """
+    intent_path = _intent_path(filepath)
+    try:
+        with open(intent_path, "r") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    try:
+        with open(entry["journal"], "r") as f:
+            entries = json.load(f)["entries"]
+    except FileNotFoundError:
+        _LOGGER.warning(f"Rolling back an interrupted transaction on '{filepath}'")
+        _remove(entry["staged"])
+        _remove(intent_path)
+        return False
+    _LOGGER.warning(f"Rolling forward an interrupted transaction on '{filepath}'")
+    _install(entry)
+    _remove(intent_path)
+    if not any(_intent_matches(e) for e in entries):
+        _remove(entry["journal"])
+    return True
+
+
+def has_pending_transaction(filepath):
+    """
+    Check whether a file has an interrupted transaction to recover
+
+    :param str filepath: path to the file
+    :return bool: whether the file has an intent sidecar
+    """
+    return os.path.exists(_intent_path(filepath))
+
+
+@contextmanager
+def multi_write_lock(objs, wait_max=None):
+    """
+    Write-lock several objects with locker attributes, all or nothing.
+
+    The files are locked in a canonical order (by resolved path), so that
+    concurrent multi-file lockers can't deadlock. If any of them can't be
+    locked before the time runs out, the ones already locked are released.
+    Writes done in the context are staged, and committed together when the
+    context exits without an exception.
+
+    :param Iterable[object] objs: objects with locker attributes, e.g.
+        FutureYAMLConfigManager objects
+    :param int wait_max: max wait time to lock all the files, defaults to the
+        largest wait time of the lockers
+    :raise LockTimeoutError: if the files could not be all locked in time
+    :return list[object]: the locked objects, in the given order
+    """
+    objs = list(objs)
+    lockers = [obj.locker for obj in objs]
+    paths = [lock_key(locker.filepath) for locker in lockers]
+    if len(set(paths)) != len(paths):
+        raise ValueError(f"Can't lock the same file more than once: {paths}")
+    if wait_max is None:
+        wait_max = max(locker.wait_max for locker in lockers)
+    ordered = [locker for _, locker in sorted(zip(paths, lockers), key=lambda x: x[0])]
+    deadline = time.monotonic() + wait_max
+    acquired = []
+    try:
+        for locker in ordered:
+            locker.write_lock(wait_max=max(deadline - time.monotonic(), 0))
+            acquired.append(locker)
+    except Exception:
+        for locker in reversed(acquired):
+            locker.write_unlock()
+        raise
+    transaction = Transaction()
+    try:
+        for locker in ordered:
+            recover(locker.filepath)
+            locker.transaction = transaction
+        yield objs
+        for locker in ordered:
+            locker.transaction = None
+        transaction.commit()
+    finally:
+        for locker in reversed(ordered):
+            locker.transaction = None
+            locker.write_unlock()
+
+
+def _install(entry):
+    """Move staged file contents into place, unless that's already done"""
+    staged, target = entry["staged"], entry["target"]
+    if not os.path.exists(staged):
+        return
+    if is_versioned(target):
+        with open(staged, "r") as f:
+            publish_version(target, f.read())
+        os.remove(staged)
+    else:
+        os.replace(staged, target)
+
+
+def _roll_forward(journal_path, entries):
+    for entry in entries:
+        _install(entry)
+    for entry in entries:
+        _remove(_intent_path(entry["target"]))
+    _remove(journal_path)
+
+
+def _intent_matches(entry):
+    """Check whether the intent for a journal entry is still in place"""
+    try:
+        with open(_intent_path(entry["target"]), "r") as f:
+            return json.load(f)["journal"] == entry["journal"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return False
+
+
+def _intent_path(filepath):
+    base, name = os.path.split(os.path.abspath(filepath))
+    return os.path.join(base, INTENT_TEMPLATE.format(name=name))
+
+
+def _journal_path(filepath, txid):
+    return os.path.join(os.path.dirname(filepath), JOURNAL_TEMPLATE.format(txid=txid))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,383 @@
+"""
+Hot reloading of config managers when their file changes on disk.
+
+A watcher thread compares the identity of the file (device, inode, size and
+modification times) with the one it last loaded, at regular intervals. On
+Linux, inotify wakes it up as soon as the directory of the file changes, and
+the interval only bounds how long a change on a file system without inotify
+support, e.g. NFS, goes unnoticed. Bursts of writes are coalesced: the file is
+reloaded once its identity has been stable for a short while.
+
+The file is read under a read lock of the watcher's own, so the locks of
+the manager stay those of its users, and the new data are published at once,
+under the edit lock of the manager in thread-safe mode.
+The callbacks are then called with the key paths that were added, removed or
+changed. Changes the manager already holds, because it wrote the file or
+reloaded it itself, are not reloaded nor reported.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import sys
+import threading
+import time
+import weakref
+from collections import namedtuple
+from collections.abc import Mapping
+from contextlib import nullcontext
+
+from .locking import ConfigLocker, read_lock
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "ConfigChanges",
+    "ConfigWatcher",
+    "diff_key_paths",
+    "file_signature",
+    "racily_clean",
+]
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_DEBOUNCE = 0.05
+# bursts longer than this many debounce periods are reloaded anyway
+MAX_DEBOUNCES = 20
+# coarsest resolution of file modification times, on FAT file systems
+TIMESTAMP_GRANULARITY_NS = 2 * 10**9
+
+# inotify event masks, from sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+INOTIFY_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+)
+
+
+class ConfigChanges(namedtuple("ConfigChanges", ["added", "removed", "changed"])):
+    """
+    Key paths that differ between two versions of a config, each a list of
+    key tuples: the ones only in the new version, the ones only in the old
+    version, and the ones with different values. False if there are none.
+    """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return any(self)
+
+
+def file_signature(filepath):
+    """
+    Get the identity of a file, which changes whenever the file is written
+
+    Symbolic links are followed, so the identity of a file in the
+    multi-version layout changes when a new version is published.
+
+    :param str filepath: path to the file
+    :return tuple[int] | NoneType: device, inode, size and modification
+        times of the file, None if it does not exist
+    """
+    try:
+        st = os.stat(filepath)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns
+
+
+def racily_clean(signature, taken_ns):
+    """
+    Check whether a file may have changed since its identity was taken,
+    although its identity has not
+
+    The modification times of a file only change once per tick of the file
+    system clock, which is as coarse as 2 seconds on some file systems. A
+    file written again, to the same size, within the tick of the identity
+    keeps its identity. Like git's "racily clean" index entries, an identity
+    taken within that granularity of the last change of the file can't tell
+    whether the file changed.
+
+    :param tuple[int] | NoneType signature: identity of the file, from
+        `file_signature`
+    :param int | NoneType taken_ns: time, in nanoseconds since the epoch,
+        just before the identity was taken
+    :return bool: whether the identity can't be trusted; True if either is
+        unknown
+    """
+    if signature is None or taken_ns is None:
+        return True
+    changed_ns = max(signature[3], signature[4])
+    return taken_ns - changed_ns < TIMESTAMP_GRANULARITY_NS
+
+
+def diff_key_paths(old, new):
+    """
+    Compare two versions of a config, key path by key path
+
+    Mappings are compared recursively; any other values, including lists,
+    are compared as a whole.
+
+    :param object old: old version
+    :param object new: new version
+    :return ConfigChanges: key paths added, removed and changed
+    """
+    changes = ConfigChanges([], [], [])
+    stack = [((), old, new)]
+    while stack:
+        prefix, a, b = stack.pop()
+        if not (isinstance(a, Mapping) and isinstance(b, Mapping)):
+            if a != b:
+                changes.changed.append(prefix)
+            continue
+        for key in a:
+            if key not in b:
+                changes.removed.append(prefix + (key,))
+            else:
+                stack.append((prefix + (key,), a[key], b[key]))
+        changes.added.extend(prefix + (key,) for key in b if key not in a)
+    for paths in changes:
+        paths.sort(key=lambda path: [str(k) for k in path])
+    return changes
+
+
+class ConfigWatcher(threading.Thread):
+    """
+    A daemon thread that reloads a config manager when its file changes
+
+    The watcher only keeps a weak reference to the manager, and stops when
+    the manager is garbage collected.
+    """
+
+    def __init__(
+        self,
+        manager,
+        interval=DEFAULT_INTERVAL,
+        debounce=DEFAULT_DEBOUNCE,
+        use_inotify=True,
+    ):
+        """
+        Object constructor
+
+        :param FutureYAMLConfigManager manager: manager to reload
+        :param float interval: max time, in seconds, between two checks of
+            the file
+        :param float debounce: time, in seconds, the file must stay unchanged
+            before it is reloaded
+        :param bool use_inotify: whether to use inotify, if available, to
+            notice changes before the interval elapses
+        """
+        filepath = manager.filepath
+        if not filepath:
+            raise ValueError("Can't watch a config manager without a file")
+        super(ConfigWatcher, self).__init__(
+            name=f"yacman-watcher-{os.path.basename(filepath)}", daemon=True
+        )
+        # the locks of the manager's locker are those of its users
+        self.locker = ConfigLocker(
+            filepath,
+            wait_max=manager.wait_max,
+            strict_ro_locks=manager.strict_ro_locks,
+            mvcc=manager.mvcc,
+            policy=manager.lock_policy,
+        )
+        self.filepath = self.locker.filepath
+        self.interval = interval
+        self.debounce = debounce
+        self.callbacks = []
+        self.reloads = 0
+        self.signature = file_signature(filepath)
+        self.stopped = threading.Event()
+        self._manager = weakref.ref(manager)
+        self._callbacks_lock = threading.Lock()
+        self._fds_lock = threading.Lock()
+        self._inotify_fd = _inotify_watch(filepath) if use_inotify else None
+        self._wake_r, self._wake_w = (
+            os.pipe() if self._inotify_fd is not None else (None, None)
+        )
+
+    @property
+    def uses_inotify(self):
+        return self._inotify_fd is not None
+
+    def add_callback(self, callback):
+        """
+        Register a function to call after each reload
+
+        :param callable callback: function to call with the ConfigChanges
+        """
+        with self._callbacks_lock:
+            if callback not in self.callbacks:
+                self.callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        """
+        Unregister a function called after each reload
+
+        :param callable callback: function to unregister
+        :return bool: whether the function was registered
+        """
+        with self._callbacks_lock:
+            if callback in self.callbacks:
+                self.callbacks.remove(callback)
+                return True
+            return False
+
+    def run(self):
+        try:
+            while self._wait(self.interval) and self._manager() is not None:
+                if file_signature(self.filepath) == self.signature:
+                    continue
+                if not self._settle():
+                    break
+                manager = self._manager()
+                if manager is None:
+                    break
+                if not manager.is_stale():
+                    # written or reloaded by the manager itself
+                    self.signature = manager._file_signature
+                    del manager
+                    continue
+                try:
+                    self.reload(manager)
+                except Exception as e:
+                    _LOGGER.warning(f"Failed to reload '{self.filepath}': {e}")
+                del manager
+        finally:
+            self._close()
+
+    def stop(self):
+        """
+        Stop watching the file
+        """
+        self.stopped.set()
+        with self._fds_lock:
+            if self._wake_w is not None:
+                os.write(self._wake_w, b"x")
+        if self.is_alive() and self is not threading.current_thread():
+            self.join()
+
+    def reload(self, manager):
+        """
+        Load the file into the manager and call the callbacks with the changes
+
+        :param FutureYAMLConfigManager manager: manager to reload
+        :return ConfigChanges: key paths that changed
+        """
+        with read_lock(self):
+            taken_ns = time.time_ns()
+            signature = file_signature(self.filepath)
+            with open(self.filepath, "r") as f:
+                new_data = manager._parse(f)
+        if new_data is None:
+            new_data = {}
+        edit_lock = manager._edit_lock
+        with edit_lock if edit_lock is not None else nullcontext():
+            old_data = manager.data
+            manager._replace_data(new_data)
+            manager._base = manager._base_of(new_data)
+            manager._set_file_signature(signature, taken_ns)
+        self.signature = signature
+        self.reloads += 1
+        changes = diff_key_paths(old_data, new_data)
+        _LOGGER.debug(f"Reloaded '{self.filepath}': {changes}")
+        if changes:
+            with self._callbacks_lock:
+                callbacks = list(self.callbacks)
+            for callback in callbacks:
+                try:
+                    callback(changes)
+                except Exception:
+                    _LOGGER.exception(f"Config watcher callback {callback} failed")
+        return changes
+
+    def _settle(self):
+        """
+        Wait for a burst of writes to end
+
+        :return bool: False if the watcher was stopped meanwhile
+        """
+        signature = file_signature(self.filepath)
+        for _ in range(MAX_DEBOUNCES):
+            if self.stopped.wait(self.debounce):
+                return False
+            current = file_signature(self.filepath)
+            if current == signature:
+                break
+            signature = current
+        return True
+
+    def _wait(self, timeout):
+        """
+        Wait for a change notification or the timeout
+
+        :param float timeout: max time to wait, in seconds
+        :return bool: False if the watcher was stopped
+        """
+        if self._inotify_fd is None:
+            return not self.stopped.wait(timeout)
+        ready, _, _ = select.select([self._inotify_fd, self._wake_r], [], [], timeout)
+        if self._inotify_fd in ready:
+            _drain(self._inotify_fd)
+        return not self.stopped.is_set()
+
+    def _close(self):
+        with self._fds_lock:
+            for fd in (self._inotify_fd, self._wake_r, self._wake_w):
+                if fd is not None:
+                    os.close(fd)
+            self._inotify_fd = self._wake_r = self._wake_w = None
+
+
+def _inotify_watch(filepath):
+    """
+    Watch the directory of a file with inotify
+
+    The directory is watched rather than the file, since writers may replace
+    the file rather than modify it.
+
+    :param str filepath: path to the file
+    :return int | NoneType: inotify file descriptor, None if inotify is
+        not available
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError) as e:
+        _LOGGER.debug(f"inotify is not available: {e}")
+        return None
+    if fd < 0:
+        _LOGGER.debug(f"inotify is not available: {os.strerror(ctypes.get_errno())}")
+        return None
+    directory = os.path.dirname(os.path.abspath(filepath))
+    if libc.inotify_add_watch(fd, os.fsencode(directory), INOTIFY_MASK) < 0:
+        _LOGGER.debug(
+            f"Can't watch '{directory}' with inotify: "
+            f"{os.strerror(ctypes.get_errno())}"
+        )
+        os.close(fd)
+        return None
+    return fd
+
+
+def _drain(fd):
+    """Read all the pending events of a non-blocking file descriptor"""
+    try:
+        while os.read(fd, 65536):
+            pass
+    except BlockingIOError:
+        pass
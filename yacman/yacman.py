@@ -1,6 +1,7 @@
 import logging
 import os
 import warnings
+from collections import OrderedDict
 from collections.abc import Iterable, Mapping
 from sys import _getframe
 from urllib.request import urlopen
@@ -10,10 +11,12 @@ import attmap
 import oyaml as yaml
 from jsonschema import validate as _validate
 from jsonschema.exceptions import ValidationError
-from ubiquerg import create_lock, expandpath, is_url, make_lock_path, mkabs, remove_lock
+from ubiquerg import expandpath, is_url, make_lock_path, mkabs
 
 from .const import *
 from ._version import __version__
+from .cleanup import create_lock, remove_lock, unregister_lock_file
+from .merge import deep_update
 from typing import Union
 from pathlib import Path
 
@@ -68,6 +71,9 @@ class YacAttMap(attmap.PathExAttMap):
     dict are provided, it will first load the file and then updated it with
     values from the dict. Moreover, the config contents can be validated against a
     jsonschema schema, if a path to one is provided.
+
+    The nested mappings read from a file or YAML data are converted to YacAttMap
+    objects when first accessed rather than up front.
     """
 
     def __init__(
@@ -109,6 +115,8 @@ class YacAttMap(attmap.PathExAttMap):
                     "with 'entries' rather than read from the 'filepath'",
                     UserWarning,
                 )
+        # parsed data, referenced by nothing else, and the keys set from entries
+        parsed, given = None, ()
         if filepath:
             if not skip_read_lock and not writable and os.path.exists(filepath):
                 create_lock(filepath, wait_max)
@@ -120,13 +128,20 @@ class YacAttMap(attmap.PathExAttMap):
                 if file_contents is None:
                     # if file is empty, initialize its contents to an empty dict
                     file_contents = {}
-                file_contents.update(entries)
-            entries = file_contents
+                given = dict(entries)
+                file_contents.update(given)
+            parsed = file_contents
         elif yamldata:
-            entries = yaml.load(yamldata, yaml.SafeLoader)
+            parsed = yaml.load(yamldata, yaml.SafeLoader)
         if not hasattr(self, IK):
             setattr(self, IK, attmap.AttMap())
-        super(YacAttMap, self).__init__(entries or {})
+        if isinstance(parsed, dict):
+            super(YacAttMap, self).__init__()
+            self._adopt(parsed, convert=given)
+        elif filepath or yamldata:
+            super(YacAttMap, self).__init__(parsed or {})
+        else:
+            super(YacAttMap, self).__init__(entries or {})
         if filepath:
             # to make this python2 compatible, the attributes need to be set here.
             # prevents: AttributeError: _OrderedDict__root
@@ -156,6 +171,81 @@ class YacAttMap(attmap.PathExAttMap):
             # The __internal key may not exist during garbage collection
             pass
 
+    def __getitem__(self, item, expand=True, to_dict=False):
+        """
+        Fetch the value of a key
+
+        A mapping read from a file or YAML data is converted to the lower type
+        bound when first fetched, and the converted object replaces it.
+
+        :param hashable item: key for which to fetch value
+        :param bool expand: whether to expand string value as path
+        :param bool to_dict: whether to recursively convert mappings to dicts
+        :return object: value mapped to given key, if available
+        :raise KeyError: if the requested key is unmapped.
+        """
+        try:
+            v = OrderedDict.__getitem__(self, item)
+        except KeyError:
+            # fall back on the attributes, like attmap.OrdAttMap
+            v = attmap.AttMap.__getitem__(self, item)
+        else:
+            # the mappings stored by __setitem__ are converted, so plain dicts
+            # can only be adopted ones
+            if type(v) is dict:
+                v = self._convert_adopted(v)
+                OrderedDict.__setitem__(self, item, v)
+        return _safely_expand(v, to_dict) if expand else v
+
+    def __getattribute__(self, item, expand=True):
+        # like attmap.PathExAttMap, whose parents do not override it, but
+        # without expanding the attributes that are not strings, e.g. methods
+        res = object.__getattribute__(self, item)
+        return _safely_expand(res) if expand and isinstance(res, str) else res
+
+    def __getattr__(self, item, default=None, expand=True):
+        """
+        Fetch the value of a key as an attribute
+
+        Called once the attribute lookup failed, so the values are looked up
+        right away rather than after trying the attributes again.
+
+        :param str item: name of the attribute or key
+        :param object default: unused, as in attmap
+        :param bool expand: whether to expand string value as path
+        :return object: value mapped to given key, if available
+        :raise AttributeError: if the requested key is unmapped
+        """
+        try:
+            return self.__getitem__(item, expand)
+        except KeyError:
+            return super(YacAttMap, self).__getattr__(item, default, expand)
+
+    def _adopt(self, entries, convert=()):
+        """
+        Store parsed entries, leaving their mappings to be converted when
+        first fetched
+
+        :param dict entries: key-value pairs referenced by nothing else
+        :param Container convert: keys whose values are stored as usual,
+            converted right away
+        """
+        for k, v in entries.items():
+            attmap.OrdAttMap.__setitem__(self, k, v, finalize=k in convert)
+
+    def _convert_adopted(self, mapping):
+        """
+        Convert an adopted mapping, whose own mappings are adopted in turn
+
+        :param dict mapping: mapping to convert
+        :return Mapping: the converted mapping
+        """
+        converted = self._lower_type_bound()
+        if not isinstance(converted, YacAttMap):
+            return self._metamorph_maplike(mapping)
+        converted._adopt(mapping)
+        return converted
+
     def __repr__(self):
         # Here we want to render the data in a nice way; and we want to indicate
         # the class if it's NOT a YacAttMap. If it is a YacAttMap we just want
@@ -283,6 +373,7 @@ class YacAttMap(attmap.PathExAttMap):
         :return bool: whether the lock was found and removed
         """
         lock = make_lock_path(_check_filepath(filepath))
+        unregister_lock_file(lock)
         if os.path.exists(lock):
             os.remove(lock)
             return True
@@ -371,6 +462,24 @@ class YacAttMap(attmap.PathExAttMap):
         return attr if attr is None else not attr
 
 
+def _safely_expand(x, to_dict=False):
+    """
+    Expand a string value as a path, like attmap, skipping the strings that
+    expandpath would return unchanged
+
+    :param object x: value to expand
+    :param bool to_dict: whether to recursively convert mappings to dicts
+    :return object: the expanded value
+    """
+    if isinstance(x, str):
+        if "$" in x or "%" in x or x[:1] == "~":
+            return expandpath(x)
+        return x
+    if to_dict and isinstance(x, Mapping):
+        return {k: _safely_expand(v, to_dict) for k, v in x.items()}
+    return x
+
+
 def _warn_deprecated(obj):
     fun_name = _getframe().f_back.f_code.co_name
     warnings.warn(
@@ -514,15 +623,3 @@ def select_config(
     return (
         os.path.abspath(selected_filepath) if selected_filepath else selected_filepath
     )
-
-
-def deep_update(old, new):
-    """
-    Recursively update nested dict, modifying source
-    """
-    for key, value in new.items():
-        if isinstance(value, Mapping) and value:
-            old[key] = deep_update(old.get(key, {}), value)
-        else:
-            old[key] = new[key]
-    return old
@@ -2,13 +2,15 @@ import logging
 import os
 from collections.abc import Iterable, Mapping
 from sys import _getframe
-from signal import signal, SIGINT, SIGTERM
 
 import yaml as yaml
 from jsonschema import validate as _validate
 from jsonschema.exceptions import ValidationError
-from ubiquerg import create_lock, expandpath, is_url, make_lock_path, mkabs, remove_lock
+from ubiquerg import expandpath, is_url, make_lock_path, mkabs
 from ._version import __version__
+from .cleanup import create_lock, remove_lock
+from .keypath import KeyPathMixin
+from .merge import deep_update
 
 _LOGGER = logging.getLogger(__name__)
 _LOGGER.debug(f"Using yacman version {__version__}")
@@ -66,7 +68,7 @@ def ensure_locked(func):
 
 # from typing_extensions import deprecated
 # @deprecated("This YAMLConfigManager is deprecated. Use FutureYAMLConfigManager now. It will be renamed YAMLConfigManager in the next release.")
-class YAMLConfigManager(MutableMapping):
+class YAMLConfigManager(KeyPathMixin, MutableMapping):
     """
     A YAML configuration manager, providing file locking, loading,
     writing, etc.  for YAML configuration files. Without the requirement
@@ -246,9 +248,8 @@ class YAMLConfigManager(MutableMapping):
     #     return f"{type(self).__name__}({self.data})"
 
     def __enter__(self):
-        # handle a premature Ctrl+C exit from this context manager
-        signal(SIGTERM, self._interrupt_handler)
-        signal(SIGINT, self._interrupt_handler)
+        # a premature Ctrl+C exit from this context manager is handled by the
+        # process-wide hook that removes the lock files held (see cleanup.py)
         if self.locked:
             _LOGGER.debug("Already locked upon entering context manager")
             self.already_locked = True
@@ -266,16 +267,6 @@ class YAMLConfigManager(MutableMapping):
         # Must return False, otherwise context exceptions are suppressed
         return False
 
-    def _interrupt_handler(self, signal_received, frame):
-        if signal_received == SIGINT:
-            _LOGGER.warning(f"Received SIGINT, unlocking file and exiting...")
-            self.__exit__(None, None, None)
-            raise KeyboardInterrupt
-        if signal_received == SIGTERM:
-            _LOGGER.warning(f"Received SIGTERM, unlocking file and exiting...")
-            self.__exit__(None, None, None)
-            return
-
     @ensure_locked
     def rebase(self, filepath=None):
         """
@@ -426,9 +417,7 @@ class YAMLConfigManager(MutableMapping):
         return len(self.data)
 
     def __delitem__(self, key):
-        value = self[key]
         del self.data[key]
-        self.pop(value, None)
 
     def priority_get(
         self,
@@ -630,15 +619,3 @@ def select_config(
     return (
         os.path.abspath(selected_filepath) if selected_filepath else selected_filepath
     )
-
-
-def deep_update(old, new):
-    """
-    Recursively update nested dict, modifying source
-    """
-    for key, value in new.items():
-        if isinstance(value, Mapping) and value:
-            old[key] = deep_update(old.get(key, {}), value)
-        else:
-            old[key] = new[key]
-    return old
@@ -1,22 +1,53 @@
 import logging
 import os
+import pickle
+import threading
+import time
 import yaml
 
 from collections.abc import Iterable, Mapping
+from contextlib import contextmanager, nullcontext
+from copy import copy
 from jsonschema import validate as _validate
 from jsonschema.exceptions import ValidationError
-from sys import _getframe
+from functools import lru_cache, partial
+from sys import _getframe, intern
 from ubiquerg import (
     expandpath,
     is_url,
-    ThreeLocker,
     ensure_locked,
-    locked_read_file,
+    mkabs,
     READ,
     WRITE,
 )
 
 from ._version import __version__
+from .arrays import array_loader, array_validator
+from .keypath import KeyPathMixin
+from .locking import READER_PREFERRING, ConfigLocker, locked_read_file, read_lock
+from .transaction import has_pending_transaction, recover
+from .merge import (
+    MERGE_STRATEGIES,
+    OURS,
+    deep_update,
+    snapshot_tree,
+    three_way_merge,
+)
+from .pathindex import KeyPathIndex, scan_tree
+from .snapshot import FrozenList, FrozenMap, freeze
+from .mvcc import (
+    DEFAULT_GRACE_PERIOD,
+    is_versioned,
+    publish_version,
+    read_current_version,
+)
+from .watch import (
+    DEFAULT_DEBOUNCE,
+    DEFAULT_INTERVAL,
+    ConfigWatcher,
+    file_signature,
+    racily_clean,
+)
 
 _LOGGER = logging.getLogger(__name__)
 _LOGGER.debug(f"Using yacman version {__version__}")
@@ -55,6 +86,13 @@ DEFAULT_WAIT_TIME = 60
 SCHEMA_KEY = "schema"
 FILEPATH_KEY = "file_path"
 
+# how the constructor takes the entries
+ADOPT = "adopt"
+COPY = "copy"
+DEEP_COPY = "deep"
+FROZEN = "frozen"
+OWNERSHIP_MODES = (ADOPT, COPY, DEEP_COPY, FROZEN)
+
 from collections.abc import MutableMapping
 
 # Since read and write are now different context managers, we have to
@@ -62,12 +100,43 @@ from collections.abc import MutableMapping
 # itself, which only allows one type of context manager.
 
 
-class FutureYAMLConfigManager(MutableMapping):
+class FutureYAMLConfigManager(KeyPathMixin, MutableMapping):
     """
     A YAML configuration manager, providing file locking, loading,
     writing, etc.  for YAML configuration files.
     """
 
+    # the attributes are stored in slots; the instance dictionary is only
+    # created for other attributes
+    __slots__ = (
+        "data",
+        "filepath",
+        "wait_max",
+        "schema_source",
+        "validate_on_write",
+        "strict_ro_locks",
+        "mvcc",
+        "mvcc_grace_period",
+        "thread_safe",
+        "lock_policy",
+        "ownership",
+        "merge_strategy",
+        "conflicts",
+        "locker",
+        "key_path_index",
+        "array_threshold",
+        SCHEMA_KEY,
+        "_edit_lock",
+        "_watcher",
+        "_file_signature",
+        "_signature_time",
+        "_base",
+        "_shared",
+        "_snapshot",
+        "__dict__",
+        "__weakref__",
+    )
+
     def __init__(
         self,
         entries=None,
@@ -75,6 +144,14 @@ class FutureYAMLConfigManager(MutableMapping):
         strict_ro_locks=False,
         schema_source=None,
         validate_on_write=False,
+        mvcc=False,
+        mvcc_grace_period=DEFAULT_GRACE_PERIOD,
+        thread_safe=False,
+        lock_policy=READER_PREFERRING,
+        merge_strategy=OURS,
+        key_path_index=False,
+        ownership=COPY,
+        array_threshold=None,
     ):
         """
         Object constructor
@@ -94,6 +171,40 @@ class FutureYAMLConfigManager(MutableMapping):
         :param bool validate_on_write: a boolean indicating whether the object should be
             validated every time the `write` method is executed, which is
             a way of preventing invalid config writing
+        :param bool mvcc: whether to use multi-version storage for the file:
+            every write publishes a new immutable version of the file, and
+            readers never wait for writers, since read locks are not needed
+        :param float mvcc_grace_period: how long, in seconds, superseded
+            versions of the file are kept for readers that may still be
+            opening them
+        :param bool thread_safe: whether the object is shared by several
+            threads: changes are then made on a copy of the top-level data,
+            which is swapped in when complete, so that readers always see a
+            consistent state without locking, and concurrent changes are
+            serialized
+        :param str lock_policy: how waiters for the file locks are let through:
+            "reader" to let readers in whenever no writer holds the lock,
+            "writer" to make readers wait for all the queued writers, or "fair"
+            to serve waiters in arrival order
+        :param str merge_strategy: how `rebase` resolves conflicts between
+            local changes and changes to the file: "ours" to keep the local
+            value, "theirs" to keep the value in the file, "raise" to raise
+            a MergeConflictError
+        :param bool key_path_index: whether to maintain an index of all the
+            key paths of the data, for constant time `get_path` lookups and
+            sorted prefix scans with `scan`. The index follows the changes
+            made through the object; changes made in place to nested
+            mappings must be made with `set_path` and `del_path`, or followed
+            by `reindex`
+        :param str ownership: how the entries are taken: "adopt" to use them
+            as they are, the caller giving them up; "copy" to copy the
+            top-level collection, the nested ones being shared; "deep" to copy
+            all the mappings and lists; "frozen" to use them as they are, in a
+            read-only object whose values are read-only views
+        :param int array_threshold: least number of items of the sequences,
+            all ints or all floats, loaded from YAML as packed `array.array`
+            objects rather than lists, to save memory; None to load all the
+            sequences as lists. Arrays are written as plain sequences
 
         """
 
@@ -103,13 +214,55 @@ class FutureYAMLConfigManager(MutableMapping):
         self.schema_source = schema_source
         self.validate_on_write = validate_on_write
         self.strict_ro_locks = strict_ro_locks
+        self.mvcc = mvcc
+        self.mvcc_grace_period = mvcc_grace_period
+        self.thread_safe = thread_safe
+        self.lock_policy = lock_policy
+        if ownership not in OWNERSHIP_MODES:
+            raise ValueError(
+                f"Unknown ownership: {ownership}. "
+                f"Choose from: {', '.join(OWNERSHIP_MODES)}"
+            )
+        self.ownership = ownership
+        # raises for an invalid threshold
+        array_loader(array_threshold)
+        self.array_threshold = array_threshold
+        if merge_strategy not in MERGE_STRATEGIES:
+            raise ValueError(
+                f"Unknown merge strategy: {merge_strategy}. "
+                f"Choose from: {', '.join(MERGE_STRATEGIES)}"
+            )
+        self._edit_lock = threading.RLock() if thread_safe else None
         self.locker = None
+        self._watcher = None
+        self.merge_strategy = merge_strategy
+        self.conflicts = []
+        # identity and contents of the file when it was last loaded or written
+        self._file_signature = None
+        self._signature_time = None
+        self._base = None
+        # whether the nested containers may be shared with snapshots, in
+        # which case they are copied on write
+        self._shared = False
+        self._snapshot = None
 
         # We store the values in a dict under .data
-        if isinstance(entries, list):
-            self.data = entries
-        else:
-            self.data = dict(entries or {})
+        if isinstance(entries, (FrozenMap, FrozenList)):
+            self._shared = True
+            entries = entries._data
+        if entries is None:
+            entries = {}
+        elif not isinstance(entries, (Mapping, list)):
+            entries = dict(entries)
+        elif ownership == COPY:
+            entries = copy(entries) if type(entries) in (dict, list) else dict(entries)
+        elif ownership == DEEP_COPY:
+            self._shared = False
+            entries = snapshot_tree(entries)
+        elif ownership == FROZEN:
+            self._shared = True
+        self.data = entries
+        self.key_path_index = KeyPathIndex(self.data) if key_path_index else None
         if schema_source is not None:
             assert isinstance(schema_source, str), TypeError(
                 f"Path to the schema to validate the config must be a string"
@@ -120,7 +273,7 @@ class FutureYAMLConfigManager(MutableMapping):
                 f" Also tried: {sp}"
             )
             # validate config
-            setattr(self, SCHEMA_KEY, load_yaml(sp))
+            setattr(self, SCHEMA_KEY, self._load_schema(sp))
             self.validate()
 
     @classmethod
@@ -128,6 +281,9 @@ class FutureYAMLConfigManager(MutableMapping):
         """
         Initialize from a Python object (dict, list, or primitive).
 
+        With `ownership="adopt"` or `"frozen"`, the object is used without
+        copying it.
+
         :param obj entries: object to initialize from.
         :param kwargs: Keyword arguments to pass to the constructor.
         """
@@ -141,7 +297,9 @@ class FutureYAMLConfigManager(MutableMapping):
         :param str yamldata: YAML-formatted string.
         :param kwargs: Keyword arguments to pass to the constructor.
         """
-        entries = yaml.load(yamldata, yaml.SafeLoader)
+        entries = yaml.load(yamldata, array_loader(kwargs.get("array_threshold")))
+        # nobody else has the parsed entries
+        kwargs.setdefault("ownership", ADOPT)
         return cls(entries, **kwargs)
 
     @classmethod
@@ -154,28 +312,191 @@ class FutureYAMLConfigManager(MutableMapping):
         :param kwargs: Keyword arguments to pass to the constructor.
         """
 
-        file_contents = locked_read_file(filepath, create_file=create_file)
-        entries = yaml.load(file_contents, yaml.SafeLoader)
+        locker = ConfigLocker(
+            filepath,
+            wait_max=kwargs.get("wait_max", DEFAULT_WAIT_TIME),
+            strict_ro_locks=kwargs.get("strict_ro_locks", False),
+            mvcc=kwargs.get("mvcc", False),
+            policy=kwargs.get("lock_policy", READER_PREFERRING),
+        )
+        if has_pending_transaction(filepath):
+            locker.write_lock()
+            try:
+                recover(filepath)
+            finally:
+                locker.write_unlock()
+        # taken before reading, so a concurrent change makes the object stale
+        taken_ns = time.time_ns()
+        signature = file_signature(filepath)
+        if locker.mvcc:
+            file_contents = read_current_version(filepath, create_file=create_file)
+        else:
+            file_contents = locked_read_file(
+                filepath, create_file=create_file, locker=locker
+            )
+        entries = yaml.load(file_contents, array_loader(kwargs.get("array_threshold")))
+        kwargs.setdefault("ownership", ADOPT)
         ref = cls(entries, **kwargs)
-        ref.locker = ThreeLocker(filepath)
+        ref.locker = locker
         ref.filepath = filepath
+        ref._base = ref._base_of(ref.data)
+        ref._set_file_signature(signature, taken_ns)
         return ref
 
     def update_from_yaml_file(self, filepath=None):
         if filepath is not None:  # set filepath to update filepath if uninitialized
             if self.filepath is not None:
                 self.filepath = filepath
-        self.data.update(load_yaml(filepath))
+        with self._editing() as data:
+            data.update(self._load_yaml(filepath))
         return
 
     def update_from_yaml_data(self, yamldata=None):
-        self.data.update(yaml.load(yamldata, yaml.SafeLoader))
+        with self._editing() as data:
+            data.update(self._parse(yamldata))
         return
 
     def update_from_obj(self, entries=None):
-        self.data.update(entries)
+        with self._editing() as data:
+            data.update(entries)
         return
 
+    def update(self, *args, **kwargs):
+        """
+        Update the object with the key-value pairs from a mapping or an
+        iterable of pairs, and keyword arguments, all in one change
+        """
+        entries = dict(*args, **kwargs)
+        with self._editing(entries) as data:
+            data.update(entries)
+
+    @contextmanager
+    def _editing(self, keys=None):
+        """
+        Context manager yielding the data to change.
+
+        In thread-safe mode, the changes are made on a shallow copy of the
+        data, which replaces the data once the context exits, so readers never
+        see a partial change. Concurrent changes are serialized. The data are
+        also copied if they may be shared with a snapshot.
+
+        :param Iterable[str] keys: the top-level keys to change, if known,
+            so the key path index only follows these
+        :return dict | list: the data to change
+        """
+        self._check_writable()
+        index = self.key_path_index
+        if self._edit_lock is None and not self._shared:
+            # the top-level mapping is changed in place
+            old = (
+                dict(self.data)
+                if index is not None and keys is None and isinstance(self.data, Mapping)
+                else None
+            )
+            yield self.data
+            if index is not None:
+                self._reindex(old, self.data, keys)
+            return
+        with self._edit_lock if self._edit_lock is not None else nullcontext():
+            old = self.data
+            data = copy(old)
+            yield data
+            self.data = data
+            if index is not None:
+                self._reindex(old, data, keys)
+
+    def _reindex(self, old, new, keys):
+        if keys is None:
+            self.key_path_index.apply_changes(old, new)
+        else:
+            self.key_path_index.refresh(new, [(key,) for key in keys])
+
+    def _publish(self, data):
+        """
+        Replace the data with a new object, in one step
+
+        :param dict | list data: new data
+        """
+        if self._edit_lock is None:
+            self._replace_data(data)
+            return
+        with self._edit_lock:
+            self._replace_data(data)
+
+    def _replace_data(self, data):
+        old = self.data
+        self.data = data
+        if self.key_path_index is not None:
+            self.key_path_index.apply_changes(old, data)
+
+    def _copy_on_write(self):
+        return self._edit_lock is not None or self._shared
+
+    def _view(self, value):
+        return freeze(value) if self.ownership == FROZEN else value
+
+    def _check_writable(self):
+        if self.ownership == FROZEN:
+            raise TypeError(f"{self.__class__.__name__} object is frozen")
+
+    def snapshot(self):
+        """
+        Get an immutable, hashable view of the current data
+
+        The view shares the data instead of copying them, so it takes constant
+        time, and the same view is returned until the data change. From then
+        on, changes made through the object copy the containers along the
+        changed key paths only, leaving the snapshots unchanged; `rebase`,
+        `reset` and reloads replace the data as a whole. Changes made in place
+        to nested mappings got from the object would show in the snapshots.
+
+        :return FrozenMap | FrozenList: the snapshot
+        """
+        data = self.data
+        snapshot = self._snapshot
+        if snapshot is None or snapshot._data is not data:
+            snapshot = self._snapshot = freeze(data)
+        self._shared = True
+        return snapshot
+
+    def _key_path_changed(self, path):
+        if self.key_path_index is not None:
+            self.key_path_index.refresh(self.data, [path])
+
+    def scan(self, prefix=""):
+        """
+        List the key paths under a prefix, in sorted order
+
+        With a key path index, the key paths are found by a binary search
+        and a contiguous scan of the index; otherwise the tree is walked.
+
+        :param str | Iterable[str] prefix: key path prefix, in which "*"
+            matches any key, e.g. "genomes.*.assets"
+        :return list[(tuple, object)]: key paths under the prefix, the
+            prefix excluded, and their values
+        """
+        if self.key_path_index is None:
+            return scan_tree(self.data, prefix)
+        if self._edit_lock is None:
+            return self.key_path_index.scan(prefix)
+        with self._edit_lock:
+            return self.key_path_index.scan(prefix)
+
+    def reindex(self, path=None):
+        """
+        Update the key path index after changes made in place to nested
+        mappings
+
+        :param str | Iterable[str] path: key path of the changed subtree;
+            the whole index is rebuilt if not given
+        """
+        if self.key_path_index is None:
+            return
+        if path is None:
+            self.key_path_index.rebuild(self.data)
+        else:
+            self.key_path_index.refresh(self.data, [path])
+
     @property
     def settings(self):
         return {
@@ -184,12 +505,70 @@ class FutureYAMLConfigManager(MutableMapping):
             "validate_on_write": self.validate_on_write,
             "locked": self.locked,
             "strict_ro_locks": self.strict_ro_locks,
+            "mvcc": self.mvcc,
+            "thread_safe": self.thread_safe,
+            "lock_policy": self.lock_policy,
+            "merge_strategy": self.merge_strategy,
+            "key_path_index": self.key_path_index is not None,
+            "ownership": self.ownership,
+            "array_threshold": self.array_threshold,
         }
 
     def __del__(self):
+        if getattr(self, "_watcher", None) is not None:
+            self._watcher.stop()
+        self._drop_locker()
+
+    def _drop_locker(self):
         if hasattr(self, "locker"):
             del self.locker
 
+    def _parse(self, stream):
+        """
+        :param str | TextIO stream: YAML text, or a file to read it from
+        :return object: the data, with the long numeric sequences packed
+            into arrays if the object has an array threshold
+        """
+        return yaml.load(stream, array_loader(self.array_threshold))
+
+    def _load_yaml(self, filepath):
+        """
+        :param str filepath: path or URL of a YAML file
+        :return object: the data, parsed like `_parse` does
+        """
+        return load_yaml(filepath, array_loader(self.array_threshold))
+
+    def _load_schema(self, filepath):
+        """
+        :param str filepath: path to a jsonschema in YAML format
+        :return dict: the schema
+        """
+        return load_yaml(filepath)
+
+    def _base_of(self, data):
+        """
+        Get the version of the data that later changes are merged against
+
+        The data are pickled: the byte string takes a fraction of the memory
+        of a copy of the data, is not affected by later changes made in
+        place, and is only unpickled by `rebase` once the file has changed.
+
+        :param dict | list data: data matching the file
+        :return bytes | dict | list: the pickled data, or a copy of the data
+            if they can't be pickled
+        """
+        try:
+            return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return snapshot_tree(data)
+
+    def _merge_base(self):
+        """
+        :return dict | list | NoneType: the data got from `_base_of`
+        """
+        base = self._base
+        return pickle.loads(base) if isinstance(base, bytes) else base
+
     def __repr__(self):
         # Render the data in a nice way
         return self.to_yaml(self.data)
@@ -205,38 +584,192 @@ class FutureYAMLConfigManager(MutableMapping):
         )
 
     @ensure_locked(READ)
-    def rebase(self, filepath=None):
+    def rebase(self, filepath=None, strategy=None):
         """
         Reload the object from file, then update with current information
 
+        The local changes and the changes to the file since the object was
+        loaded, reset, rebased or written are merged three-way, key path by
+        key path, deletions included. If the file has not changed since, it
+        is not read, unless it had changed within the timestamp granularity
+        of the file system of when it was loaded: a second change in the
+        same tick may have kept its size and modification time. The key
+        paths changed differently on both sides are conflicts, listed in the
+        `conflicts` attribute and resolved by the merge strategy. For
+        another file than the one backing the object, every difference is a
+        conflict.
+
+        The merged data are built aside and swapped in at once, so concurrent
+        readers see either the old or the new data.
+
         :param str filepath: path to the file that should be read
+        :param str strategy: how conflicts are resolved: "ours" to keep the
+            local value, "theirs" to keep the value in the file, "raise" to
+            raise an error; defaults to the object's merge strategy
+        :raise MergeConflictError: if there are conflicts and the strategy
+            is "raise"; the object is then left unchanged
         """
         fp = filepath or self.locker.filepath
-        if fp is not None:
-            local_data = self.data
-            self.data = load_yaml(fp)
-            _LOGGER.debug(f"Rebased {local_data} with {self.data} from {fp}")
-            if self.data is None:
-                self.data = local_data
-            else:
-                deep_update(self.data, local_data)
-        else:
+        if fp is None:
             _LOGGER.warning("Rebase has no effect if no filepath given")
-
+            return self
+        taken_ns = time.time_ns()
+        signature = self._own_file_signature(fp)
+        if (
+            signature is not None
+            and signature == self._file_signature
+            and not racily_clean(signature, self._signature_time)
+            and self._base is not None
+        ):
+            _LOGGER.debug(f"Rebase skipped, file unchanged: {fp}")
+            self.conflicts = []
+            return self
+        on_disk = self._load_yaml(fp)
+        if on_disk is None:
+            on_disk = {}
+        if self._edit_lock is None:
+            self._rebase_on(on_disk, fp, signature, taken_ns, strategy)
+        else:
+            with self._edit_lock:
+                self._rebase_on(on_disk, fp, signature, taken_ns, strategy)
         return self
 
+    def _rebase_on(self, on_disk, filepath, signature, taken_ns, strategy):
+        local_data = self.data
+        base = self._merge_base() if signature is not None else None
+        merged, conflicts = three_way_merge(
+            base, on_disk, local_data, strategy or self.merge_strategy
+        )
+        _LOGGER.debug(f"Rebased {local_data} with {on_disk} from {filepath}")
+        if conflicts:
+            _LOGGER.info(f"Conflicting changes to {filepath}: {conflicts}")
+        self._replace_data(merged)
+        self.conflicts = conflicts
+        if signature is not None:
+            self._base = self._base_of(on_disk)
+            self._set_file_signature(signature, taken_ns)
+
     @ensure_locked(READ)
     def reset(self, filepath=None):
         """
         Reset dict contents to file contents, or to empty dict if no filepath found.
         """
         fp = filepath or self.locker.filepath
-        if fp is not None:
-            self.data = load_yaml(fp)
-        else:
-            self.data = {}
+        taken_ns = time.time_ns()
+        signature = self._own_file_signature(fp)
+        self._publish(self._load_yaml(fp) if fp is not None else {})
+        if signature is not None:
+            self._base = self._base_of(self.data)
+            self._set_file_signature(signature, taken_ns)
         return self
 
+    def is_stale(self):
+        """
+        Check whether the file has changed since the object was last loaded
+        from it or written to it.
+
+        Only the file identity is checked (device, inode, size and
+        modification times), with a single stat call; the file is not read.
+
+        :return bool: whether the file has changed; False for objects that
+            are not backed by a file
+        """
+        if not self.filepath:
+            return False
+        return file_signature(self.filepath) != self._file_signature
+
+    def refresh_if_changed(self):
+        """
+        Reset the object to the file contents, only if the file has changed
+        since the object was last loaded from it or written to it
+
+        The file is read under a read lock, which is only taken if the file
+        has changed.
+
+        :return bool: whether the object was reloaded
+        """
+        if not self.is_stale():
+            return False
+        with read_lock(self):
+            self.reset()
+        return True
+
+    def _own_file_signature(self, filepath):
+        """
+        Get the identity of a file, if it is the one backing this object
+
+        :param str filepath: path to the file
+        :return tuple[int] | NoneType: the identity, None for other files
+        """
+        if filepath is None or self.filepath is None:
+            return None
+        if mkabs(filepath) != mkabs(self.filepath):
+            return None
+        return file_signature(filepath)
+
+    def watch(
+        self,
+        callback=None,
+        interval=None,
+        debounce=None,
+        use_inotify=True,
+    ):
+        """
+        Reload the object in a background thread whenever its file changes
+
+        The file is checked every `interval` seconds, or as soon as it
+        changes if inotify is available, and reloaded under a read lock once
+        it has not changed for `debounce` seconds, so that a burst of writes
+        triggers a single reload. The reloaded data replace the object data
+        at once, discarding changes not written to the file.
+
+        The callbacks are called in the watcher thread, with a ConfigChanges
+        tuple of the added, removed and changed key paths, when there are
+        any. Watching again adds a callback, and updates the settings given.
+
+        :param callable callback: function to call with the changes
+        :param float interval: max time, in seconds, between two checks of
+            the file, 1 by default
+        :param float debounce: time, in seconds, the file must stay unchanged
+            before it is reloaded, 0.05 by default
+        :param bool use_inotify: whether to use inotify, if available
+        :return yacman.watch.ConfigWatcher: the watcher thread
+        """
+        watcher = self._watcher
+        if watcher is None or watcher.stopped.is_set():
+            watcher = ConfigWatcher(
+                self,
+                interval=DEFAULT_INTERVAL if interval is None else interval,
+                debounce=DEFAULT_DEBOUNCE if debounce is None else debounce,
+                use_inotify=use_inotify,
+            )
+            watcher.start()
+            self._watcher = watcher
+        else:
+            if interval is not None:
+                watcher.interval = interval
+            if debounce is not None:
+                watcher.debounce = debounce
+        if callback is not None:
+            watcher.add_callback(callback)
+        return watcher
+
+    def unwatch(self, callback=None):
+        """
+        Stop calling a callback on changes, or stop watching the file
+
+        :param callable callback: function to unregister; if not provided,
+            or if no callbacks remain, the watcher thread is stopped
+        """
+        watcher = self._watcher
+        if watcher is None:
+            return
+        if callback is not None:
+            watcher.remove_callback(callback)
+        if callback is None or not watcher.callbacks:
+            watcher.stop()
+            self._watcher = None
+
     def validate(self, schema=None, exclude_case=False):
         """
         Validate the object against a schema
@@ -247,7 +780,11 @@ class FutureYAMLConfigManager(MutableMapping):
             from the error. Useful when used with large configs
         """
         try:
-            _validate(self.to_dict(expand=True), schema or getattr(self, SCHEMA_KEY))
+            schema = schema or getattr(self, SCHEMA_KEY)
+            if self.array_threshold is None:
+                _validate(self.to_dict(expand=True), schema)
+            else:
+                _validate(self.to_dict(expand=True), schema, array_validator(schema))
         except ValidationError as e:
             _LOGGER.error(
                 f"{self.__class__.__name__} object did not pass schema validation"
@@ -270,6 +807,15 @@ class FutureYAMLConfigManager(MutableMapping):
         """
         Write the contents to the file backing this object.
 
+        If the object is write-locked on key paths rather than on the whole
+        file, only the locked subtrees are written: they are merged into
+        the current file contents, which are then also loaded into the object.
+
+        Files in the multi-version layout are never modified in place; a new
+        version is published instead. Within `multi_write_lock`, the contents
+        are only staged, and written when the transaction is committed, from
+        which point the object matches the new version of the file.
+
         :param dict schema: a schema object to use to validate, it overrides the one
             that has been provided at object construction stage
         :raise OSError: when the object has been created in a read only mode or other
@@ -284,9 +830,20 @@ class FutureYAMLConfigManager(MutableMapping):
             raise OSError("Must provide a filepath to write.")
 
         _check_filepath(self.locker.filepath)
-        _LOGGER.debug(f"Writing to file '{self.locker.filepath}'")
-        with open(self.locker.filepath, "w") as f:
-            f.write(self.to_yaml())
+        key_paths = getattr(self.locker, "write_key_paths", None)
+        transaction = getattr(self.locker, "transaction", None)
+        if transaction is not None:
+            _LOGGER.debug(f"Staging file '{self.locker.filepath}' for writing")
+            transaction.stage(
+                self.locker.filepath,
+                self.to_yaml(),
+                on_commit=partial(self._record_written, self._base_of(self.data)),
+            )
+        elif key_paths:
+            self._write_key_paths(key_paths)
+        else:
+            _LOGGER.debug(f"Writing to file '{self.locker.filepath}'")
+            self._write_file(self.to_yaml())
 
         if schema is not None or self.validate_on_write:
             self.validate(schema=schema, exclude_case=exclude_case)
@@ -295,6 +852,59 @@ class FutureYAMLConfigManager(MutableMapping):
         _LOGGER.debug(f"Wrote to a file: {abs_path}")
         return os.path.abspath(abs_path)
 
+    def _write_key_paths(self, key_paths):
+        """
+        Merge the subtrees under the key paths into the file contents and write
+
+        :param list[tuple[str]] key_paths: key paths to write
+        """
+        with self.locker.commit_lock():
+            on_disk = self._load_yaml(self.locker.filepath) or {}
+            for key_path in key_paths:
+                _copy_subtree(self.data, on_disk, key_path)
+            self._publish(on_disk)
+            _LOGGER.debug(
+                f"Writing key paths {key_paths} to file '{self.locker.filepath}'"
+            )
+            self._write_file(self.to_yaml())
+
+    def _write_file(self, text):
+        """
+        Write text to the file backing this object, or publish it as a new
+        version if the file uses multi-version storage
+
+        :param str text: file contents
+        """
+        fp = self.locker.filepath
+        if self.mvcc or is_versioned(fp):
+            publish_version(fp, text, grace_period=self.mvcc_grace_period)
+        else:
+            with open(fp, "w") as f:
+                f.write(text)
+        self._record_written(self._base_of(self.data))
+
+    def _record_written(self, base):
+        """
+        Record the version of the file the object has just written, which
+        is still locked
+
+        :param dict | list base: the written data, as got from `_base_of`
+        """
+        self._base = base
+        taken_ns = time.time_ns()
+        self._set_file_signature(file_signature(self.locker.filepath), taken_ns)
+
+    def _set_file_signature(self, signature, taken_ns):
+        """
+        Record the identity of the file matching the data
+
+        :param tuple[int] | NoneType signature: identity of the file
+        :param int taken_ns: time, in nanoseconds since the epoch, just
+            before the identity was taken
+        """
+        self._file_signature = signature
+        self._signature_time = taken_ns
+
     def write_copy(self, filepath=None):
         """
         Write the contents to an external file.
@@ -328,7 +938,8 @@ class FutureYAMLConfigManager(MutableMapping):
         return self.data
 
     def __setitem__(self, item, value):
-        self.data[item] = value
+        with self._editing((item,)) as data:
+            data[item] = value
 
     def __getitem__(self, item):
         """
@@ -338,7 +949,8 @@ class FutureYAMLConfigManager(MutableMapping):
         :return object: value mapped to given key, if available
         :raise KeyError: if the requested key is unmapped.
         """
-        return self.data[item]
+        value = self.data[item]
+        return freeze(value) if self.ownership == FROZEN else value
 
     @property
     def exp(self) -> dict:
@@ -355,9 +967,8 @@ class FutureYAMLConfigManager(MutableMapping):
         return len(self.data)
 
     def __delitem__(self, key):
-        value = self[key]
-        del self.data[key]
-        self.pop(value, None)
+        with self._editing((key,)) as data:
+            del data[key]
 
     def priority_get(
         self,
@@ -393,6 +1004,103 @@ class FutureYAMLConfigManager(MutableMapping):
             raise Exception(message)
 
 
+class CompactYAMLConfigManager(FutureYAMLConfigManager):
+    """
+    A FutureYAMLConfigManager with a small memory footprint, for processes
+    that keep many of them
+
+    - the locker is created when first needed, not when the file is read
+    - changes are made copy-on-write, as for snapshots, so the version of
+      the data that `rebase` merges against is shared with the data instead
+      of copied; changes made in place to nested mappings got from the
+      object are therefore not supported
+    - the schemas are loaded once per file and shared
+    - the keys and values of the data can be interned, so the strings
+      repeated across configs are stored once
+    """
+
+    __slots__ = ("_locker", "intern_strings")
+
+    def __init__(self, entries=None, intern_strings=False, **kwargs):
+        """
+        Object constructor
+
+        :param Iterable[(str, object)] | Mapping[str, object] entries: YAML collection
+            of key-value pairs.
+        :param bool intern_strings: whether to intern the string keys and
+            values of the data, which are copied in the process
+        :param kwargs: other arguments, as for FutureYAMLConfigManager
+        """
+        self._locker = None
+        self.intern_strings = intern_strings
+        if intern_strings and isinstance(entries, (dict, list)):
+            entries = _intern_tree(entries)
+            kwargs["ownership"] = kwargs.get("ownership", ADOPT)
+        super().__init__(entries, **kwargs)
+        self._shared = True
+
+    @classmethod
+    def from_yaml_file(cls, filepath: str, create_file: bool = False, **kwargs):
+        """
+        Initialize from a YAML file.
+
+        :param str filepath: Path to the YAML config file.
+        :param str create_file: Create a file at filepath if it doesn't exist.
+        :param kwargs: Keyword arguments to pass to the constructor.
+        """
+        ref = super().from_yaml_file(filepath, create_file=create_file, **kwargs)
+        # the locker used for reading holds no lock anymore
+        ref._locker = None
+        return ref
+
+    @property
+    def locker(self):
+        if self._locker is None and self.filepath is not None:
+            self._locker = ConfigLocker(
+                self.filepath,
+                wait_max=self.wait_max,
+                strict_ro_locks=self.strict_ro_locks,
+                mvcc=self.mvcc,
+                policy=self.lock_policy,
+            )
+        return self._locker
+
+    @locker.setter
+    def locker(self, locker):
+        self._locker = locker
+
+    def _drop_locker(self):
+        self._locker = None
+
+    def _load_schema(self, filepath):
+        return _shared_schema(os.path.abspath(filepath), os.stat(filepath).st_mtime_ns)
+
+    def _base_of(self, data):
+        # changes are copy-on-write, so the data are not changed in place
+        return data
+
+
+def _intern_tree(data):
+    """
+    Copy the mappings and lists of config data, interning their strings
+
+    :param object data: data to copy
+    :return object: the copy
+    """
+    if type(data) is str:
+        return intern(data)
+    if isinstance(data, dict):
+        return {_intern_tree(k): _intern_tree(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [_intern_tree(v) for v in data]
+    return data
+
+
+@lru_cache(maxsize=None)
+def _shared_schema(filepath, mtime_ns):
+    return load_yaml(filepath)
+
+
 # A big issue here is: if you route the __getitem__ through this,
 # then it returns a copy of the data, rather than the data itself.
 # That's the point, so we don't adjust it. But then you can't use multi-level
@@ -419,6 +1127,39 @@ def _unsafely_expand_path(x):
     return x
 
 
+def _copy_subtree(src, dst, key_path):
+    """
+    Copy the value under a key path from one nested mapping to another
+
+    Missing intermediate mappings are created in the destination. If the key
+    path does not exist in the source, it is removed from the destination.
+
+    :param Mapping src: mapping to copy the value from
+    :param MutableMapping dst: mapping to copy the value to
+    :param tuple[str] key_path: keys leading to the value
+    """
+    if not key_path:
+        dst.clear()
+        dst.update(src)
+        return
+    *parents, last = key_path
+    for key in parents:
+        if not isinstance(src, Mapping) or key not in src:
+            src = None
+            break
+        src = src[key]
+    for key in parents:
+        if not isinstance(dst.get(key), Mapping):
+            if src is None:
+                return
+            dst[key] = {}
+        dst = dst[key]
+    if isinstance(src, Mapping) and last in src:
+        dst[last] = src[last]
+    else:
+        dst.pop(last, None)
+
+
 def _check_filepath(filepath):
     """
     Validate if the filepath is a str
@@ -448,7 +1189,7 @@ def _warn_deprecated(obj):
     )
 
 
-def load_yaml(filepath):
+def load_yaml(filepath, loader=yaml.SafeLoader):
     """Load a yaml file into a python dict"""
 
     def read_yaml_file(filepath):
@@ -459,7 +1200,7 @@ def load_yaml(filepath):
         :return dict: read data
         """
         with open(filepath, "r") as f:
-            data = yaml.safe_load(f)
+            data = yaml.load(f, loader)
         return data
 
     if is_url(filepath):
@@ -476,7 +1217,7 @@ def load_yaml(filepath):
             raise e
         data = response.read()  # a `bytes` object
         text = data.decode("utf-8")
-        return yaml.safe_load(text)
+        return yaml.load(text, loader)
     else:
         return read_yaml_file(filepath)
 
@@ -569,15 +1310,3 @@ def select_config(
     return (
         os.path.abspath(selected_filepath) if selected_filepath else selected_filepath
     )
-
-
-def deep_update(old, new):
-    """
-    Recursively update nested dict, modifying source
-    """
-    for key, value in new.items():
-        if isinstance(value, Mapping) and value:
-            old[key] = deep_update(old.get(key, {}), value)
-        else:
-            old[key] = new[key]
-    return old